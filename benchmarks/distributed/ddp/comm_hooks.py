@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+#
+# Measure bytes on the wire against convergence for DDP communication hooks.
+#
+# This program trains the same model from the same initialization with
+# each of the gradient compression hooks of
+# torch.distributed.algorithms.ddp_comm_hooks, using the gloo backend on
+# CPU, and reports how many bytes every rank sent and the training loss.
+#
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+import torch.optim as optim
+from torch.distributed.algorithms import ddp_comm_hooks
+from torch.nn.parallel import DistributedDataParallel
+
+
+class CountingProcessGroup(object):
+    """Forwards collectives to a process group, counting the bytes sent by
+    this rank with ring algorithms."""
+
+    def __init__(self, process_group):
+        self.process_group = process_group
+        self.bytes_sent = 0
+
+    def size(self):
+        return self.process_group.size()
+
+    def rank(self):
+        return self.process_group.rank()
+
+    def allreduce(self, tensors, *args):
+        world_size = self.size()
+        nbytes = sum(t.numel() * t.element_size() for t in tensors)
+        self.bytes_sent += 2 * (world_size - 1) * nbytes // world_size
+        return self.process_group.allreduce(tensors, *args)
+
+    def allgather(self, output_tensors, input_tensors, *args):
+        nbytes = sum(t.numel() * t.element_size() for t in input_tensors)
+        self.bytes_sent += (self.size() - 1) * nbytes
+        return self.process_group.allgather(output_tensors, input_tensors, *args)
+
+
+HOOKS = {
+    "allreduce": lambda pg, args: (pg, ddp_comm_hooks.allreduce_hook),
+    "fp16": lambda pg, args: (pg, ddp_comm_hooks.fp16_compress_hook),
+    "powersgd": lambda pg, args: (
+        ddp_comm_hooks.PowerSGDState(pg, matrix_approximation_rank=args.powersgd_rank),
+        ddp_comm_hooks.powerSGD_hook),
+    "topk": lambda pg, args: (
+        ddp_comm_hooks.TopKState(pg, compress_ratio=args.topk_ratio),
+        ddp_comm_hooks.topk_hook),
+}
+
+
+def create_model(args):
+    layers = []
+    for _ in range(args.depth):
+        layers += [nn.Linear(args.width, args.width), nn.ReLU()]
+    layers.append(nn.Linear(args.width, 1))
+    return nn.Sequential(*layers)
+
+
+def run_hook(rank, args, name):
+    process_group = dist.distributed_c10d._get_default_group()
+    counting_group = CountingProcessGroup(process_group)
+
+    torch.manual_seed(0)
+    model = create_model(args)
+    # All ranks fit the same teacher, on different samples
+    teacher = create_model(args)
+    ddp_model = DistributedDataParallel(model, process_group=process_group)
+    ddp_model._register_comm_hook(*HOOKS[name](counting_group, args))
+    optimizer = optim.SGD(ddp_model.parameters(), lr=args.lr, momentum=0.9)
+    criterion = nn.MSELoss()
+
+    torch.manual_seed(1 + rank)
+    losses = []
+    start = time.time()
+    for _ in range(args.iterations):
+        input = torch.randn(args.batch_size, args.width)
+        with torch.no_grad():
+            target = teacher(input)
+        optimizer.zero_grad()
+        loss = criterion(ddp_model(input), target)
+        loss.backward()
+        optimizer.step()
+        losses.append(loss.item())
+    elapsed = time.time() - start
+
+    # Average the losses of the last iterations over all ranks
+    tail = torch.tensor(losses[-args.average_over:]).mean()
+    dist.all_reduce(tail)
+    return {
+        "bytes_sent": counting_group.bytes_sent,
+        "final_loss": tail.item() / dist.get_world_size(),
+        "losses": losses,
+        "sec_per_iter": elapsed / args.iterations,
+    }
+
+
+def worker(rank, args, init_file):
+    dist.init_process_group(
+        backend="gloo",
+        init_method="file://" + init_file,
+        rank=rank,
+        world_size=args.world_size)
+    torch.set_num_threads(1)
+
+    results = {}
+    for name in args.hooks:
+        results[name] = run_hook(rank, args, name)
+        dist.barrier()
+
+    if rank == 0:
+        num_params = sum(p.numel() for p in create_model(args).parameters())
+        print("* Model: {} parameters".format(num_params))
+        print("* World size: {}".format(args.world_size))
+        print("")
+        print("{:<12}{:>16}{:>12}{:>14}{:>12}".format(
+            "hook", "MB sent/rank", "vs. fp32", "final loss", "sec/iter"))
+        baseline = results.get("allreduce", next(iter(results.values())))["bytes_sent"]
+        for name, result in results.items():
+            print("{:<12}{:>16.2f}{:>11.1f}%{:>14.5f}{:>12.4f}".format(
+                name,
+                result["bytes_sent"] / 1e6,
+                100.0 * result["bytes_sent"] / baseline,
+                result["final_loss"],
+                result["sec_per_iter"]))
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"args": vars(args), "results": results}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DDP communication hook benchmark")
+    parser.add_argument("--world-size", type=int, default=2)
+    parser.add_argument("--hooks", type=str, nargs="+", choices=sorted(HOOKS.keys()),
+                        default=["allreduce", "fp16", "powersgd", "topk"])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--average-over", type=int, default=20,
+                        help="Number of final iterations to average the loss over")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--width", type=int, default=512)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--lr", type=float, default=0.01)
+    parser.add_argument("--powersgd-rank", type=int, default=4)
+    parser.add_argument("--topk-ratio", type=float, default=0.01)
+    parser.add_argument("--json", type=str, metavar="PATH", help="Write file with benchmark results")
+    args = parser.parse_args()
+
+    fd, init_file = tempfile.mkstemp()
+    os.close(fd)
+    os.remove(init_file)
+    try:
+        mp.spawn(worker, args=(args, init_file), nprocs=args.world_size)
+    finally:
+        if os.path.exists(init_file):
+            os.remove(init_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Measures the time saved per forward by the torch.fx graph passes.
+
+The benchmarked model is a stack of blocks with an unused branch, a
+duplicated subexpression and a projection of a parameter, which are
+respectively removed by dead-code elimination, common-subexpression
+elimination and constant folding.
+"""
+import argparse
+
+import torch
+import torch.utils._benchmark as benchmark_utils
+from torch.fx import symbolic_trace
+from torch.fx.passes import eliminate_common_subexpressions, eliminate_dead_code, fold_constants
+
+
+class Block(torch.nn.Module):
+    def __init__(self, width):
+        super().__init__()
+        self.lin = torch.nn.Linear(width, width)
+        self.proj = torch.nn.Linear(width, width)
+        self.debug = torch.nn.Linear(width, width)
+        self.table = torch.nn.Parameter(torch.randn(width, width))
+
+    def forward(self, x):
+        unused = self.debug(x).relu()
+        gate = torch.sigmoid(self.lin(x)) * torch.sigmoid(self.lin(x))
+        return torch.mm(gate, self.proj(self.table)) + x
+
+
+class Model(torch.nn.Module):
+    def __init__(self, width, depth):
+        super().__init__()
+        self.blocks = torch.nn.ModuleList([Block(width) for _ in range(depth)])
+
+    def forward(self, x):
+        for block in self.blocks:
+            x = block(x)
+        return x
+
+
+PASSES = {
+    'traced': lambda gm: gm,
+    'dce': eliminate_dead_code,
+    'cse': eliminate_common_subexpressions,
+    'fold': fold_constants,
+    'all': lambda gm: eliminate_dead_code(fold_constants(eliminate_common_subexpressions(gm))),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='torch.fx graph passes benchmark')
+    parser.add_argument('--width', type=int, default=256)
+    parser.add_argument('--depth', type=int, default=8)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32])
+    parser.add_argument('--num-threads', type=int, default=1)
+    parser.add_argument('--min-run-time', type=float, default=1.0)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.num_threads)
+    model = Model(args.width, args.depth).eval()
+    modules = {}
+    for name, transform in PASSES.items():
+        gm = transform(symbolic_trace(model))
+        modules[name] = gm
+        print('{:>8}: {} nodes'.format(name, len(gm.graph.nodes)))
+
+    results = []
+    with torch.no_grad():
+        for batch_size in args.batch_sizes:
+            x = torch.randn(batch_size, args.width)
+            expected = model(x)
+            for name, gm in modules.items():
+                assert torch.allclose(gm(x), expected, atol=1e-5)
+                timer = benchmark_utils.Timer(
+                    stmt='gm(x)',
+                    globals={'gm': gm, 'x': x},
+                    label='fx passes (width {}, depth {})'.format(args.width, args.depth),
+                    sub_label=name,
+                    description='batch {}'.format(batch_size),
+                    num_threads=args.num_threads,
+                )
+                results.append(timer.blocked_autorange(min_run_time=args.min_run_time))
+
+    benchmark_utils.Compare(results).print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Measures the time taken by torch.fx.symbolic_trace on deep models.
+
+Tracing is timed from scratch, from the in-memory graphs of a TraceCache,
+and from the graphs a TraceCache saved to disk, as seen by another process.
+"""
+import argparse
+import tempfile
+
+import torch
+import torch.utils._benchmark as benchmark_utils
+from torch.fx import TraceCache, symbolic_trace
+
+
+class Block(torch.nn.Module):
+    def __init__(self, width):
+        super().__init__()
+        self.lin = torch.nn.Linear(width, width)
+        self.norm = torch.nn.LayerNorm(width)
+
+    def forward(self, x):
+        return self.norm(torch.relu(self.lin(x)) + x)
+
+
+class Model(torch.nn.Module):
+    def __init__(self, width, depth):
+        super().__init__()
+        self.blocks = torch.nn.ModuleList([Block(width) for _ in range(depth)])
+
+    def forward(self, x):
+        for block in self.blocks:
+            x = block(x)
+        return x
+
+
+def main():
+    parser = argparse.ArgumentParser(description='torch.fx symbolic tracing benchmark')
+    parser.add_argument('--width', type=int, default=16)
+    parser.add_argument('--depths', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--min-run-time', type=float, default=1.0)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for depth in args.depths:
+            model = Model(args.width, depth)
+            cache = TraceCache(cache_dir)
+            print('depth {}: {} nodes'.format(depth, len(symbolic_trace(model, cache=cache).graph.nodes)))
+            stmts = {
+                'uncached': 'symbolic_trace(model)',
+                'memory cache': 'symbolic_trace(model, cache=cache)',
+                'disk cache': 'symbolic_trace(model, cache=TraceCache(cache_dir))',
+            }
+            for name, stmt in stmts.items():
+                timer = benchmark_utils.Timer(
+                    stmt=stmt,
+                    globals={'symbolic_trace': symbolic_trace, 'TraceCache': TraceCache, 'model': model,
+                             'cache': cache, 'cache_dir': cache_dir},
+                    label='symbolic_trace (width {})'.format(args.width),
+                    sub_label=name,
+                    description='depth {}'.format(depth),
+                )
+                results.append(timer.blocked_autorange(min_run_time=args.min_run_time))
+
+    benchmark_utils.Compare(results).print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import copy
+import json
 import math
 import os
 import random
@@ -10,6 +11,7 @@ import tempfile
 import threading
 import time
 import unittest
+import unittest.mock
 from datetime import timedelta
 from sys import platform
 from contextlib import contextmanager
@@ -3283,6 +3285,168 @@ class DistributedDataParallelTest(MultiProcessTestCase):
 
         self._run_and_verify_sparse_gradients(vanilla_model, ddp_model)
 
+    @requires_gloo()
+    def test_ddp_comm_hook_bucket_indices(self):
+        """
+        Checks that grad buckets passed to communication hooks describe the
+        parameters whose gradients they hold.
+        """
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        model = nn.Sequential(nn.Linear(16, 512), nn.ReLU(), nn.Linear(512, 512), nn.ReLU(), nn.Linear(512, 4))
+        ddp_model = DistributedDataParallel(model, process_group=process_group, bucket_cap_mb=0.5)
+        buckets = []
+
+        def hook(state, bucket):
+            buckets.append((bucket.get_index(), bucket.get_variable_indices(),
+                            bucket.get_offsets(), bucket.get_lengths(), bucket.get_tensors()[0].numel()))
+            fut = torch.futures.Future()
+            fut.set_result(bucket.get_tensors())
+            return fut
+
+        ddp_model._register_comm_hook(None, hook)
+        ddp_model(torch.randn(4, 16)).sum().backward()
+
+        params = list(model.parameters())
+        self.assertGreater(len(buckets), 1)
+        self.assertEqual([index for index, _, _, _, _ in buckets], list(range(len(buckets))))
+        self.assertEqual(sorted(i for _, indices, _, _, _ in buckets for i in indices), list(range(len(params))))
+        for _, indices, offsets, lengths, numel in buckets:
+            self.assertEqual(lengths, [params[i].numel() for i in indices])
+            self.assertEqual(offsets, [sum(lengths[:i]) for i in range(len(lengths))])
+            self.assertEqual(numel, sum(lengths))
+
+    @requires_gloo()
+    def test_ddp_overlapped_optimizer(self):
+        """
+        Checks that updating parameters as their buckets are reduced gives the
+        same parameters as stepping the optimizer after the backward pass.
+        """
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        for optimizer_class, kwargs in ((torch.optim.SGD, {'lr': 0.1, 'momentum': 0.9}),
+                                        (torch.optim.Adam, {'lr': 0.01, 'multi_tensor': True})):
+            torch.manual_seed(1337)
+            model = nn.Sequential(nn.Linear(16, 512), nn.ReLU(), nn.Linear(512, 512), nn.ReLU(), nn.Linear(512, 4))
+            ddp_model = DistributedDataParallel(
+                copy.deepcopy(model), process_group=process_group, bucket_cap_mb=0.5)
+            overlapped_model = DistributedDataParallel(
+                copy.deepcopy(model), process_group=process_group, bucket_cap_mb=0.5)
+            optimizer = optimizer_class(ddp_model.parameters(), **kwargs)
+            overlapped_optimizer = optimizer_class(overlapped_model.parameters(), **kwargs)
+            overlapped_model._register_overlapped_optimizer(overlapped_optimizer)
+
+            for i in range(4):
+                torch.manual_seed(self.rank * 100 + i)
+                input = torch.randn(8, 16)
+                optimizer.zero_grad()
+                ddp_model(input).sum().backward()
+                optimizer.step()
+                overlapped_optimizer.zero_grad()
+                overlapped_model(input).sum().backward()
+                for p, overlapped_p in zip(ddp_model.parameters(), overlapped_model.parameters()):
+                    self.assertEqual(p.grad, overlapped_p.grad)
+                    self.assertEqual(p, overlapped_p)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_fp16_compress(self):
+        """
+        Checks that gradients averaged in float16 are close to the gradients
+        averaged by DDP without a communication hook.
+        """
+        from torch.distributed.algorithms.ddp_comm_hooks import fp16_compress_hook
+
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        torch.manual_seed(1337)
+        model = nn.Sequential(nn.Linear(16, 64), nn.ReLU(), nn.Linear(64, 4))
+        ddp_model = DistributedDataParallel(copy.deepcopy(model), process_group=process_group)
+        fp16_model = DistributedDataParallel(copy.deepcopy(model), process_group=process_group)
+        fp16_model._register_comm_hook(process_group, fp16_compress_hook)
+
+        torch.manual_seed(self.rank)
+        input = torch.randn(8, 16)
+        ddp_model(input).sum().backward()
+        fp16_model(input).sum().backward()
+        for p, fp16_p in zip(ddp_model.parameters(), fp16_model.parameters()):
+            self.assertEqual(fp16_p.grad.dtype, torch.float)
+            self.assertEqual(p.grad, fp16_p.grad, rtol=1e-3, atol=1e-3)
+
+    def _test_compression_hook_error_feedback(self, process_group, state, hook, numel):
+        # With error feedback, no part of the gradients is lost: the sum of the
+        # averaged gradients returned by the hook plus the average error left
+        # over is the sum of the averaged gradients of all iterations.
+        torch.manual_seed(self.rank)
+        expected = torch.zeros(numel)
+        returned = torch.zeros(numel)
+        for _ in range(3):
+            grad = torch.randn(numel)
+            average = grad.clone()
+            process_group.allreduce([average]).wait()
+            expected += average / self.world_size
+            bucket = dist._GradBucket([grad], 0)
+            result = hook(state, bucket).wait()[0]
+            self.assertEqual(result.size(), (numel,))
+            returned += result
+        error = state.error_dict[0][:numel].clone()
+        process_group.allreduce([error]).wait()
+        self.assertEqual(returned + error / self.world_size, expected, rtol=1e-4, atol=1e-4)
+        # The approximation has lost something, which is in the error
+        self.assertNotEqual(returned, expected)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_powerSGD(self):
+        from torch.distributed.algorithms.ddp_comm_hooks import PowerSGDState, powerSGD_hook
+
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        with self.assertRaisesRegex(ValueError, "matrix_approximation_rank"):
+            PowerSGDState(process_group, matrix_approximation_rank=0)
+
+        state = PowerSGDState(process_group, matrix_approximation_rank=2)
+        self._test_compression_hook_error_feedback(process_group, state, powerSGD_hook, 1000)
+        self.assertEqual(state.q_memory_dict[0].size(), (32, 2))
+
+        # Buckets too small to be compressed are averaged exactly
+        grad = torch.full((6,), float(self.rank))
+        result = powerSGD_hook(state, dist._GradBucket([grad], 1)).wait()[0]
+        self.assertEqual(result, torch.full((6,), (self.world_size - 1) / 2.))
+
+        # Training with the hook gives gradients of the same shape
+        model = nn.Sequential(nn.Linear(16, 64), nn.ReLU(), nn.Linear(64, 4))
+        ddp_model = DistributedDataParallel(model, process_group=process_group)
+        ddp_model._register_comm_hook(PowerSGDState(process_group), powerSGD_hook)
+        ddp_model(torch.randn(8, 16)).sum().backward()
+        for p in ddp_model.parameters():
+            self.assertEqual(p.grad.size(), p.size())
+
+    @requires_gloo()
+    def test_ddp_comm_hook_topk(self):
+        from torch.distributed.algorithms.ddp_comm_hooks import TopKState, topk_hook
+
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        with self.assertRaisesRegex(ValueError, "compress_ratio"):
+            TopKState(process_group, compress_ratio=0)
+
+        state = TopKState(process_group, compress_ratio=0.1)
+        self._test_compression_hook_error_feedback(process_group, state, topk_hook, 1000)
+
+        # Each rank only contributes its largest gradient
+        state = TopKState(process_group, compress_ratio=0.25, use_error_feedback=False)
+        grad = torch.zeros(4)
+        grad[self.rank] = 1.
+        grad[-1] = 0.5
+        result = topk_hook(state, dist._GradBucket([grad], 0)).wait()[0]
+        expected = torch.zeros(4)
+        expected[:self.world_size] = 1. / self.world_size
+        self.assertEqual(result, expected)
+
 
 class ReducerModule(nn.Module):
     def __init__(self):
@@ -3748,6 +3912,261 @@ class CommTest(MultiProcessTestCase):
         self._test_broadcast_coalesced(process_group, device)
 
 
+@requires_gloo()
+class HierarchicalAllReduceTest(MultiProcessTestCase):
+    def setUp(self):
+        super(HierarchicalAllReduceTest, self).setUp()
+        self._fork_processes()
+
+    def tearDown(self):
+        super(HierarchicalAllReduceTest, self).tearDown()
+        try:
+            os.remove(self.file_name)
+        except OSError:
+            pass
+
+    @property
+    def world_size(self):
+        return 4
+
+    def _test_all_reduce(self, group):
+        tensor = torch.arange(7, dtype=torch.float).view(7, 1) * (self.rank + 1)
+        c10d.all_reduce(tensor, group=group)
+        self.assertEqual(tensor, torch.arange(7, dtype=torch.float).view(7, 1) * 10)
+
+        tensor = torch.full((3,), float(self.rank))
+        work = c10d.all_reduce(tensor, op=c10d.ReduceOp.MAX, group=group, async_op=True)
+        self.assertTrue(work.wait())
+        self.assertEqual(tensor, torch.full((3,), 3.))
+
+        tensors = [torch.full((2, 3), float(self.rank)), torch.ones(5), torch.empty(0)]
+        c10d.all_reduce_coalesced(tensors, group=group)
+        self.assertEqual(tensors[0], torch.full((2, 3), 6.))
+        self.assertEqual(tensors[1], torch.full((5,), 4.))
+
+    def test_hierarchical_all_reduce(self):
+        store = c10d.FileStore(self.file_name, self.world_size)
+        c10d.init_process_group('gloo', store=store, rank=self.rank, world_size=self.world_size)
+
+        group = c10d.new_hierarchical_group(local_world_size=2)
+        self.assertTrue(group.uniform)
+        self.assertEqual(group.node_ranks, [self.rank // 2 * 2, self.rank // 2 * 2 + 1])
+        self._test_all_reduce(group)
+
+        # All processes run on the same machine
+        group = c10d.new_hierarchical_group()
+        self.assertEqual(group.node_ranks, list(range(self.world_size)))
+        self._test_all_reduce(group)
+
+        with self.assertRaisesRegex(ValueError, "local_world_size"):
+            c10d.new_hierarchical_group(local_world_size=3)
+
+    def test_hierarchical_all_reduce_uneven_nodes(self):
+        store = c10d.FileStore(self.file_name, self.world_size)
+        c10d.init_process_group('gloo', store=store, rank=self.rank, world_size=self.world_size)
+
+        hostname = 'node0' if self.rank < 3 else 'node1'
+        with unittest.mock.patch('socket.gethostname', return_value=hostname):
+            group = c10d.new_hierarchical_group()
+        self.assertFalse(group.uniform)
+        self.assertEqual(group.node_ranks, [0, 1, 2] if self.rank < 3 else [3])
+        self._test_all_reduce(group)
+
+
+@requires_gloo()
+class CollectiveTracerTest(MultiProcessTestCase):
+    def setUp(self):
+        super(CollectiveTracerTest, self).setUp()
+        self._fork_processes()
+
+    def tearDown(self):
+        super(CollectiveTracerTest, self).tearDown()
+        try:
+            os.remove(self.file_name)
+        except OSError:
+            pass
+
+    @property
+    def world_size(self):
+        return 2
+
+    def test_collective_tracer(self):
+        from torch.distributed.collective_tracer import CollectiveTracer
+
+        store = c10d.FileStore(self.file_name, self.world_size)
+        c10d.init_process_group('gloo', store=store, rank=self.rank, world_size=self.world_size)
+
+        hierarchical_group = c10d.new_hierarchical_group(local_world_size=1)
+        with CollectiveTracer() as tracer:
+            for _ in range(3):
+                c10d.all_reduce(torch.ones(256))
+            c10d.broadcast(torch.ones(4, dtype=torch.float64), 0)
+            c10d.all_reduce(torch.ones(8), async_op=True).wait()
+            # Collectives called by collectives are part of the outermost one
+            c10d.all_reduce(torch.ones(8), group=hierarchical_group)
+            objects = [None] * self.world_size
+            c10d.all_gather_object(objects, self.rank)
+            if self.rank == 0:
+                c10d.send(torch.ones(2), 1)
+            else:
+                c10d.recv(torch.ones(2), 0)
+        c10d.all_reduce(torch.ones(1))
+
+        stats = tracer.stats()
+        world_name = c10d.distributed_c10d._get_group_name(c10d.group.WORLD)
+        all_reduce_stats = stats[('all_reduce', world_name)]
+        self.assertEqual(all_reduce_stats.count, 4)
+        self.assertEqual(all_reduce_stats.total_bytes, 3 * 256 * 4 + 8 * 4)
+        self.assertEqual(all_reduce_stats.size_histogram, {1024: 3, 32: 1})
+        self.assertEqual(sum(all_reduce_stats.latency_histogram.values()), 4)
+        self.assertEqual(stats[('broadcast', world_name)].total_bytes, 32)
+        self.assertEqual(stats[('all_reduce', 'hierarchical')].count, 1)
+        self.assertEqual(stats[('all_gather_object', world_name)].count, 1)
+        p2p_name = 'send' if self.rank == 0 else 'recv'
+        self.assertEqual(stats[(p2p_name, world_name)].total_bytes, 8)
+        self.assertEqual(set(name for name, _ in stats), {'all_reduce', 'broadcast', 'all_gather_object', p2p_name})
+        # Point-to-point operations are not numbered
+        self.assertIsNone(tracer.records[-1].seq)
+        world_records = [r for r in tracer.records if r.group == world_name and r.seq is not None]
+        self.assertEqual([r.seq for r in world_records], list(range(len(world_records))))
+        self.assertEqual([r.async_op for r in tracer.records][:5], [False] * 4 + [True])
+        self.assertIn('all_reduce', tracer.summary())
+
+        trace_file = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        trace_file.close()
+        try:
+            tracer.export_chrome_trace(trace_file.name)
+            with open(trace_file.name) as f:
+                events = json.load(f)
+        finally:
+            os.remove(trace_file.name)
+        self.assertEqual(len(events), len(tracer.records))
+        self.assertEqual(events[0]['name'], 'all_reduce')
+        self.assertEqual(events[0]['args']['bytes'], 1024)
+        self.assertNotIn('seq', events[-1]['args'])
+
+    def test_collective_tracer_skew(self):
+        from torch.distributed.collective_tracer import CollectiveTracer
+
+        store = c10d.FileStore(self.file_name, self.world_size)
+        c10d.init_process_group('gloo', store=store, rank=self.rank, world_size=self.world_size)
+
+        with CollectiveTracer() as tracer, torch.autograd.profiler.profile() as prof:
+            for i in range(4):
+                # Rank 1 arrives late to the even calls, and rank 0 to the others
+                if self.rank == (1 if i % 2 == 0 else 0):
+                    time.sleep(0.2)
+                c10d.all_reduce(torch.ones(16))
+        late = tracer.compute_skew()
+        self.assertEqual([count for count, _ in late], [2, 2])
+        self.assertGreater(late[1][1], 2 * 0.1 * 1e6)
+        self.assertEqual([r.late_rank for r in tracer.records], [1, 0, 1, 0])
+
+        tracer.annotate(prof.function_events)
+        events = [evt for evt in prof.function_events if evt.name == 'c10d::all_reduce']
+        self.assertEqual(len(events), 4)
+        self.assertEqual(events[0].trace_args['bytes'], 64)
+        self.assertEqual(events[0].trace_args['late_rank'], 1)
+
+
+@requires_gloo()
+class ZeroRedundancyOptimizerTest(MultiProcessTestCase):
+    def setUp(self):
+        super(ZeroRedundancyOptimizerTest, self).setUp()
+        self._fork_processes()
+
+    def tearDown(self):
+        super(ZeroRedundancyOptimizerTest, self).tearDown()
+        try:
+            os.remove(self.file_name)
+        except OSError:
+            pass
+
+    @property
+    def world_size(self):
+        return 2
+
+    def _init_process_group(self):
+        store = c10d.FileStore(self.file_name, self.world_size)
+        c10d.init_process_group('gloo', store=store, rank=self.rank, world_size=self.world_size)
+
+    def _params(self):
+        torch.manual_seed(1337)
+        model = nn.Sequential(nn.Linear(8, 32), nn.ReLU(), nn.Linear(32, 16), nn.ReLU(), nn.Linear(16, 2))
+        return [
+            {'params': list(model[0].parameters()) + list(model[2].parameters())},
+            {'params': list(model[4].parameters()), 'lr': 0.1},
+        ]
+
+    def _step(self, optimizer, params, seed):
+        # Same gradients on all ranks, as after the backward pass of DDP
+        torch.manual_seed(seed)
+        for p in params:
+            p.grad = torch.randn_like(p)
+        optimizer.step()
+
+    def test_zero_redundancy_optimizer_step(self):
+        from torch.distributed.optim import ZeroRedundancyOptimizer
+
+        self._init_process_group()
+        param_groups = self._params()
+        params = [p for group in param_groups for p in group['params']]
+        optimizer = torch.optim.Adam(param_groups, lr=0.01)
+        zero_param_groups = copy.deepcopy(param_groups)
+        zero_params = [p for group in zero_param_groups for p in group['params']]
+        zero_optimizer = ZeroRedundancyOptimizer(zero_param_groups, torch.optim.Adam, lr=0.01)
+
+        self.assertEqual([group['lr'] for group in zero_optimizer.param_groups], [0.01, 0.1])
+        self.assertEqual(zero_optimizer.param_groups[0]['betas'], (0.9, 0.999))
+        local_params = [p for group in zero_optimizer.optim.param_groups for p in group['params']]
+        self.assertGreater(len(local_params), 0)
+        self.assertLess(len(local_params), len(zero_params))
+        all_local_params = [None] * self.world_size
+        c10d.all_gather_object(all_local_params, [zero_params.index(p) for p in local_params])
+        self.assertEqual(sorted(i for indices in all_local_params for i in indices), list(range(len(params))))
+
+        for i in range(3):
+            if i == 2:
+                for opt in (optimizer, zero_optimizer):
+                    opt.param_groups[1]['lr'] = 0.05
+            self._step(optimizer, params, i)
+            self._step(zero_optimizer, zero_params, i)
+            self.assertEqual(params, zero_params)
+        # Only the params of this rank have state
+        self.assertEqual(set(zero_optimizer.optim.state.keys()), set(local_params))
+
+    def test_zero_redundancy_optimizer_state_dict(self):
+        from torch.distributed.optim import ZeroRedundancyOptimizer
+
+        self._init_process_group()
+        param_groups = self._params()
+        params = [p for group in param_groups for p in group['params']]
+        optimizer = torch.optim.Adam(param_groups, lr=0.01)
+        zero_param_groups = copy.deepcopy(param_groups)
+        zero_params = [p for group in zero_param_groups for p in group['params']]
+        zero_optimizer = ZeroRedundancyOptimizer(zero_param_groups, torch.optim.Adam, lr=0.01)
+        for i in range(2):
+            self._step(optimizer, params, i)
+            self._step(zero_optimizer, zero_params, i)
+
+        zero_optimizer.consolidate_state_dict(to=0)
+        if self.rank == 0:
+            self.assertEqual(zero_optimizer.state_dict(), optimizer.state_dict())
+        else:
+            with self.assertRaisesRegex(RuntimeError, "consolidate_state_dict"):
+                zero_optimizer.state_dict()
+
+        # Load the state of the regular optimizer into a new one
+        loaded_param_groups = copy.deepcopy(param_groups)
+        loaded_params = [p for group in loaded_param_groups for p in group['params']]
+        loaded_optimizer = ZeroRedundancyOptimizer(loaded_param_groups, torch.optim.Adam, lr=0.5)
+        loaded_optimizer.load_state_dict(optimizer.state_dict())
+        self.assertEqual(loaded_optimizer.param_groups[0]['lr'], 0.01)
+        self._step(optimizer, params, 2)
+        self._step(loaded_optimizer, loaded_params, 2)
+        self.assertEqual(params, loaded_params)
+
+
 if __name__ == '__main__':
     assert not torch.cuda._initialized, "test_distributed must not have initialized CUDA context on main process"
 
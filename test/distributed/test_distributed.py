@@ -2660,6 +2660,59 @@ class _DistTestBase(object):
                 dst=gather_on_rank,
             )
 
+    def _coalesced_objects(self, rank):
+        f = Foo(rank)
+        f.bar = 1
+        return [
+            torch.arange(rank + 3, dtype=torch.float).view(-1, 1),
+            {"weight": torch.full((2, 2), rank, dtype=torch.int64), "mask": torch.tensor([True, False])},
+            {"key1": rank, "key2": {"nested": True}},
+            f,
+            torch.tensor(rank + 0.5, dtype=torch.float64),
+            {},
+        ]
+
+    @require_backend({"nccl", "gloo"})
+    @require_n_gpus_for_nccl_backend(int(os.environ["WORLD_SIZE"]), os.environ["BACKEND"])
+    def test_allgather_object_coalesced(self):
+        for size in (0, 10000, 10):
+            # A large tensor on the last rank grows the buffers of all ranks
+            large = torch.ones(size if self.rank == dist.get_world_size() - 1 else 1)
+            output_gathered = [None for _ in range(dist.get_world_size())]
+            dist.all_gather_object_coalesced(output_gathered, self._coalesced_objects(self.rank) + [large])
+            for i, objects in enumerate(output_gathered):
+                expected_size = size if i == dist.get_world_size() - 1 else 1
+                self.assertEqual(objects, self._coalesced_objects(i) + [torch.ones(expected_size)])
+
+        # The buffers shrink back once the large messages are gone
+        buffers = dist.distributed_c10d._get_object_buffers(dist.group.WORLD)
+        grown_capacity = buffers.capacity
+        for _ in range(dist.distributed_c10d._OBJECT_BUFFER_SHRINK_CALLS):
+            output_gathered = [None for _ in range(dist.get_world_size())]
+            dist.all_gather_object_coalesced(output_gathered, self._coalesced_objects(self.rank))
+            self.assertEqual(output_gathered, [self._coalesced_objects(i) for i in range(dist.get_world_size())])
+        self.assertLess(buffers.capacity, grown_capacity)
+
+    @require_backend({"gloo"})
+    @unittest.skipIf(BACKEND == "nccl", "NCCL does not support gather")
+    def test_gather_object_coalesced(self):
+        gather_on_rank = 0
+        my_rank = dist.get_rank()
+        for size in (0, 10000, 10):
+            large = torch.ones(size if self.rank == dist.get_world_size() - 1 else 1)
+            output_gathered = [None for _ in range(dist.get_world_size())]
+            dist.gather_object_coalesced(
+                self._coalesced_objects(self.rank) + [large],
+                output_object_lists=output_gathered if my_rank == gather_on_rank else None,
+                dst=gather_on_rank,
+            )
+            if my_rank != gather_on_rank:
+                self.assertEqual(output_gathered, [None for _ in range(dist.get_world_size())])
+                continue
+            for i, objects in enumerate(output_gathered):
+                expected_size = size if i == dist.get_world_size() - 1 else 1
+                self.assertEqual(objects, self._coalesced_objects(i) + [torch.ones(expected_size)])
+
     @require_backend({"nccl"})
     @require_backends_available({"nccl"})
     @skip_if_lt_x_gpu(2)
@@ -26,7 +26,8 @@ from torch.autograd.gradcheck import gradgradcheck, gradcheck
 from torch.autograd.function import once_differentiable
 from torch.autograd.profiler import (profile, format_time, EventList,
                                      FunctionEvent, FunctionEventAvg,
-                                     record_function, emit_nvtx)
+                                     record_function, emit_nvtx, scheduled_profile,
+                                     streaming_profile)
 import torch.autograd.functional as autogradF
 from torch.utils.checkpoint import checkpoint
 from torch.testing._internal.common_utils import (TEST_MKL, TEST_WITH_ROCM, TestCase, run_tests, skipIfNoLapack,
@@ -2754,6 +2755,75 @@ class TestAutograd(TestCase):
             # Now validate the json
             json.load(f)
 
+    @unittest.skipIf(IS_WINDOWS, """File open permission error on Windows,
+            https://github.com/pytorch/pytorch/issues/34086""")
+    def test_streaming_profiler(self):
+        x = torch.randn(10, 10)
+        with tempfile.NamedTemporaryFile(mode="w+") as f:
+            with streaming_profile(f.name, flush_every_steps=2, max_events=5) as prof:
+                for _ in range(5):
+                    torch.mm(x, x)
+                    torch.add(x, x)
+                    prof.step()
+            # two full windows flushed by step() and the last one on exit
+            self.assertEqual(prof.num_flushes, 3)
+            trace = json.load(f)
+
+        names = [evt["name"] for evt in trace]
+        self.assertEqual(names.count("aten::mm"), 5)
+        self.assertEqual(names.count("aten::add"), 5)
+        starts = [evt["ts"] for evt in trace if evt["name"] == "aten::mm"]
+        self.assertEqual(starts, sorted(starts))
+
+        averages = {evt.key: evt for evt in prof.key_averages()}
+        self.assertEqual(averages["aten::mm"].count, 5)
+        self.assertEqual(averages["aten::add"].count, 5)
+        self.assertEqual(len(prof.recent_events()), 5)
+        self.assertEqual(prof.recent_events()[-1].name, trace[-1]["name"])
+
+        with tempfile.NamedTemporaryFile(mode="w+") as f:
+            with streaming_profile(f.name):
+                pass
+            self.assertEqual(json.load(f), [])
+
+    def test_profiler_schedule(self):
+        schedule_fn = torch.autograd.profiler.schedule(wait=1, warmup=1, active=2, repeat=2)
+        A = torch.autograd.profiler.ProfilerAction
+        self.assertEqual(
+            [schedule_fn(step) for step in range(10)],
+            [A.NONE, A.WARMUP, A.RECORD, A.RECORD_AND_SAVE] * 2 + [A.NONE] * 2)
+        with self.assertRaises(ValueError):
+            torch.autograd.profiler.schedule(wait=0, warmup=0, active=0)
+
+        x = torch.randn(10, 10)
+        windows = []
+
+        def on_trace_ready(prof):
+            windows.append([evt.name for evt in prof.function_events])
+
+        with scheduled_profile(schedule_fn, on_trace_ready=on_trace_ready) as prof:
+            for _ in range(10):
+                torch.mm(x, x)
+                prof.step()
+
+        self.assertEqual(len(windows), 2)
+        for names, steps in zip(windows, [(2, 3), (6, 7)]):
+            # the warmup step is discarded
+            self.assertEqual(names.count("aten::mm"), 2)
+            self.assertEqual(
+                [name for name in names if name.startswith("ProfilerStep#")],
+                ["ProfilerStep#{}".format(step) for step in steps])
+
+        # a window cut short by the end of the run is still reported
+        windows.clear()
+        schedule_fn = torch.autograd.profiler.schedule(wait=0, warmup=0, active=5)
+        with scheduled_profile(schedule_fn, on_trace_ready=on_trace_ready) as prof:
+            for _ in range(2):
+                torch.mm(x, x)
+                prof.step()
+        self.assertEqual(len(windows), 1)
+        self.assertEqual(windows[0].count("aten::mm"), 2)
+
     def test_profiler(self):
         x = torch.randn(10, 10)
 
@@ -247,6 +247,60 @@ class TestTensorDataset(TestCase):
             self.assertEqual(t2[i], source[i][2])
             self.assertEqual(t3[i], source[i][3])
 
+    def test_getitems(self):
+        t = torch.randn(15, 10, 2)
+        l = torch.randperm(15)
+        source = TensorDataset(t, l)
+        indices = [3, 0, 14, 3]
+        samples = source.__getitems__(indices)
+        self.assertEqual(len(samples), len(indices))
+        for i, sample in zip(indices, samples):
+            self.assertEqual(sample, source[i])
+
+        subset = torch.utils.data.Subset(source, [14, 13, 12, 11])
+        for i, sample in zip([1, 3], subset.__getitems__([1, 3])):
+            self.assertEqual(sample, subset[i])
+
+
+class BatchedFetchDataset(Dataset):
+    def __init__(self, n):
+        super(BatchedFetchDataset, self).__init__()
+        self.n = n
+        self.batches = []
+
+    def __getitem__(self, i):
+        raise AssertionError('__getitem__ should not be called')
+
+    def __getitems__(self, indices):
+        self.batches.append(list(indices))
+        return [i * 2 for i in indices]
+
+    def __len__(self):
+        return self.n
+
+
+@unittest.skipIf(
+    TEST_WITH_TSAN,
+    "Fails with TSAN with the following error: starting new threads after multi-threaded "
+    "fork is not supported. Dying (set die_after_fork=0 to override)")
+class TestBatchedFetch(TestCase):
+    def test_getitems_is_used(self):
+        dataset = BatchedFetchDataset(10)
+        loader = DataLoader(dataset, batch_size=4)
+        self.assertEqual([b.tolist() for b in loader], [[0, 2, 4, 6], [8, 10, 12, 14], [16, 18]])
+        self.assertEqual(dataset.batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+    def test_getitems_workers(self):
+        loader = DataLoader(BatchedFetchDataset(10), batch_size=3, num_workers=2)
+        self.assertEqual(torch.cat(list(loader)).tolist(), list(range(0, 20, 2)))
+
+    def test_tensor_dataset(self):
+        t = torch.randn(10, 3)
+        l = torch.arange(10)
+        loader = DataLoader(TensorDataset(t, l), batch_size=4, shuffle=True)
+        for data, label in loader:
+            self.assertEqual(data, t[label])
+
 
 @unittest.skipIf(
     TEST_WITH_TSAN,
@@ -741,6 +795,11 @@ class BulkLoadingSampler(torch.utils.data.Sampler):
         return int(math.ceil(len(self.dataset) / float(self.batch_size)))
 
 
+# Returns a non-contiguous tensor that has to be copied into the slab
+def _transposing_collate(batch):
+    return {'data': [torch.stack([d for d, _ in batch]).transpose(0, 1)], 'name': 'batch', 'count': len(batch)}
+
+
 @unittest.skipIf(
     TEST_WITH_TSAN,
     "Fails with TSAN with the following error: starting new threads after multi-threaded "
@@ -1282,6 +1341,139 @@ except RuntimeError as e:
     def test_seqential_batch_workers_prefetch(self):
         self._test_sequential(DataLoader(self.dataset, batch_size=2, num_workers=4, prefetch_factor=3))
 
+    @unittest.skipIf(not TEST_NUMPY, "numpy unavailable")
+    def test_seqential_batch_workers_slab(self):
+        # Every batch fits in a slab
+        self._test_sequential(DataLoader(self.dataset, batch_size=2, num_workers=4, slab_size=1 << 16))
+        # Batches do not fit and take the regular shared memory path
+        self._test_sequential(DataLoader(self.dataset, batch_size=2, num_workers=4, slab_size=16))
+        if not NO_MULTIPROCESSING_SPAWN and torch.multiprocessing._supports_context:
+            self._test_sequential(DataLoader(self.dataset, batch_size=2, num_workers=2, slab_size=1 << 16,
+                                             multiprocessing_context='spawn'))
+
+    @unittest.skipIf(not TEST_NUMPY, "numpy unavailable")
+    def test_slab_custom_collate(self):
+        loader = DataLoader(self.dataset, batch_size=4, num_workers=2, slab_size=1 << 16,
+                            collate_fn=_transposing_collate)
+        for i, batch in enumerate(loader):
+            self.assertEqual(batch['data'][0], self.data[i * 4:(i + 1) * 4].transpose(0, 1))
+            self.assertEqual(batch['name'], 'batch')
+            self.assertEqual(batch['count'], 4)
+        self.assertEqual(i, len(self.dataset) // 4 - 1)
+
+    def test_slab_invalid_args(self):
+        with self.assertRaisesRegex(ValueError, 'multiprocessing'):
+            DataLoader(self.dataset, slab_size=1024)
+        with self.assertRaisesRegex(ValueError, 'positive'):
+            DataLoader(self.dataset, num_workers=2, slab_size=0)
+
+    @unittest.skipIf(not TEST_CUDA, "CUDA unavailable")
+    @unittest.skipIf(not TEST_NUMPY, "numpy unavailable")
+    def test_slab_pin_memory(self):
+        loader = DataLoader(self.dataset, batch_size=2, num_workers=4, pin_memory=True, slab_size=1 << 16)
+        for i, (input, target) in enumerate(loader):
+            self.assertTrue(input.is_pinned())
+            self.assertTrue(target.is_pinned())
+            self.assertEqual(input, self.data[i * 2:i * 2 + 2])
+
+    def test_persistent_workers(self):
+        loader = DataLoader(self.dataset, batch_size=2, num_workers=4, persistent_workers=True)
+        self._test_sequential(loader)
+        it = loader._iterator
+        workers = list(it._workers)
+        # The first tasks of the next epoch were sent while the first one drained
+        self.assertEqual(it._next_epoch_start, len(loader))
+        for _ in range(2):
+            self._test_sequential(loader)
+            self.assertIs(loader._iterator, it)
+            self.assertEqual(it._workers, workers)
+            self.assertTrue(all(w.is_alive() for w in workers))
+
+        # Restarting in the middle of an epoch discards the outstanding tasks
+        next(iter(loader))
+        self._test_sequential(loader)
+
+        self._test_shuffle(DataLoader(self.dataset, batch_size=2, shuffle=True, num_workers=4,
+                                      persistent_workers=True))
+
+        with self.assertRaisesRegex(ValueError, 'num_workers > 0'):
+            DataLoader(self.dataset, persistent_workers=True)
+
+    def test_persistent_workers_set_epoch(self):
+        sampler = torch.utils.data.distributed.DistributedSampler(self.dataset, num_replicas=1, rank=0)
+        loader = DataLoader(self.dataset, batch_size=2, num_workers=2, sampler=sampler, persistent_workers=True)
+        epochs = []
+        for epoch in range(2):
+            sampler.set_epoch(epoch)
+            epochs.append(torch.cat([target for _, target in loader]))
+            # Sampler implements `set_epoch`, so the next epoch was not started early
+            self.assertIsNone(loader._iterator._next_epoch_start)
+        for epoch, targets in enumerate(epochs):
+            sampler.set_epoch(epoch)
+            self.assertEqual(targets, self.labels[list(sampler)])
+
+    def test_persistent_workers_iterable(self):
+        dataset = CountingIterableDataset(20)
+        loader = DataLoader(dataset, num_workers=2, persistent_workers=True, batch_size=None)
+        for _ in range(3):
+            fetched = sorted(int(d) for d in loader)
+            self.assertEqual(fetched, sorted(list(range(20)) * 2))
+
+    def _run_adapt_window(self, it, wait_fraction):
+        # Ends an adaptation window in which the main process spent
+        # `wait_fraction` of the time waiting for batches, instead of relying
+        # on the actual timings
+        window = 1000.
+        it._window_start = time.perf_counter() - window
+        it._window_wait_time = wait_fraction * window
+        it._window_batches = it._ADAPT_WINDOW * it._active_workers - 1
+        it._update_prefetch()
+        return it.prefetch_stats()
+
+    def test_adaptive_prefetch_grow(self):
+        # The main process keeps waiting on the workers, so prefetching deepens
+        loader = DataLoader(self.dataset, batch_size=2, num_workers=2, prefetch_factor=1, max_prefetch_factor=4)
+        it = iter(loader)
+        self.assertEqual(it.prefetch_stats()['prefetch_depth'], 2)
+        depths = []
+        for _ in range(4):
+            stats = self._run_adapt_window(it, 0.5)
+            depths.append(stats['prefetch_depth'])
+            self.assertEqual(stats['active_workers'], 2)
+        self.assertEqual(depths, [4, 6, 8, 8])
+        self.assertEqual(stats['num_adjustments'], 3)
+        self.assertGreater(stats['wait_time'], 0)
+        self.assertAlmostEqual(stats['wait_fraction'], 0.5, places=3)
+        for i, (input, _) in enumerate(it):
+            self.assertEqual(input, self.data[i * 2:i * 2 + 2])
+        self.assertEqual(i, len(loader) - 1)
+
+    def test_adaptive_prefetch_shrink(self):
+        # Batches are always ready for a slow consumer, so fewer workers are used
+        loader = DataLoader(self.dataset, batch_size=2, num_workers=3, max_prefetch_factor=2, min_workers=1)
+        it = iter(loader)
+        self.assertEqual(it.prefetch_stats()['prefetch_depth'], 6)
+        adjustments = []
+        for _ in range(4):
+            stats = self._run_adapt_window(it, 0.)
+            adjustments.append((stats['active_workers'], stats['prefetch_depth']))
+        self.assertEqual(adjustments, [(2, 4), (1, 2), (1, 1), (1, 1)])
+        for i, (input, _) in enumerate(it):
+            self.assertEqual(input, self.data[i * 2:i * 2 + 2])
+        self.assertEqual(i, len(loader) - 1)
+
+    def test_adaptive_prefetch_invalid_args(self):
+        with self.assertRaisesRegex(ValueError, 'multiprocessing'):
+            DataLoader(self.dataset, max_prefetch_factor=4)
+        with self.assertRaisesRegex(ValueError, 'at least prefetch_factor'):
+            DataLoader(self.dataset, num_workers=2, prefetch_factor=4, max_prefetch_factor=2)
+        with self.assertRaisesRegex(ValueError, 'requires max_prefetch_factor'):
+            DataLoader(self.dataset, num_workers=2, min_workers=1)
+        with self.assertRaisesRegex(ValueError, r'\[1, num_workers\]'):
+            DataLoader(self.dataset, num_workers=2, max_prefetch_factor=4, min_workers=3)
+        with self.assertRaisesRegex(ValueError, 'IterableDataset'):
+            DataLoader(CountingIterableDataset(20), num_workers=2, max_prefetch_factor=4, min_workers=1)
+
     def test_shuffle_workers(self):
         self._test_shuffle(DataLoader(self.dataset, shuffle=True, num_workers=4))
 
@@ -1370,6 +1562,74 @@ except RuntimeError as e:
 
         self.assertEqual(scanned_data.size(), scanned_data.unique().size())
 
+    def test_distributed_sampler_lazy(self):
+        from torch.utils.data.distributed import DistributedSampler
+
+        for size, num_replicas, drop_last in [(100, 4, False), (101, 4, False), (101, 4, True), (3, 5, False)]:
+            data_set = list(range(size))
+            for shuffle in (False, True):
+                shards = [list(DistributedSampler(data_set, num_replicas, rank, shuffle=shuffle,
+                                                  drop_last=drop_last, lazy=True))
+                          for rank in range(num_replicas)]
+                eager = [list(DistributedSampler(data_set, num_replicas, rank, shuffle=shuffle,
+                                                 drop_last=drop_last))
+                         for rank in range(num_replicas)]
+                self.assertEqual([len(shard) for shard in shards], [len(shard) for shard in eager])
+                if not shuffle:
+                    self.assertEqual(shards, eager)
+                flat = sum(shards, [])
+                if drop_last:
+                    self.assertEqual(len(set(flat)), len(flat))
+                else:
+                    self.assertEqual(set(flat), set(data_set))
+
+        sampler = DistributedSampler(list(range(1000)), 2, 0, lazy=True)
+        first = list(sampler)
+        self.assertNotEqual(first, sorted(first))
+        self.assertEqual(list(sampler), first)
+        sampler.set_epoch(1)
+        self.assertNotEqual(list(sampler), first)
+
+    def test_distributed_sampler_resume(self):
+        from torch.utils.data.distributed import DistributedSampler
+
+        data_set = list(range(100))
+        for lazy in (False, True):
+            sampler = DistributedSampler(data_set, 2, 1, seed=3, lazy=lazy)
+            sampler.set_epoch(5)
+            expected = list(sampler)
+            it = iter(sampler)
+            consumed = [next(it) for _ in range(20)]
+            state = sampler.state_dict()
+            self.assertEqual(state['epoch'], 5)
+            self.assertEqual(state['start_index'], 20)
+
+            resumed = DistributedSampler(data_set, 2, 1, seed=3, lazy=lazy)
+            resumed.load_state_dict(state)
+            # Setting the same epoch again keeps the position
+            resumed.set_epoch(5)
+            self.assertEqual(consumed + list(resumed), expected)
+            # The position only applies to the first iteration
+            self.assertEqual(list(resumed), expected)
+
+            resumed.load_state_dict(state)
+            resumed.set_epoch(6)
+            self.assertEqual(len(list(resumed)), len(expected))
+
+            # A checkpoint taken after moving to a new epoch, before iterating
+            # it, resumes from the start of that epoch
+            sampler.set_epoch(7)
+            state = sampler.state_dict()
+            self.assertEqual(state['epoch'], 7)
+            self.assertEqual(state['start_index'], 0)
+            resumed = DistributedSampler(data_set, 2, 1, seed=3, lazy=lazy)
+            resumed.load_state_dict(state)
+            resumed.set_epoch(7)
+            self.assertEqual(list(resumed), list(sampler))
+
+        with self.assertRaisesRegex(ValueError, 'num_replicas'):
+            DistributedSampler(data_set, 4, 1, seed=3).load_state_dict(state)
+
     def test_sampler_reproducibility(self):
         from torch.utils.data import RandomSampler, WeightedRandomSampler, SubsetRandomSampler
 
@@ -1783,6 +2043,46 @@ except RuntimeError as e:
             _utils.worker._worker_info = old
 
 
+    @unittest.skipIf(not TEST_NUMPY, "numpy unavailable")
+    def test_default_collate_plan(self):
+        import numpy as np
+        from collections import namedtuple
+        Point = namedtuple('Point', ['x', 'y'])
+        batch = [{'image': np.full((2, 3), i, dtype=np.float32), 'label': i, 'name': str(i),
+                  'point': Point(np.int64(i), float(i)), 'pair': [torch.tensor([i]), np.array([i, i])]}
+                 for i in range(4)]
+        collated = _utils.collate.default_collate(batch)
+        expected = _utils.collate._collate(batch)
+        self.assertEqual(list(collated), ['image', 'label', 'name', 'point', 'pair'])
+        self.assertEqual(collated['image'], expected['image'])
+        self.assertEqual(collated['image'].dtype, torch.float32)
+        self.assertEqual(collated['label'], expected['label'])
+        self.assertEqual(collated['name'], expected['name'])
+        self.assertIsInstance(collated['point'], Point)
+        self.assertEqual(collated['point'], expected['point'])
+        self.assertEqual(collated['pair'], expected['pair'])
+
+        # The plan is reused for batches of the same structure
+        plan = _utils.collate._cached_plan
+        _utils.collate.default_collate(batch[::-1])
+        self.assertIs(_utils.collate._cached_plan, plan)
+
+        # Samples not matching the plan of the first one go through the generic path
+        batch[1]['image'] = np.zeros((3, 2), dtype=np.float32)
+        self.assertRaises(RuntimeError, lambda: _utils.collate.default_collate(batch))
+        arrays = [np.zeros(2, dtype=np.float32), np.zeros(3, dtype=np.float32)]
+        self.assertRaises(RuntimeError, lambda: _utils.collate.default_collate(arrays))
+
+        old = _utils.worker._worker_info
+        try:
+            _utils.worker._worker_info = 'x'
+            collated = _utils.collate.default_collate([np.arange(6).reshape(2, 3)] * 2)
+            self.assertTrue(collated.is_shared())
+            self.assertEqual(collated, torch.arange(6).view(2, 3).expand(2, 2, 3))
+        finally:
+            _utils.worker._worker_info = old
+
+
 class StringDataset(Dataset):
     def __init__(self):
         self.s = '12345'
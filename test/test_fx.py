@@ -1,6 +1,11 @@
+import operator
+import pickle
+import tempfile
 import torch
 import unittest
-from torch.fx import symbolic_trace, Proxy, Node, GraphModule, DefaultDelegate
+from torch.fx import symbolic_trace, Proxy, Node, GraphModule, DefaultDelegate, Graph, TraceCache
+from torch.fx.passes import (Pipeline, ShapeProp, apply_memory_plan, eliminate_common_subexpressions,
+                             eliminate_dead_code, estimate_costs, fold_constants, fuse, plan_memory, split_module)
 
 from fx.quantization import Quantizer
 
@@ -156,6 +161,371 @@ class TestFX(TestCase):
         gm = GraphModule(m, g)
         self.assertEqual(gm(3, 4), 14)
 
+    def test_dead_code_elimination(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.lin = torch.nn.Linear(4, 4)
+
+            def forward(self, x):
+                unused = self.lin(x).relu()
+                y = x.clone()
+                y.add_(1)
+                return x + y
+
+        m = M()
+        gm = eliminate_dead_code(symbolic_trace(m))
+        self.assertEqual([n.target for n in gm.graph.nodes if n.op != 'placeholder'][:2], ['clone', 'add_'])
+        for node in gm.graph.nodes:
+            self.assertNotEqual(node.op, 'call_module')
+            self.assertNotEqual(node.target, 'relu')
+        x = torch.rand(3, 4)
+        self.assertEqual(gm(x), m(x))
+
+    def test_common_subexpression_elimination(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w = torch.nn.Parameter(torch.rand(4))
+
+            def forward(self, x):
+                a = torch.sigmoid(x) + self.w
+                b = torch.sigmoid(x) + self.w
+                y, z = x.relu(), x.relu()
+                y.add_(1)
+                return a * b, y + z, torch.rand_like(x), torch.rand_like(x)
+
+        m = M()
+        gm = eliminate_common_subexpressions(symbolic_trace(m))
+        targets = [n.target for n in gm.graph.nodes]
+        self.assertEqual(targets.count(torch.sigmoid), 1)
+        self.assertEqual(targets.count('w'), 1)
+        # the input of the in-place add is not merged
+        self.assertEqual(targets.count('relu'), 2)
+        self.assertEqual(targets.count(torch.rand_like), 2)
+        x = torch.rand(3, 4)
+        out, ref_out = gm(x), m(x)
+        self.assertEqual(out[:2], ref_out[:2])
+        self.assertNotEqual(out[2], out[3])
+
+        class Update(torch.nn.Module):
+            def forward(self, x):
+                y = x + 1
+                x.add_(1)
+                z = x + 1
+                return y, z
+
+        m = Update()
+        gm = eliminate_common_subexpressions(symbolic_trace(m))
+        # the nodes on either side of the in-place add are not merged
+        self.assertEqual([n.target for n in gm.graph.nodes].count(operator.add), 2)
+        x = torch.rand(3, 4)
+        self.assertEqual(gm(x.clone()), m(x.clone()))
+
+        class UpdateView(torch.nn.Module):
+            def forward(self, x):
+                y, z = x.relu(), x.relu()
+                y[0].add_(1)
+                y.view(-1).add_(1)
+                return z
+
+        m = UpdateView()
+        gm = eliminate_common_subexpressions(symbolic_trace(m))
+        # the views of y are updated in place, so y and z are not merged
+        self.assertEqual([n.target for n in gm.graph.nodes].count('relu'), 2)
+        self.assertEqual(gm(x), m(x))
+
+    def test_constant_folding(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w = torch.nn.Parameter(torch.rand(4, 4))
+                self.lin = torch.nn.Linear(4, 4)
+
+            def forward(self, x):
+                return x + self.lin(self.w)
+
+        m = M().eval()
+        gm = fold_constants(symbolic_trace(m))
+        self.assertEqual([n.op for n in gm.graph.nodes], ['placeholder', 'get_param', 'call_function'])
+        # the folded values are held by a copy of the root, outside of the state dict
+        self.assertNotIn('_folded_constant_0', dict(m.named_buffers()))
+        self.assertIn('_folded_constant_0', dict(gm.root.named_buffers()))
+        self.assertEqual(gm.root.state_dict().keys(), m.state_dict().keys())
+        self.assertIs(gm.root.lin, m.lin)
+        x = torch.rand(3, 4)
+        self.assertEqual(gm(x), m(x))
+        gm2 = fold_constants(symbolic_trace(m))
+        self.assertEqual(gm2.src, gm.src)
+
+        # subgraphs built directly over parameters
+        graph = Graph()
+        x = Proxy(graph.placeholder('x'))
+        w = Proxy(graph.get_param('w'))
+        graph.output((x + (w.t() * 2).relu() + w.size(0)).node)
+        gm = fold_constants(GraphModule(m, graph))
+        self.assertEqual([n.op for n in gm.graph.nodes], ['placeholder', 'get_param', 'call_function', 'call_function'])
+        x = torch.rand(4, 4)
+        self.assertEqual(gm(x), x + (m.w.t() * 2).relu() + 4)
+
+    def test_fuse(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.conv = torch.nn.Conv2d(3, 8, 3)
+                self.bn = torch.nn.BatchNorm2d(8)
+                self.relu = torch.nn.ReLU()
+                self.lin = torch.nn.Linear(8, 16)
+                self.bn1d = torch.nn.BatchNorm1d(16)
+                self.gelu = torch.nn.GELU()
+                self.lin2 = torch.nn.Linear(16, 4)
+                self.lin3 = torch.nn.Linear(4, 4)
+
+            def forward(self, x):
+                x = self.relu(self.bn(self.conv(x)))
+                x = self.gelu(self.bn1d(self.lin(x.mean((2, 3)))))
+                x = torch.relu(self.lin2(x))
+                # used twice, not fused
+                y = self.lin3(x)
+                return torch.relu(y) + y
+
+        m = M()
+        for _ in range(3):
+            m(torch.randn(4, 3, 8, 8))
+        m.eval()
+
+        # linear layers are only folded with batch norms on known 2-dimensional outputs
+        gm = fuse(symbolic_trace(m))
+        self.assertEqual([n.target for n in gm.graph.nodes if n.op == 'call_module'],
+                         ['conv', 'lin', 'bn1d', 'gelu', 'lin2', 'lin3'])
+
+        gm = symbolic_trace(m)
+        ShapeProp(gm).propagate(torch.randn(2, 3, 8, 8))
+        gm = fuse(gm)
+        self.assertEqual([n.target for n in gm.graph.nodes if n.op == 'call_module'], ['conv', 'lin', 'lin2', 'lin3'])
+        self.assertIsInstance(gm.root.conv, torch.nn.intrinsic.ConvReLU2d)
+        self.assertIsInstance(gm.root.lin, torch.nn.Sequential)
+        self.assertIsInstance(gm.root.lin2, torch.nn.intrinsic.LinearReLU)
+        self.assertIsInstance(gm.root.lin3, torch.nn.Linear)
+        # the original module is not modified
+        self.assertIsInstance(m.conv, torch.nn.Conv2d)
+        x = torch.randn(2, 3, 8, 8)
+        self.assertEqual(gm(x), m(x))
+
+        # batch norms are only folded in eval mode
+        gm = fuse(symbolic_trace(m.train()))
+        self.assertEqual([n.target for n in gm.graph.nodes if n.op == 'call_module'],
+                         ['conv', 'bn', 'relu', 'lin', 'bn1d', 'gelu', 'lin2', 'lin3'])
+        self.assertIsInstance(gm.root.lin2, torch.nn.intrinsic.LinearReLU)
+
+        # BatchNorm1d normalizes dim 1 of 3-dimensional outputs, not the features
+        seq = torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.BatchNorm1d(4))
+        seq[1].running_mean.uniform_()
+        seq.eval()
+        gm = symbolic_trace(seq)
+        x = torch.randn(2, 4, 4)
+        ShapeProp(gm).propagate(x)
+        gm = fuse(gm)
+        self.assertEqual(len([n for n in gm.graph.nodes if n.op == 'call_module']), 2)
+        self.assertEqual(gm(x), seq(x))
+
+    def test_shape_prop(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.lin = torch.nn.Linear(4, 6)
+
+            def forward(self, x):
+                return self.lin(x).double().size(0)
+
+        gm = symbolic_trace(M())
+        self.assertEqual(ShapeProp(gm).propagate(torch.rand(3, 4)), 3)
+        shapes = [(n.shape, n.dtype) for n in gm.graph.nodes]
+        self.assertEqual(shapes, [(torch.Size([3, 4]), torch.float), (torch.Size([3, 6]), torch.float),
+                                  (torch.Size([3, 6]), torch.double), (None, None)])
+
+    def test_memory_planner(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.lin = torch.nn.Linear(8, 8)
+
+            def forward(self, x):
+                a = torch.sigmoid(x)
+                b = a * 2 + 1
+                c = torch.mm(b, b.t())
+                v = c.view(-1)
+                d = torch.tanh(self.lin(c))
+                return d + 1, v.sum() + d
+
+        m = M()
+        gm = symbolic_trace(m)
+        ShapeProp(gm).propagate(torch.rand(8, 8))
+        plan = plan_memory(gm)
+        planned = [n.target for n in plan.assignments]
+        self.assertEqual(planned, [torch.sigmoid, operator.mul, operator.add, torch.mm, torch.tanh])
+        # a is dead after a * 2, so a * 2 + 1 reuses its memory
+        self.assertLess(plan.arena_bytes, plan.planned_bytes)
+        buffers = dict(m.named_buffers())
+        planned_gm = apply_memory_plan(gm, plan)
+        self.assertEqual(planned_gm.src.count('out = '), 5)
+        # the arenas are held by a copy of the root
+        self.assertEqual(dict(m.named_buffers()), buffers)
+        self.assertEqual(dict(gm.root.named_buffers()), buffers)
+        self.assertIn('_memory_plan_0', dict(planned_gm.root.named_buffers()))
+        with torch.no_grad():
+            for _ in range(2):
+                x = torch.rand(8, 8)
+                self.assertEqual(planned_gm(x), m(x))
+
+    def _pipelined_module(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.layers = torch.nn.ModuleList([torch.nn.Linear(8, 8) for _ in range(4)])
+                self.w = torch.nn.Parameter(torch.rand(8))
+
+            def forward(self, x):
+                h = x
+                for layer in self.layers:
+                    h = torch.relu(layer(h)) + self.w
+                return h + x, h * 2
+
+        return M()
+
+    def _foldable_module(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.lin = torch.nn.Linear(8, 8)
+                self.w = torch.nn.Parameter(torch.rand(8, 8))
+
+            def forward(self, x):
+                return self.lin(x).relu() + torch.sigmoid(self.w).sum(0)
+
+        return M().eval()
+
+    def test_graph_module_pickle(self):
+        m = self._pipelined_module()
+        gm = symbolic_trace(m)
+        loaded = pickle.loads(pickle.dumps(gm))
+        self.assertIsInstance(loaded, GraphModule)
+        self.assertEqual(loaded.src, gm.src)
+        x = torch.rand(3, 8)
+        self.assertEqual(loaded(x), m(x))
+
+        # values fetched from buffers stay fetched
+        folded = fold_constants(symbolic_trace(self._foldable_module()))
+        self.assertIn('_folded_constant_0', dict(folded.root.named_buffers()))
+        loaded = pickle.loads(pickle.dumps(folded))
+        self.assertEqual(loaded.src, folded.src)
+        self.assertEqual(loaded(x), folded(x))
+
+    def test_split_module(self):
+        m = self._pipelined_module()
+        gm = symbolic_trace(m)
+        x = torch.rand(3, 8)
+        for costs in [None, estimate_costs(gm, x)]:
+            stages = split_module(gm, 3, costs)
+            self.assertEqual(len(stages), 3)
+            out = stages[0](x)
+            for stage in stages[1:]:
+                # the input is passed along to the last stage
+                self.assertIn('x', [n.name for n in stage.graph.nodes if n.op == 'placeholder'])
+                out = stage(*out)
+            self.assertEqual(out, m(x))
+            for stage in stages:
+                self.assertLess(len(list(stage.root.parameters())), len(list(m.parameters())))
+                pickle.loads(pickle.dumps(stage))
+
+        # one node per stage
+        num_nodes = len([n for n in gm.graph.nodes if n.op not in ('placeholder', 'get_param')])
+        stages = split_module(gm, num_nodes)
+        out = stages[0](x)
+        for stage in stages[1:]:
+            out = stage(*out)
+        self.assertEqual(out, m(x))
+        with self.assertRaisesRegex(ValueError, 'cannot split'):
+            split_module(gm, num_nodes + 1)
+
+    def test_pipeline(self):
+        m = self._pipelined_module()
+        gm = symbolic_trace(m)
+        x = torch.rand(6, 8)
+        with Pipeline(split_module(gm, 2), chunks=3) as pipeline:
+            for _ in range(2):
+                out = pipeline(x)
+                with torch.no_grad():
+                    self.assertEqual(out, m(x))
+            with self.assertRaisesRegex(RuntimeError, 'in pipeline stage 0'):
+                pipeline(torch.rand(6, 5))
+
+        # stages fetching folded constants
+        gm = fold_constants(symbolic_trace(self._foldable_module()))
+        with Pipeline(split_module(gm, 2), chunks=2) as pipeline:
+            self.assertEqual(pipeline(x), gm(x))
+            pipeline.processes[1].terminate()
+            with self.assertRaisesRegex(RuntimeError, r'pipeline stages \[1\] exited unexpectedly'):
+                pipeline(x)
+
+    def test_trace_cache(self):
+        class MyModule(torch.nn.Module):
+            def __init__(self, d):
+                super().__init__()
+                self.lin = torch.nn.Linear(d, d)
+
+            def forward(self, x):
+                return self.lin(x).relu() + x
+
+        class AllLeavesDelegate(DefaultDelegate):
+            def is_leaf_module(self, m):
+                return True
+
+        x = torch.rand(2, 4)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = TraceCache(cache_dir)
+            m = MyModule(4)
+            gm = symbolic_trace(m, cache=cache)
+            self.assertEqual(gm(x), m(x))
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+            # same structure, other parameters
+            m2 = MyModule(4)
+            gm2 = symbolic_trace(m2, cache=cache)
+            self.assertEqual(gm2(x), m2(x))
+            self.assertEqual(gm2.src, gm.src)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+            # the cached graph is not shared with the returned modules
+            self.assertIsNot(gm2.graph, gm.graph)
+
+            symbolic_trace(MyModule(5), cache=cache)
+            symbolic_trace(MyModule(4).eval(), cache=cache)
+            symbolic_trace(m, AllLeavesDelegate, cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+            # the signature of forward is part of the key
+            class First(torch.nn.Module):
+                def forward(self, x):
+                    return x[0]
+
+            class VarArgs(torch.nn.Module):
+                def forward(self, *xs):
+                    return xs[0]
+
+            # the same name and body, as for a class redefined in a notebook
+            VarArgs.__qualname__ = First.__qualname__
+            first = symbolic_trace(First(), cache=cache)
+            var_args = symbolic_trace(VarArgs(), cache=cache)
+            self.assertNotEqual(var_args.src, first.src)
+            self.assertEqual((cache.hits, cache.misses), (1, 6))
+
+            # loaded from disk
+            cache = TraceCache(cache_dir)
+            gm3 = symbolic_trace(m, cache=cache)
+            self.assertEqual(gm3(x), m(x))
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+
     @skipIfNoTorchVision
     def test_resnet(self):
         resnet = resnet18()
@@ -7,7 +7,7 @@ import torch
 from torch._six import inf
 import torch.optim as optim
 import torch.nn.functional as F
-from torch.optim import SGD
+from torch.optim import SGD, _multi_tensor
 from torch.autograd import Variable
 from torch import sparse
 from torch.optim.lr_scheduler import LambdaLR, MultiplicativeLR, StepLR, \
@@ -349,6 +349,108 @@ class TestOptim(TestCase):
         with self.assertRaisesRegex(ValueError, "Invalid weight_decay value: -1"):
             optim.AdamW(None, lr=1e-2, weight_decay=-1)
 
+    def _test_multi_tensor(self, constructor):
+        # The multi-tensor step must give exactly the results of the
+        # per-parameter one, including across dtypes, parameters without
+        # gradients for some steps and a state dict round trip
+        def make_params():
+            torch.manual_seed(0)
+            return [torch.randn(10, 5, requires_grad=True),
+                    torch.randn(10, requires_grad=True),
+                    torch.randn(3, 4, 5, dtype=torch.double, requires_grad=True),
+                    torch.randn(7, requires_grad=True)]
+
+        params = make_params()
+        multi_params = make_params()
+        optimizer = constructor(params, False)
+        multi_optimizer = constructor(multi_params, True)
+        for i in range(20):
+            for ps, opt in ((params, optimizer), (multi_params, multi_optimizer)):
+                opt.zero_grad()
+                torch.manual_seed(i)
+                for j, p in enumerate(ps):
+                    if j != 3 or i % 3 == 0:
+                        p.grad = torch.randn_like(p)
+                    else:
+                        p.grad = None
+                opt.step()
+            if i == 10:
+                multi_optimizer.load_state_dict(deepcopy(multi_optimizer.state_dict()))
+            for p, multi_p in zip(params, multi_params):
+                self.assertEqual(p, multi_p, atol=0, rtol=0)
+        for state, multi_state in zip(optimizer.state_dict()['state'].values(),
+                                      multi_optimizer.state_dict()['state'].values()):
+            self.assertEqual(state, multi_state, atol=0, rtol=0)
+
+    def test_multi_tensor_sgd(self):
+        self._test_multi_tensor(lambda params, multi_tensor: optim.SGD(
+            params, lr=1e-2, multi_tensor=multi_tensor))
+        self._test_multi_tensor(lambda params, multi_tensor: optim.SGD(
+            params, lr=1e-2, momentum=0.9, weight_decay=1e-2, multi_tensor=multi_tensor))
+        self._test_multi_tensor(lambda params, multi_tensor: optim.SGD(
+            [{'params': params[:2]}, {'params': params[2:], 'nesterov': True}],
+            lr=1e-2, momentum=0.9, multi_tensor=multi_tensor))
+
+    def test_multi_tensor_adam(self):
+        self._test_multi_tensor(lambda params, multi_tensor: optim.Adam(
+            params, lr=1e-2, multi_tensor=multi_tensor))
+        self._test_multi_tensor(lambda params, multi_tensor: optim.Adam(
+            [{'params': params[:2]}, {'params': params[2:], 'amsgrad': True}],
+            lr=1e-2, weight_decay=1e-2, multi_tensor=multi_tensor))
+        self._test_multi_tensor(lambda params, multi_tensor: optim.AdamW(
+            params, lr=1e-2, multi_tensor=multi_tensor))
+        self._test_multi_tensor(lambda params, multi_tensor: optim.AdamW(
+            params, lr=1e-2, amsgrad=True, multi_tensor=multi_tensor))
+
+    def test_flatten_parameters(self):
+        def make_model():
+            torch.manual_seed(0)
+            return torch.nn.Sequential(torch.nn.Linear(5, 10), torch.nn.ReLU(), torch.nn.Linear(10, 2))
+
+        for constructor in (lambda params: optim.SGD(params, lr=1e-2, momentum=0.9),
+                            lambda params: optim.Adam(params, lr=1e-2, weight_decay=1e-2),
+                            lambda params: optim.AdamW(params, lr=1e-2, amsgrad=True),
+                            lambda params: optim.Adagrad(params, lr=1e-2)):
+            model, flat_model = make_model(), make_model()
+            optimizer = constructor(model.parameters())
+            flat_optimizer = constructor(flat_model.parameters())
+            flat_optimizer.flatten_parameters()
+            params = list(flat_model.parameters())
+            self.assertTrue(all(p.storage().data_ptr() == params[0].storage().data_ptr() for p in params))
+            self.assertTrue(all(p.grad.storage().data_ptr() == params[0].grad.storage().data_ptr()
+                                for p in params))
+            grad_ptrs = [p.grad.data_ptr() for p in params]
+            for i in range(10):
+                torch.manual_seed(i)
+                input = torch.randn(4, 5)
+                for m, opt in ((model, optimizer), (flat_model, flat_optimizer)):
+                    opt.zero_grad()
+                    m(input).sum().backward()
+                    opt.step()
+                for p, flat_p in zip(model.parameters(), flat_model.parameters()):
+                    self.assertEqual(p, flat_p, atol=0, rtol=0)
+            # Gradients were accumulated into the packed buffer
+            self.assertEqual([p.grad.data_ptr() for p in params], grad_ptrs)
+            flat_optimizer.zero_grad()
+            self.assertTrue(all(p.grad.eq(0).all() for p in params))
+
+        # Parameters with different step counts when packed are updated from
+        # slices of the buffers
+        model = make_model()
+        params = list(model.parameters())
+        optimizer = optim.Adam(params, lr=1e-2, multi_tensor=True)
+        for p in params[1::2]:
+            p.grad = torch.ones_like(p)
+        optimizer.step()
+        optimizer.flatten_parameters()
+        for _ in range(2):
+            model(torch.randn(4, 5)).sum().backward()
+            optimizer.step()
+        self.assertEqual([optimizer.state[p]['step'] for p in params], [2, 3, 2, 3])
+        buckets = _multi_tensor.group_tensors(params, key=lambda p: (optimizer.state[p]['step'],))
+        for (device, dtype, _), bucket in buckets.items():
+            self.assertIsNotNone(_multi_tensor.get_packed(optimizer, (0, device, dtype), bucket))
+
     def test_sparse_adam(self):
         self._test_rosenbrock_sparse(
             lambda params: optim.SparseAdam(params, lr=4e-2),
@@ -11,6 +11,7 @@ import copy
 import pickle
 import shutil
 import pathlib
+import zlib
 
 from torch._utils_internal import get_file_path_2
 from torch._utils import _rebuild_tensor
@@ -720,6 +721,164 @@ class TestSerialization(TestCase, SerializationMixin):
             f.seek(0)
             torch.load(f)
 
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    def test_serialization_mmap(self):
+        data = {
+            'float': torch.randn(5, 5),
+            'double': torch.randn(3, dtype=torch.double),
+            'int': torch.arange(7, dtype=torch.int32),
+            'bool': torch.tensor([True, False, True]),
+            'empty': torch.empty(0),
+        }
+        data['view'] = data['float'][1:3]
+
+        with tempfile.NamedTemporaryFile() as f:
+            torch.save(data, f.name)
+            result = torch.load(f.name, mmap=True)
+            self.assertEqual(result, data)
+            # Storage sharing is preserved across mapped records
+            self.assertEqual(result['view'].storage().data_ptr(), result['float'].storage().data_ptr())
+            # Writes only touch the private mapping, never the file
+            result['float'].zero_()
+            self.assertEqual(torch.load(f.name)['float'], data['float'])
+
+            with self.assertRaisesRegex(ValueError, "requires f to be a file name"):
+                with open(f.name, 'rb') as opened:
+                    torch.load(opened, mmap=True)
+
+        with tempfile.NamedTemporaryFile() as f:
+            torch.save(data, f.name, _use_new_zipfile_serialization=False)
+            with self.assertRaisesRegex(RuntimeError, "zipfile-based format"):
+                torch.load(f.name, mmap=True)
+
+    def test_serialization_num_threads(self):
+        data = self._test_serialization_data()
+        for num_threads in (1, 4):
+            buf = io.BytesIO()
+            torch.save(data, buf, num_threads=num_threads)
+            buf.seek(0)
+            self.assertEqual(torch.load(buf), data)
+
+        # Force the writer to drain staged storages as it goes
+        old_limit = torch.serialization._SAVE_MAX_INFLIGHT_BYTES
+        torch.serialization._SAVE_MAX_INFLIGHT_BYTES = 1
+        try:
+            buf = io.BytesIO()
+            torch.save(data, buf, num_threads=2)
+            buf.seek(0)
+            self.assertEqual(torch.load(buf), data)
+        finally:
+            torch.serialization._SAVE_MAX_INFLIGHT_BYTES = old_limit
+
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    def test_serialization_async(self):
+        x = torch.randn(10, 10)
+        expected = x.clone()
+
+        with tempfile.NamedTemporaryFile() as f:
+            fut = torch.save({'x': x}, f.name, async_=True, num_threads=2)
+            # The storages are snapshotted, so mutating them right away is safe
+            x.zero_()
+            self.assertIsNone(fut.result())
+            self.assertEqual(torch.load(f.name)['x'], expected)
+
+        buf = io.BytesIO()
+        torch.save([x], buf, async_=True).result()
+        buf.seek(0)
+        self.assertEqual(torch.load(buf), [x])
+
+        with self.assertRaisesRegex(ValueError, "zipfile-based format"):
+            torch.save(x, io.BytesIO(), _use_new_zipfile_serialization=False, async_=True)
+
+        fut = torch.save(x, os.path.join(tempfile.gettempdir(), 'does', 'not', 'exist.pt'), async_=True)
+        with self.assertRaises(IOError):
+            fut.result()
+
+    def test_serialization_sharded(self):
+        model = torch.nn.Sequential(torch.nn.Linear(10, 20), torch.nn.BatchNorm1d(20), torch.nn.Linear(20, 5))
+        state_dict = model.state_dict()
+        state_dict['tied'] = state_dict['0.weight'][2:4]
+        state_dict['extra'] = {'step': 3}
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Every storage is bigger than a shard, so each one gets its own file
+            torch.serialization.save_sharded(state_dict, directory, max_shard_size=1)
+            index = torch.serialization.load_sharded_index(directory)
+            self.assertGreater(len(index['shards']), 1)
+            self.assertEqual(index['tensors']['tied']['shard'], index['tensors']['0.weight']['shard'])
+            self.assertEqual(index['tensors']['0.bias']['shape'], (20,))
+            self.assertEqual(index['tensors']['tied']['offset'], 20)
+
+            loaded = torch.serialization.load_sharded(directory)
+            self.assertEqual(list(loaded.keys()), list(state_dict.keys()))
+            self.assertEqual(loaded, state_dict)
+            self.assertEqual(loaded._metadata, state_dict._metadata)
+            self.assertEqual(loaded['tied'].storage().data_ptr(), loaded['0.weight'].storage().data_ptr())
+
+            partial = torch.serialization.load_sharded(directory, keys=['extra'], prefixes=['1.'])
+            self.assertEqual(list(partial.keys()),
+                             [k for k in state_dict if k.startswith('1.')] + ['extra'])
+            self.assertEqual(partial['1.running_mean'], state_dict['1.running_mean'])
+
+            if not IS_WINDOWS:
+                mapped = torch.serialization.load_sharded(directory, prefixes=['2.'], mmap=True)
+                self.assertEqual(mapped['2.weight'], state_dict['2.weight'])
+
+            # Shards are regular checkpoints
+            shard = torch.load(os.path.join(directory, index['tensors']['2.bias']['shard']))
+            self.assertEqual(shard['2.bias'], state_dict['2.bias'])
+
+            with self.assertRaisesRegex(KeyError, "not found"):
+                torch.serialization.load_sharded(directory, keys=['missing'])
+
+    def test_serialization_compression(self):
+        data = {
+            'zeros': torch.zeros(1000, 100),
+            'small': torch.randn(3),
+            'random': torch.randint(0, 256, (40000,), dtype=torch.uint8),
+            'bool': torch.zeros(20000, dtype=torch.bool),
+        }
+        data['view'] = data['zeros'][10:20]
+        uncompressed = io.BytesIO()
+        torch.save(data, uncompressed)
+
+        for codec in ('zlib', 'lzma'):
+            for num_threads in (0, 2):
+                buf = io.BytesIO()
+                torch.save(data, buf, compression=codec, compression_min_bytes=1024, num_threads=num_threads)
+                self.assertLess(len(buf.getvalue()), len(uncompressed.getvalue()))
+                buf.seek(0)
+                self.assertEqual(torch.load(buf), data)
+
+        # Flip a byte inside the raw record of `random`, whose payload does not compress
+        buf = io.BytesIO()
+        torch.save(data, buf, compression='zlib', compression_min_bytes=1024)
+        raw = bytearray(buf.getvalue())
+        payload = data['random'].numpy().tobytes()
+        pos = raw.find(payload)
+        self.assertGreater(pos, 0)
+        raw[pos] ^= 0xff
+        with self.assertRaisesRegex(RuntimeError, "checksum mismatch"):
+            torch.load(io.BytesIO(bytes(raw)))
+
+        calls = []
+
+        def compress(b):
+            calls.append('compress')
+            return zlib.compress(b)
+
+        torch.serialization.register_codec('test_codec', compress, zlib.decompress)
+        buf = io.BytesIO()
+        torch.save(data, buf, compression='test_codec')
+        buf.seek(0)
+        self.assertEqual(torch.load(buf), data)
+        self.assertEqual(calls, ['compress'])
+
+        with self.assertRaisesRegex(RuntimeError, "Unknown serialization codec"):
+            torch.save(data, io.BytesIO(), compression='missing')
+        with self.assertRaisesRegex(ValueError, "zipfile-based format"):
+            torch.save(data, io.BytesIO(), compression='zlib', _use_new_zipfile_serialization=False)
+
     # Ensure large zip64 serialization works properly
     def test_serialization_2gb_file(self):
         big_model = torch.nn.Conv2d(20000, 3200, kernel_size=3)
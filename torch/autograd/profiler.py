@@ -1,7 +1,11 @@
 import itertools
+import json
+import os
+import time
 import torch
 
-from collections import defaultdict, namedtuple
+from collections import defaultdict, deque, namedtuple
+from enum import Enum
 from operator import attrgetter
 
 try:
@@ -134,66 +138,73 @@ class EventList(list):
         Arguments:
             path (str): Path where the trace will be written.
         """
-        import os
         with open(path, 'w') as f:
-            chrome_events = []
-            next_id = 0
-            # Use file IO over using json.dump since JSON dumping is very slow and
-            # this technique is proven to give a 4x speedup.
             f.write("[")
-            for evt in self:
-                f.write(
-                    '{"name": "%s", '
-                    '"ph": "X", '
-                    '"ts": %s, '
-                    '"dur": %s, '
-                    '"tid": %s, '
-                    '"pid": "CPU functions", '
-                    '"args": {}}, '
-                    % (
-                        evt.name,
-                        evt.cpu_interval.start,
-                        evt.cpu_interval.elapsed_us(),
-                        evt.thread
-                        if not evt.is_remote
-                        else f'" node_id:{evt.node_id}, thread_id:{evt.thread} "',
-                    )
-                )
-                for k in evt.kernels:
-                    # 's' and 'f' draw Flow arrows from
-                    # the CPU launch to the GPU kernel
-                    f.write('{"name": "%s", '
-                            '"ph": "s", '
-                            '"ts": %s, '
-                            '"tid": %s, '
-                            '"pid": "CPU functions", '
-                            '"id": %s, '
-                            '"cat": "cpu_to_cuda", '
-                            '"args": {}}, ' % (evt.name, evt.cpu_interval.start,
-                                               evt.thread, next_id))
-                    f.write('{"name": "%s", '
-                            '"ph": "f", '
-                            '"ts": %s, '
-                            '"tid": %s, '
-                            '"pid": "CUDA functions", '
-                            '"id": %s, '
-                            '"cat": "cpu_to_cuda", '
-                            '"args": {}}, ' % (k.name, k.interval.start, k.device, next_id))
-                    f.write('{"name": "%s", '
-                            '"ph": "X", '
-                            '"ts": %s, '
-                            '"dur": %s, '
-                            '"tid": %s, '
-                            '"pid": "CUDA functions", '
-                            '"args": {}}, ' % (k.name, k.interval.start,
-                                               k.interval.elapsed_us(), k.device))
-                    next_id += 1
-
-            # remove trailing whitespace and comma
-            f.seek(f.tell() - 2, os.SEEK_SET)
-            f.truncate()
+            if self._write_chrome_events(f):
+                # remove trailing whitespace and comma
+                f.seek(f.tell() - 2, os.SEEK_SET)
+                f.truncate()
             f.write("]")
 
+    def _write_chrome_events(self, f, time_offset_us=0):
+        # Writes the events to the Chrome trace being written to `f`, each
+        # followed by a comma, shifting their times by `time_offset_us`.
+        # Returns whether any event was written.
+        next_id = 0
+        written = False
+        # Use file IO over using json.dump since JSON dumping is very slow and
+        # this technique is proven to give a 4x speedup.
+        for evt in self:
+            written = True
+            f.write(
+                '{"name": "%s", '
+                '"ph": "X", '
+                '"ts": %s, '
+                '"dur": %s, '
+                '"tid": %s, '
+                '"pid": "CPU functions", '
+                '"args": %s}, '
+                % (
+                    evt.name,
+                    evt.cpu_interval.start + time_offset_us,
+                    evt.cpu_interval.elapsed_us(),
+                    evt.thread
+                    if not evt.is_remote
+                    else f'" node_id:{evt.node_id}, thread_id:{evt.thread} "',
+                    json.dumps(evt.trace_args) if evt.trace_args else '{}',
+                )
+            )
+            for k in evt.kernels:
+                # 's' and 'f' draw Flow arrows from
+                # the CPU launch to the GPU kernel
+                f.write('{"name": "%s", '
+                        '"ph": "s", '
+                        '"ts": %s, '
+                        '"tid": %s, '
+                        '"pid": "CPU functions", '
+                        '"id": %s, '
+                        '"cat": "cpu_to_cuda", '
+                        '"args": {}}, ' % (evt.name, evt.cpu_interval.start + time_offset_us,
+                                           evt.thread, next_id))
+                f.write('{"name": "%s", '
+                        '"ph": "f", '
+                        '"ts": %s, '
+                        '"tid": %s, '
+                        '"pid": "CUDA functions", '
+                        '"id": %s, '
+                        '"cat": "cpu_to_cuda", '
+                        '"args": {}}, ' % (k.name, k.interval.start + time_offset_us, k.device, next_id))
+                f.write('{"name": "%s", '
+                        '"ph": "X", '
+                        '"ts": %s, '
+                        '"dur": %s, '
+                        '"tid": %s, '
+                        '"pid": "CUDA functions", '
+                        '"args": {}}, ' % (k.name, k.interval.start + time_offset_us,
+                                           k.interval.elapsed_us(), k.device))
+                next_id += 1
+        return written
+
     def key_averages(self, group_by_input_shapes=False):
         """Averages all function events over their keys.
 
@@ -208,13 +219,8 @@ class EventList(list):
         """
         self.populate_cpu_children()
         stats = defaultdict(FunctionEventAvg)
-
-        def get_key(event, group_by_input_shapes):
-            if not group_by_input_shapes:
-                return (event.key, event.node_id)
-            return (event.key, str(event.input_shapes), event.node_id)
         for evt in self:
-            stats[get_key(evt, group_by_input_shapes)].add(
+            stats[_averages_key(evt, group_by_input_shapes)].add(
                 evt, group_by_input_shapes)
         return EventList(stats.values(), use_cuda=self._use_cuda, profile_memory=self._profile_memory)
 
@@ -232,6 +238,12 @@ class EventList(list):
         return total_stat
 
 
+def _averages_key(event, group_by_input_shapes):
+    if not group_by_input_shapes:
+        return (event.key, event.node_id)
+    return (event.key, str(event.input_shapes), event.node_id)
+
+
 class profile(object):
     """Context manager that manages autograd profiler state and holds a summary of results.
     Under the hood it just records events of functions being executed in C++ and
@@ -376,6 +388,334 @@ class profile(object):
         return self.function_events.self_cpu_time_total
 
 
+class ProfilerAction(Enum):
+    """Action taken by :class:`scheduled_profile` at a given step."""
+    NONE = 0
+    WARMUP = 1
+    RECORD = 2
+    RECORD_AND_SAVE = 3
+
+
+def schedule(wait, warmup, active, repeat=0):
+    """Returns a callable usable as the ``schedule`` of :class:`scheduled_profile`.
+
+    The profiler skips the first ``wait`` steps, then warms up for ``warmup``
+    steps and records the following ``active`` steps, the last of which ends the
+    window. This cycle is repeated ``repeat`` times, or until the end of the
+    run if ``repeat`` is zero.
+    """
+    if wait < 0 or warmup < 0 or active < 1 or repeat < 0:
+        raise ValueError(
+            "Invalid profiler schedule: wait={}, warmup={}, active={}, repeat={}".format(
+                wait, warmup, active, repeat))
+    num_steps = wait + warmup + active
+
+    def schedule_fn(step):
+        assert step >= 0
+        if repeat > 0 and step // num_steps >= repeat:
+            return ProfilerAction.NONE
+        mod_step = step % num_steps
+        if mod_step < wait:
+            return ProfilerAction.NONE
+        elif mod_step < wait + warmup:
+            return ProfilerAction.WARMUP
+        elif mod_step < num_steps - 1:
+            return ProfilerAction.RECORD
+        return ProfilerAction.RECORD_AND_SAVE
+    return schedule_fn
+
+
+class scheduled_profile(profile):
+    """Profiler driven by the steps of a training loop, which only records the
+    steps selected by a schedule.
+
+    :meth:`step` should be called at the end of every step. Before each step,
+    ``schedule`` is called with the step number and returns the
+    :class:`ProfilerAction` to take: the profiler is off for ``NONE`` steps,
+    while the events of ``WARMUP`` steps are recorded but discarded, so that the
+    profiler overhead settles before the ``RECORD`` steps of interest. After a
+    ``RECORD_AND_SAVE`` step, which ends an active window, ``function_events``
+    holds the events of the window and ``on_trace_ready`` is called with the
+    profiler. Each step is annotated with a ``ProfilerStep#<step>`` range.
+
+    Arguments:
+        schedule (callable): Takes the step number and returns a :class:`ProfilerAction`,
+            see :func:`torch.autograd.profiler.schedule`.
+
+        on_trace_ready (callable, optional): Called with the profiler at the end of
+            each active window. Default: ``None``.
+
+        The other arguments are the same as for :class:`profile`.
+
+    Example:
+        >>> def trace_handler(prof):
+        >>>     print(prof.key_averages().table(sort_by="self_cpu_time_total"))
+        >>>
+        >>> with torch.autograd.profiler.scheduled_profile(
+        >>>         schedule=torch.autograd.profiler.schedule(wait=10, warmup=2, active=3, repeat=5),
+        >>>         on_trace_ready=trace_handler) as prof:
+        >>>     for _ in range(1000):
+        >>>         train_step()
+        >>>         prof.step()
+    """
+    def __init__(
+            self,
+            schedule,
+            on_trace_ready=None,
+            enabled=True,
+            use_cuda=False,
+            record_shapes=False,
+            profile_memory=False):
+        super(scheduled_profile, self).__init__(
+            enabled=enabled,
+            use_cuda=use_cuda,
+            record_shapes=record_shapes,
+            profile_memory=profile_memory)
+        self.schedule = schedule
+        self.on_trace_ready = on_trace_ready
+        self.step_num = 0
+        self.current_action = ProfilerAction.NONE
+        self._running = False
+        self._record_start_step = None
+        self._step_record = None
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        if self.entered:
+            raise RuntimeError("autograd profiler traces are not reentrant")
+        self.entered = True
+        self.current_action = self.schedule(self.step_num)
+        self._start_step(ProfilerAction.NONE)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self.enabled:
+            return False
+        self._end_step()
+        if self._running:
+            # Save a partial window if the run ends while recording
+            self._stop(save=self.current_action in (ProfilerAction.RECORD, ProfilerAction.RECORD_AND_SAVE))
+        self.entered = False
+        return False
+
+    def step(self):
+        """Marks the end of a step, and moves the profiler to the action
+        scheduled for the next one."""
+        if not self.enabled:
+            return
+        self._end_step()
+        prev_action = self.current_action
+        self.step_num += 1
+        self.current_action = self.schedule(self.step_num)
+        if prev_action == ProfilerAction.RECORD_AND_SAVE:
+            self._stop(save=True)
+            prev_action = ProfilerAction.NONE
+        elif self._running and self.current_action == ProfilerAction.NONE:
+            self._stop(save=False)
+        self._start_step(prev_action)
+
+    def _start_step(self, prev_action):
+        if self.current_action == ProfilerAction.NONE:
+            return
+        if not self._running:
+            profiler_kind = torch.autograd.ProfilerState.CUDA if self.use_cuda \
+                else torch.autograd.ProfilerState.CPU
+            config = torch.autograd.ProfilerConfig(profiler_kind, self.record_shapes, self.profile_memory)
+            torch.autograd._enable_profiler(config)
+            self._running = True
+        if self.current_action != ProfilerAction.WARMUP and \
+                prev_action not in (ProfilerAction.RECORD, ProfilerAction.RECORD_AND_SAVE):
+            self._record_start_step = self.step_num
+        self._step_record = record_function("ProfilerStep#{}".format(self.step_num))
+        self._step_record.__enter__()
+
+    def _end_step(self):
+        if self._step_record is not None:
+            self._step_record.__exit__(None, None, None)
+            self._step_record = None
+
+    def _stop(self, save):
+        records = torch.autograd._disable_profiler()
+        self._running = False
+        if not save:
+            return
+        function_events = parse_cpu_trace(records)
+        # Drop the events of the warmup steps, which precede the range of the
+        # first recorded step.
+        first_step = "ProfilerStep#{}".format(self._record_start_step)
+        record_start = next(
+            (evt.cpu_interval.start for evt in function_events if evt.name == first_step), 0)
+        self.function_events = EventList(
+            [evt for evt in function_events if evt.cpu_interval.start >= record_start],
+            use_cuda=self.use_cuda,
+            profile_memory=self.profile_memory)
+        if self.on_trace_ready is not None:
+            self.on_trace_ready(self)
+
+
+class streaming_profile(object):
+    """Context manager that profiles long running jobs with bounded memory.
+
+    Unlike :class:`profile`, which keeps every event until the end of the run,
+    this profiler collects events in windows and flushes each window to a Chrome
+    trace file on disk, calling :meth:`step` once per iteration to mark where a
+    window may end. Only the last ``max_events`` events are kept in memory, while
+    :meth:`key_averages` is accumulated incrementally over all flushed windows.
+
+    The trace is written as a JSON array of events that is only closed on exit,
+    which ``chrome://tracing`` can load even if the job was interrupted.
+
+    Arguments:
+        path (str): Path where the trace will be written.
+
+        flush_every_steps (int, optional): Flush the events every that many calls to
+            :meth:`step`. Default: ``100``.
+
+        flush_every_seconds (float, optional): Also flush the events at the first call to
+            :meth:`step` that many seconds after the previous flush. Default: ``None``.
+
+        max_events (int, optional): Number of most recent events kept in memory
+            and returned by :meth:`recent_events`. Default: ``10000``.
+
+        use_cuda (bool, optional): Same as for :class:`profile`. Default: ``False``.
+
+        record_shapes (bool, optional): Same as for :class:`profile`. Default: ``False``.
+
+        profile_memory (bool, optional): Same as for :class:`profile`. Default: ``False``.
+
+    .. warning:
+        The profiler is thread local, so :meth:`step` should be called from the
+        thread that entered the context manager.
+
+    Example:
+        >>> with torch.autograd.profiler.streaming_profile("trace.json", flush_every_steps=10) as prof:
+        >>>     for _ in range(1000):
+        >>>         train_step()
+        >>>         prof.step()
+        >>> print(prof.key_averages().table(sort_by="self_cpu_time_total"))
+    """
+    def __init__(
+            self,
+            path,
+            flush_every_steps=100,
+            flush_every_seconds=None,
+            max_events=10000,
+            use_cuda=False,
+            record_shapes=False,
+            profile_memory=False):
+        if flush_every_steps is not None and flush_every_steps < 1:
+            raise ValueError("flush_every_steps should be positive, got {}".format(flush_every_steps))
+        self.path = path
+        self.flush_every_steps = flush_every_steps
+        self.flush_every_seconds = flush_every_seconds
+        self.use_cuda = use_cuda
+        self.record_shapes = record_shapes
+        self.profile_memory = profile_memory
+        self.entered = False
+        self.num_flushes = 0
+        self._recent_events = deque(maxlen=max_events)
+        self._stats = defaultdict(FunctionEventAvg)
+        self._stats_by_input_shape = defaultdict(FunctionEventAvg)
+        self._file = None
+        self._has_events = False
+        self._steps = 0
+        self._origin = None
+        self._window_start = None
+
+    def _enable(self):
+        profiler_kind = torch.autograd.ProfilerState.CUDA if self.use_cuda \
+            else torch.autograd.ProfilerState.CPU
+        config = torch.autograd.ProfilerConfig(profiler_kind, self.record_shapes, self.profile_memory)
+        self._window_start = time.perf_counter()
+        torch.autograd._enable_profiler(config)
+
+    def __enter__(self):
+        if self.entered:
+            raise RuntimeError("autograd profiler traces are not reentrant")
+        self.entered = True
+        self._file = open(self.path, 'w')
+        self._file.write("[")
+        self._origin = time.perf_counter()
+        self._enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self._flush(restart=False)
+            if self._has_events:
+                # remove trailing whitespace and comma
+                self._file.seek(self._file.tell() - 2, os.SEEK_SET)
+                self._file.truncate()
+            self._file.write("]")
+        finally:
+            self._file.close()
+            self._file = None
+            self.entered = False
+        return False
+
+    def step(self):
+        """Marks the end of an iteration, flushing the current window if it
+        is complete."""
+        self._steps += 1
+        if self.flush_every_steps is not None and self._steps >= self.flush_every_steps:
+            self.flush()
+        elif self.flush_every_seconds is not None and \
+                time.perf_counter() - self._window_start >= self.flush_every_seconds:
+            self.flush()
+
+    def flush(self):
+        """Writes the events of the current window to the trace and starts a
+        new window."""
+        if not self.entered:
+            raise RuntimeError("streaming_profile can only be flushed while running")
+        self._flush(restart=True)
+
+    def _flush(self, restart):
+        records = torch.autograd._disable_profiler()
+        offset_us = (self._window_start - self._origin) * 1e6
+        if restart:
+            self._enable()
+        self._steps = 0
+        window = EventList(
+            parse_cpu_trace(records),
+            use_cuda=self.use_cuda,
+            profile_memory=self.profile_memory)
+        window.populate_cpu_children()
+        if window._write_chrome_events(self._file, time_offset_us=offset_us):
+            self._has_events = True
+        self._file.flush()
+        for evt in window:
+            self._stats[_averages_key(evt, False)].add(evt, False)
+            self._stats_by_input_shape[_averages_key(evt, True)].add(evt, True)
+        self._recent_events.extend(window)
+        self.num_flushes += 1
+
+    def recent_events(self):
+        """Returns an EventList of the most recent flushed events, up to
+        ``max_events`` of them."""
+        return EventList(self._recent_events, use_cuda=self.use_cuda, profile_memory=self.profile_memory)
+
+    def key_averages(self, group_by_input_shape=False):
+        """Averages all flushed function events over their keys, like
+        :meth:`EventList.key_averages`.
+
+        Returns:
+            An EventList containing FunctionEventAvg objects.
+        """
+        stats = self._stats_by_input_shape if group_by_input_shape else self._stats
+        return EventList(stats.values(), use_cuda=self.use_cuda, profile_memory=self.profile_memory)
+
+    def total_average(self):
+        return self.key_averages().total_average()
+    total_average.__doc__ = EventList.total_average.__doc__
+
+    def table(self, sort_by=None, row_limit=100, header=None):
+        """Returns a table of :meth:`key_averages`, see :meth:`EventList.table`."""
+        return self.key_averages().table(
+            sort_by=sort_by, row_limit=row_limit, header=header)
+
+
 class record_function(ContextDecorator):
     """Context manager/function decorator that adds a label to a block of
     Python code (or function) when running autograd profiler. It is
@@ -663,6 +1003,8 @@ class FunctionEvent(FormattedTimesMixin):
         self.is_async = is_async
         self.is_remote = is_remote
         self.sequence_nr = sequence_nr
+        # Arguments of the event in Chrome traces
+        self.trace_args = {}
 
     def append_kernel(self, name, device, start, end):
         self.kernels.append(Kernel(name, device, Interval(start, end)))
@@ -80,13 +80,38 @@ void broadcast_coalesced(
   }
 }
 
-GradBucket::GradBucket(std::vector<at::Tensor> tensors)
-    : tensors_(std::move(tensors)){};
+GradBucket::GradBucket(
+    std::vector<at::Tensor> tensors,
+    size_t index,
+    std::vector<size_t> variable_indices,
+    std::vector<size_t> offsets,
+    std::vector<size_t> lengths)
+    : tensors_(std::move(tensors)),
+      index_(index),
+      variable_indices_(std::move(variable_indices)),
+      offsets_(std::move(offsets)),
+      lengths_(std::move(lengths)){};
 
 const std::vector<at::Tensor>& GradBucket::getTensors() {
   return tensors_;
 }
 
+size_t GradBucket::getIndex() const {
+  return index_;
+}
+
+const std::vector<size_t>& GradBucket::getVariableIndices() const {
+  return variable_indices_;
+}
+
+const std::vector<size_t>& GradBucket::getOffsets() const {
+  return offsets_;
+}
+
+const std::vector<size_t>& GradBucket::getLengths() const {
+  return lengths_;
+}
+
 PythonCommHook::PythonCommHook(py::object state, py::object hook)
     : state_(std::move(state)), hook_(std::move(hook)){};
 
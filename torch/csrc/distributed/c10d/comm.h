@@ -15,20 +15,40 @@ void broadcast_coalesced(
     size_t buffer_size);
 
 // This class passes bucket contents tensor (for multiple replicas) to
-// DDP communication hook.
-// Optionally in the future this can be enhanced with parameter to bucket
-// mappings as well.
+// DDP communication hook, along with the mapping of the bucket to the
+// parameters whose gradients it holds.
 class GradBucket {
  public:
-  explicit GradBucket(std::vector<at::Tensor> tensors);
+  explicit GradBucket(
+      std::vector<at::Tensor> tensors,
+      size_t index = 0,
+      std::vector<size_t> variable_indices = {},
+      std::vector<size_t> offsets = {},
+      std::vector<size_t> lengths = {});
   // Each tensor in the list that getTensors returns refers to the replica on
   // each device. There will be multiple replicas only in the case of single
   // process multiple device mode. In the single process single device mode,
   // this list would consist of only a single tensor.
   const std::vector<at::Tensor>& getTensors();
 
+  // Index of the bucket in the reducer.
+  size_t getIndex() const;
+
+  // Indices of the parameters of the bucket, in the list of parameters of
+  // the model replica passed to the reducer.
+  const std::vector<size_t>& getVariableIndices() const;
+
+  // Offset and number of elements of the gradient of each parameter of the
+  // bucket in its flat tensors. Empty for buckets of sparse gradients.
+  const std::vector<size_t>& getOffsets() const;
+  const std::vector<size_t>& getLengths() const;
+
  private:
   std::vector<at::Tensor> tensors_;
+  size_t index_;
+  std::vector<size_t> variable_indices_;
+  std::vector<size_t> offsets_;
+  std::vector<size_t> lengths_;
 };
 
 // DDP's c10d reducer allows communcation hooks defined as a sub class
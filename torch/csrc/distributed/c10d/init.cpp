@@ -138,7 +138,18 @@ PyObject* c10d_init(PyObject* _unused) {
       py::arg("comm_hook"));
 
   shared_ptr_class_<::c10d::GradBucket>(module, "_GradBucket")
-      .def(py::init<std::vector<Tensor>&>(), py::arg("tensors"))
+      .def(
+          py::init<
+              std::vector<Tensor>&,
+              size_t,
+              std::vector<size_t>,
+              std::vector<size_t>,
+              std::vector<size_t>>(),
+          py::arg("tensors"),
+          py::arg("index") = 0,
+          py::arg("variable_indices") = std::vector<size_t>(),
+          py::arg("offsets") = std::vector<size_t>(),
+          py::arg("lengths") = std::vector<size_t>())
       .def(
           "get_tensors",
           &::c10d::GradBucket::getTensors,
@@ -149,6 +160,36 @@ PyObject* c10d_init(PyObject* _unused) {
             replicas only in the case of single process multiple device mode. In
             the single process single device mode, this list would consist of only
             a single tensor.
+           )")
+      .def(
+          "get_index",
+          &::c10d::GradBucket::getIndex,
+          R"(
+            ``get_index`` returns the index of the bucket in the reducer.
+           )")
+      .def(
+          "get_variable_indices",
+          &::c10d::GradBucket::getVariableIndices,
+          R"(
+            ``get_variable_indices`` returns the indices of the parameters whose
+            gradients are held by the bucket, in the list of parameters of the
+            model replica passed to the reducer.
+           )")
+      .def(
+          "get_offsets",
+          &::c10d::GradBucket::getOffsets,
+          R"(
+            ``get_offsets`` returns the offset of the gradient of each parameter
+            of the bucket in its flat tensors. It is empty for buckets of sparse
+            gradients.
+           )")
+      .def(
+          "get_lengths",
+          &::c10d::GradBucket::getLengths,
+          R"(
+            ``get_lengths`` returns the number of elements of the gradient of
+            each parameter of the bucket. It is empty for buckets of sparse
+            gradients.
            )");
 
   shared_ptr_class_<::c10d::Reducer>(module, "Reducer")
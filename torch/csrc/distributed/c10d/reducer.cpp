@@ -606,7 +606,12 @@ void Reducer::mark_bucket_ready(size_t bucket_index) {
     if (comm_hook_ == nullptr) {
       bucket.work = process_group_->allreduce(tensors);
     } else {
-      bucket.future_work = comm_hook_->runHook(GradBucket(tensors));
+      bucket.future_work = comm_hook_->runHook(GradBucket(
+          tensors,
+          next_bucket_,
+          bucket.variable_indices,
+          bucket.replicas[0].offsets,
+          bucket.replicas[0].lengths));
     }
   }
 }
@@ -0,0 +1,13 @@
+"""
+Communication hooks for :class:`~torch.nn.parallel.DistributedDataParallel`,
+to be registered with its ``_register_comm_hook`` method.
+
+Besides :func:`allreduce_hook`, which does what DDP does without a hook, the
+hooks compress the gradients to reduce the bytes communicated, at the cost of
+some accuracy: :func:`fp16_compress_hook` casts them to ``torch.float16``,
+:func:`powerSGD_hook` communicates a low-rank approximation of them and
+:func:`topk_hook` only their largest values.
+"""
+from .default_hooks import allreduce_hook, fp16_compress_hook
+from .powerSGD_hook import PowerSGDState, powerSGD_hook
+from .topk_hook import TopKState, topk_hook
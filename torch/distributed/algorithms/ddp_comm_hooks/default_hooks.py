@@ -0,0 +1,68 @@
+import torch
+import torch.distributed as dist
+
+
+def _get_process_group(process_group):
+    if process_group is None:
+        return dist.distributed_c10d._get_default_group()
+    return process_group
+
+
+def _get_future(process_group, work, tensors):
+    r"""
+    Returns a Future holding ``tensors`` once ``work`` completes. ``tensors``
+    must be the outputs of ``work``.
+    """
+    ProcessGroupNCCL = getattr(dist, 'ProcessGroupNCCL', None)
+    if ProcessGroupNCCL is not None and isinstance(process_group, ProcessGroupNCCL):
+        return work.get_future()
+    # ``get_future`` is only supported by NCCL, so wait for the work of other
+    # backends and return a completed Future.
+    work.wait()
+    fut = torch.futures.Future()
+    fut.set_result(tensors)
+    return fut
+
+
+def _allreduce_fut(process_group, tensor):
+    r"""
+    Averages ``tensor`` in place across ``process_group`` and returns a Future
+    holding ``[tensor]``.
+    """
+    tensor.div_(process_group.size())
+    return _get_future(process_group, process_group.allreduce([tensor]), [tensor])
+
+
+def allreduce_hook(process_group, bucket):
+    r"""
+    Averages the gradients of the bucket across ``process_group`` (the default
+    process group if ``None``) with a single ``allreduce``, which is what DDP
+    does without a communication hook.
+
+    Example::
+        >>> ddp_model._register_comm_hook(process_group, allreduce_hook)
+    """
+    return _allreduce_fut(_get_process_group(process_group), bucket.get_tensors()[0])
+
+
+def fp16_compress_hook(process_group, bucket):
+    r"""
+    Like :func:`allreduce_hook`, but casts the gradients of the bucket to
+    ``torch.float16`` before the ``allreduce`` and back to their dtype after
+    it, which halves the bytes communicated for ``torch.float32`` gradients.
+
+    Gradients are divided by the world size before the cast, so that the sum
+    does not overflow the range of ``torch.float16``.
+
+    Example::
+        >>> ddp_model._register_comm_hook(process_group, fp16_compress_hook)
+    """
+    group = _get_process_group(process_group)
+    tensor = bucket.get_tensors()[0]
+    compressed = tensor.div(group.size()).to(torch.float16)
+    fut = _get_future(group, group.allreduce([compressed]), [compressed])
+
+    def decompress(fut):
+        return [fut.wait()[0].to(tensor.dtype)]
+
+    return fut.then(decompress)
@@ -0,0 +1,114 @@
+import math
+
+import torch
+
+from .default_hooks import _allreduce_fut, _get_process_group
+
+
+class PowerSGDState(object):
+    r"""
+    Stores the options and the per-bucket state of :func:`powerSGD_hook`.
+
+    Arguments:
+        process_group (ProcessGroup): process group to communicate over, or
+            ``None`` for the default process group.
+        matrix_approximation_rank (int): rank of the low-rank approximation of
+            each bucket. Higher ranks communicate more but approximate the
+            gradients better (default: ``1``).
+        use_error_feedback (bool): if ``True``, the approximation error of a
+            bucket is added to its gradients at the next iteration, so that
+            no part of the gradients is lost over time (default: ``True``).
+        random_seed (int): seed of the initial random ``Q`` matrices, which
+            must be the same on all ranks (default: ``0``).
+    """
+
+    def __init__(self, process_group, matrix_approximation_rank=1, use_error_feedback=True, random_seed=0):
+        if matrix_approximation_rank < 1:
+            raise ValueError("matrix_approximation_rank should be a positive integer, "
+                             "but got matrix_approximation_rank={}".format(matrix_approximation_rank))
+        self.process_group = process_group
+        self.matrix_approximation_rank = matrix_approximation_rank
+        self.use_error_feedback = use_error_feedback
+        self.generator = torch.Generator()
+        self.generator.manual_seed(random_seed)
+        # Map bucket indices to the approximation error of their last
+        # iteration, and to their ``Q`` matrix, which is reused as the starting
+        # point of the next iteration.
+        self.error_dict = {}
+        self.q_memory_dict = {}
+
+
+def _orthogonalize(matrix, epsilon=1e-8):
+    # Gram-Schmidt on the columns of `matrix`, in place
+    num_cols = matrix.size(1)
+    for i in range(num_cols):
+        col = matrix[:, i:i + 1]
+        col.div_(col.norm() + epsilon)
+        if i + 1 < num_cols:
+            rest = matrix[:, i + 1:]
+            rest.sub_(col * torch.sum(col * rest, dim=0))
+
+
+def powerSGD_hook(state, bucket):
+    r"""
+    Averages a low-rank approximation of the gradients of the bucket, as in
+    `PowerSGD <https://arxiv.org/abs/1905.13727>`_.
+
+    The bucket is viewed as a square ``n x n`` matrix ``M`` (zero-padded if
+    needed), and a single step of power iteration computes its rank ``r``
+    approximation ``P Q^T`` with two ``allreduce`` of ``P = M Q`` (``n x r``)
+    and ``Q = M^T P`` (``n x r``), instead of one of ``M``. ``Q`` is kept
+    across iterations as a warm start for the power iteration.
+
+    Buckets too small to be compressed by this are averaged with a regular
+    ``allreduce``.
+
+    Arguments:
+        state (PowerSGDState): options and per-bucket state of the hook.
+        bucket (dist._GradBucket): bucket of gradients to average.
+
+    Example::
+        >>> state = PowerSGDState(process_group, matrix_approximation_rank=4)
+        >>> ddp_model._register_comm_hook(state, powerSGD_hook)
+    """
+    group = _get_process_group(state.process_group)
+    tensor = bucket.get_tensors()[0]
+    numel = tensor.numel()
+    side = int(math.ceil(math.sqrt(numel)))
+    rank = min(state.matrix_approximation_rank, side)
+    if 2 * side * rank >= numel:
+        return _allreduce_fut(group, tensor)
+
+    index = bucket.get_index()
+    flat = tensor.new_zeros(side * side)
+    flat[:numel].copy_(tensor.view(-1))
+    if state.use_error_feedback:
+        # Buckets are rebuilt after the first iteration, so the error of a
+        # bucket index may not describe the same gradients anymore.
+        error = state.error_dict.get(index)
+        if error is not None and error.numel() == flat.numel():
+            flat.add_(error)
+        compensated = flat.clone()
+    matrix = flat.view(side, side)
+
+    q = state.q_memory_dict.get(index)
+    if q is None or q.size() != (side, rank):
+        q = torch.randn(side, rank, generator=state.generator).to(tensor)
+        state.q_memory_dict[index] = q
+    _orthogonalize(q)
+    p = torch.matmul(matrix, q)
+
+    def compute_q(fut):
+        fut.wait()
+        _orthogonalize(p)
+        torch.matmul(matrix.t(), p, out=q)
+        return _allreduce_fut(group, q).wait()
+
+    def decompress(fut):
+        fut.wait()
+        torch.matmul(p, q.t(), out=matrix)
+        if state.use_error_feedback:
+            state.error_dict[index] = compensated.sub_(flat)
+        return [flat[:numel].view_as(tensor)]
+
+    return _allreduce_fut(group, p).then(compute_q).then(decompress)
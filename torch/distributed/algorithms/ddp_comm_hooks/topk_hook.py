@@ -0,0 +1,82 @@
+import torch
+
+from .default_hooks import _get_future, _get_process_group
+
+
+class TopKState(object):
+    r"""
+    Stores the options and the per-bucket state of :func:`topk_hook`.
+
+    Arguments:
+        process_group (ProcessGroup): process group to communicate over, or
+            ``None`` for the default process group.
+        compress_ratio (float): fraction of the gradients of each bucket that
+            are communicated, in ``(0, 1]`` (default: ``0.01``).
+        use_error_feedback (bool): if ``True``, the gradients that were not
+            communicated are added to the gradients of the next iteration
+            (default: ``True``).
+    """
+
+    def __init__(self, process_group, compress_ratio=0.01, use_error_feedback=True):
+        if not 0 < compress_ratio <= 1:
+            raise ValueError("compress_ratio should be in (0, 1], "
+                             "but got compress_ratio={}".format(compress_ratio))
+        self.process_group = process_group
+        self.compress_ratio = compress_ratio
+        self.use_error_feedback = use_error_feedback
+        # Maps bucket indices to the gradients left out at their last iteration
+        self.error_dict = {}
+
+
+def topk_hook(state, bucket):
+    r"""
+    Averages only the ``k`` largest gradients (in absolute value) of the bucket
+    of each rank, where ``k`` is ``state.compress_ratio`` times the number of
+    gradients in the bucket, and zero for the others.
+
+    The values and indices of the selected gradients of all ranks are
+    exchanged with ``allgather``, whose output grows with the world size, so
+    this pays off only for small ratios and world sizes.
+
+    Arguments:
+        state (TopKState): options and per-bucket state of the hook.
+        bucket (dist._GradBucket): bucket of gradients to average.
+
+    Example::
+        >>> state = TopKState(process_group, compress_ratio=0.001)
+        >>> ddp_model._register_comm_hook(state, topk_hook)
+    """
+    group = _get_process_group(state.process_group)
+    world_size = group.size()
+    tensor = bucket.get_tensors()[0]
+    flat = tensor.view(-1)
+    index = bucket.get_index()
+    if state.use_error_feedback:
+        # Buckets are rebuilt after the first iteration, so the error of a
+        # bucket index may not describe the same gradients anymore.
+        error = state.error_dict.get(index)
+        if error is not None and error.numel() == flat.numel():
+            flat.add_(error)
+
+    k = max(1, int(flat.numel() * state.compress_ratio))
+    _, indices = torch.topk(flat.abs(), k, sorted=False)
+    values = flat[indices]
+    if state.use_error_feedback:
+        error = flat.clone()
+        error[indices] = 0
+        state.error_dict[index] = error
+
+    all_values = [torch.empty_like(values) for _ in range(world_size)]
+    all_indices = [torch.empty_like(indices) for _ in range(world_size)]
+    group.allgather([all_values], [values]).wait()
+    work = group.allgather([all_indices], [indices])
+    fut = _get_future(group, work, [all_indices])
+
+    def decompress(fut):
+        fut.wait()
+        result = torch.zeros_like(flat)
+        for v, i in zip(all_values, all_indices):
+            result.index_add_(0, i, v)
+        return [result.div_(world_size).view_as(tensor)]
+
+    return fut.then(decompress)
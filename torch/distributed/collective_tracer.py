@@ -0,0 +1,364 @@
+r"""
+Opt-in instrumentation of the collectives of :mod:`torch.distributed`.
+
+While a :class:`CollectiveTracer` is active, each call to a collective of
+:mod:`torch.distributed.distributed_c10d` is timed and recorded with the size
+of its message and its group, and aggregated into latency and message size
+histograms per collective and group. Collectives called by other collectives
+(e.g., by :func:`~torch.distributed.all_gather_object`) are recorded as part
+of the outermost one. Point-to-point operations (e.g.,
+:func:`~torch.distributed.send`) are recorded too, but without a sequence
+number since they are not called by all ranks of their group.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import deque
+
+import torch
+from torch.autograd.profiler import record_function
+from . import distributed_c10d
+
+
+def _message_tensors(message):
+    if isinstance(message, torch.Tensor):
+        return [message]
+    if isinstance(message, (list, tuple)):
+        return [t for m in message for t in _message_tensors(m)]
+    if isinstance(message, dict):
+        return [t for m in message.values() for t in _message_tensors(m)]
+    return []
+
+
+def _bucket(value):
+    # Lower bound of the power of two bucket of `value` in the histograms
+    if value < 1:
+        return 0
+    return 2 ** int(math.floor(math.log2(value)))
+
+
+class CollectiveRecord(object):
+    r"""A call to a collective.
+
+    Attributes:
+        name (str): name of the collective, e.g., ``"all_reduce"``.
+        group (str): name of the process group.
+        seq (int): number of the call among the collectives recorded on the
+            group, or ``None`` for point-to-point operations.
+        nbytes (int): size of the message sent by this rank, in bytes. Only
+            the tensors among the objects of object collectives are counted.
+        start_us (float): start of the call, in microseconds since the
+            tracer was created.
+        end_us (float): end of the call, in microseconds since the tracer was
+            created. Asynchronous calls end once they are enqueued.
+        async_op (bool): whether the call was asynchronous.
+        skew_us (float): difference between the longest and the shortest
+            duration of the call over the ranks of the group, set by
+            :meth:`CollectiveTracer.compute_skew`.
+        late_rank (int): the rank of the group whose call was the shortest,
+            i.e., that arrived last, set by :meth:`CollectiveTracer.compute_skew`.
+    """
+    __slots__ = ['name', 'group', 'seq', 'nbytes', 'start_us', 'end_us', 'async_op',
+                 'profiled', 'skew_us', 'late_rank']
+
+    def __init__(self, name, group, seq, nbytes, start_us, end_us, async_op, profiled):
+        self.name = name
+        self.group = group
+        self.seq = seq
+        self.nbytes = nbytes
+        self.start_us = start_us
+        self.end_us = end_us
+        self.async_op = async_op
+        # Whether the call was recorded by the autograd profiler
+        self.profiled = profiled
+        self.skew_us = None
+        self.late_rank = None
+
+    @property
+    def duration_us(self):
+        return self.end_us - self.start_us
+
+    def trace_args(self):
+        args = {'group': self.group, 'bytes': self.nbytes}
+        if self.seq is not None:
+            args['seq'] = self.seq
+        if self.async_op:
+            args['async_op'] = True
+        if self.skew_us is not None:
+            args['skew_us'] = self.skew_us
+            args['late_rank'] = self.late_rank
+        return args
+
+    def __repr__(self):
+        return '<CollectiveRecord name={} group={} seq={} bytes={} duration_us={:.3f}>'.format(
+            self.name, self.group, self.seq, self.nbytes, self.duration_us)
+
+
+class CollectiveStats(object):
+    r"""Aggregated calls to a collective on a group.
+
+    The histograms map the lower bound of power of two buckets to the number
+    of calls falling in them.
+
+    Attributes:
+        count (int): number of calls.
+        total_bytes (int): total size of the messages, in bytes.
+        total_time_us (float): total duration of the calls, in microseconds.
+        max_time_us (float): longest duration of a call, in microseconds.
+        latency_histogram (dict): histogram of the durations of the calls,
+            in microseconds.
+        size_histogram (dict): histogram of the sizes of the messages, in
+            bytes.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_bytes = 0
+        self.total_time_us = 0.0
+        self.max_time_us = 0.0
+        self.latency_histogram = {}
+        self.size_histogram = {}
+
+    def add(self, nbytes, duration_us):
+        self.count += 1
+        self.total_bytes += nbytes
+        self.total_time_us += duration_us
+        self.max_time_us = max(self.max_time_us, duration_us)
+        latency_bucket = _bucket(duration_us)
+        self.latency_histogram[latency_bucket] = self.latency_histogram.get(latency_bucket, 0) + 1
+        size_bucket = _bucket(nbytes)
+        self.size_histogram[size_bucket] = self.size_histogram.get(size_bucket, 0) + 1
+
+    @property
+    def avg_time_us(self):
+        return self.total_time_us / self.count if self.count else 0.0
+
+    @property
+    def bandwidth(self):
+        r"""Bytes sent per second, over all calls."""
+        return self.total_bytes / (self.total_time_us / 1e6) if self.total_time_us else 0.0
+
+
+class CollectiveTracer(object):
+    r"""Context manager recording the collectives called on this process.
+
+    The latest ``max_records`` calls are kept in :attr:`records`, and all calls
+    are aggregated into :meth:`stats`. :meth:`compute_skew` finds which rank
+    of a group arrived last to each call. The calls can be exported as a
+    Chrome trace with :meth:`export_chrome_trace`, or added to the Chrome
+    trace of the autograd profiler with :meth:`annotate`: while the profiler
+    is enabled, each collective is also recorded as a ``c10d::<name>``
+    function by the profiler.
+
+    Arguments:
+        enabled (bool, optional): Setting this to False makes this context
+            manager a no-op. Default: ``True``.
+        synchronize (bool, optional): Whether to synchronize CUDA before and
+            after collectives on CUDA tensors, so that their durations include
+            the time they take on the device. Default: ``False``.
+        max_records (int, optional): Number of calls kept in :attr:`records`,
+            or ``None`` to keep all of them. Default: ``100000``.
+
+    .. warning::
+        With ``synchronize=False``, the duration of collectives run on CUDA
+        streams, e.g., by NCCL, only covers their enqueueing.
+
+    Example::
+        >>> with CollectiveTracer() as tracer, torch.autograd.profiler.profile() as prof:
+        >>>     train()
+        >>> tracer.compute_skew()  # on all ranks
+        >>> print(tracer.summary())
+        >>> tracer.annotate(prof.function_events)
+        >>> prof.export_chrome_trace("trace_rank{}.json".format(rank))
+    """
+
+    def __init__(self, enabled=True, synchronize=False, max_records=100000):
+        self.enabled = enabled
+        self.synchronize = synchronize
+        self.records = deque(maxlen=max_records)
+        self._stats = {}
+        self._seqs = {}
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self.entered = False
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        if self.entered:
+            raise RuntimeError("collective tracers are not reentrant")
+        if distributed_c10d._collective_tracer is not None:
+            raise RuntimeError("another collective tracer is already active")
+        self.entered = True
+        distributed_c10d._collective_tracer = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self.enabled:
+            return False
+        distributed_c10d._collective_tracer = None
+        self.entered = False
+        return False
+
+    def _now_us(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _trace(self, func, args, kwargs, group, message, async_op, point_to_point=False):
+        # Called by the collectives of `distributed_c10d` while this tracer is
+        # active
+        if getattr(self._local, 'depth', 0) > 0 or \
+                (not isinstance(group, distributed_c10d._HierarchicalGroup) and
+                 distributed_c10d._rank_not_in_group(group)):
+            return func(*args, **kwargs)
+        tensors = _message_tensors(message)
+        nbytes = sum(t.numel() * t.element_size() for t in tensors)
+        synchronize = self.synchronize and any(t.is_cuda for t in tensors)
+        group_name = distributed_c10d._get_group_name(group)
+        name = func.__name__
+        profiled = torch.autograd._profiler_enabled()
+
+        if synchronize:
+            torch.cuda.synchronize()
+        self._local.depth = 1
+        start_us = self._now_us()
+        try:
+            if profiled:
+                with record_function('c10d::' + name):
+                    result = func(*args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            if synchronize:
+                torch.cuda.synchronize()
+        finally:
+            end_us = self._now_us()
+            self._local.depth = 0
+
+        seq = None
+        if not point_to_point:
+            seq = self._seqs.get(group_name, 0)
+            self._seqs[group_name] = seq + 1
+        self.records.append(CollectiveRecord(
+            name, group_name, seq, nbytes, start_us, end_us, bool(async_op), profiled))
+        key = (name, group_name)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = CollectiveStats()
+        stats.add(nbytes, end_us - start_us)
+        return result
+
+    def stats(self):
+        r"""Returns a dict mapping ``(name, group)`` of each collective called
+        on each group to its :class:`CollectiveStats`."""
+        return dict(self._stats)
+
+    def compute_skew(self, group=distributed_c10d.group.WORLD):
+        r"""Compares the durations of the calls recorded on ``group`` by the
+        tracers of all its ranks, to set the :attr:`~CollectiveRecord.skew_us`
+        and :attr:`~CollectiveRecord.late_rank` of each synchronous call.
+
+        As ranks wait in a collective until all of them have arrived, the rank
+        with the shortest call arrived last, and the difference with the
+        longest call is how long it kept the others waiting. This does not
+        depend on the clocks of the ranks being synchronized.
+
+        This is a collective operation, which should be called by all ranks
+        of ``group``, after the same calls have been recorded on it.
+
+        Arguments:
+            group (ProcessGroup, optional): The process group to work on
+
+        Returns:
+            A list with the number of calls each rank of ``group`` arrived
+            last to, and the total time in microseconds it kept the others
+            waiting, as ``(count, total_skew_us)``.
+        """
+        group_name = distributed_c10d._get_group_name(group)
+        world_size = distributed_c10d.get_world_size(group)
+        records = [r for r in self.records if r.group == group_name and r.seq is not None]
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = 1
+        try:
+            # Only compare the calls recorded by all ranks
+            seqs = torch.tensor([records[0].seq if records else 0,
+                                 -(records[-1].seq + 1) if records else 0], dtype=torch.long)
+            distributed_c10d.all_reduce(seqs, op=distributed_c10d.ReduceOp.MAX, group=group)
+            first, end = seqs[0].item(), -seqs[1].item()
+            records = [r for r in records if first <= r.seq < end]
+            durations = torch.tensor([0.0 if r.async_op else r.duration_us for r in records],
+                                     dtype=torch.float64)
+            all_durations = [torch.empty_like(durations) for _ in range(world_size)]
+            distributed_c10d.all_gather(all_durations, durations, group=group)
+        finally:
+            self._local.depth = depth
+
+        late = [(0, 0.0) for _ in range(world_size)]
+        if not records:
+            return late
+        all_durations = torch.stack(all_durations)
+        skews = (all_durations.max(dim=0)[0] - all_durations.min(dim=0)[0]).tolist()
+        late_ranks = all_durations.argmin(dim=0).tolist()
+        for record, skew, late_rank in zip(records, skews, late_ranks):
+            if record.async_op:
+                continue
+            record.skew_us = skew
+            record.late_rank = late_rank
+            count, total = late[late_rank]
+            late[late_rank] = (count + 1, total + skew)
+        return late
+
+    def summary(self):
+        r"""Returns a table of the statistics of each collective and group."""
+        header = ['Name', 'Group', 'Calls', 'Total MB', 'Avg time (us)', 'Max time (us)', 'MB/s']
+        rows = []
+        for (name, group_name), stats in sorted(self._stats.items()):
+            rows.append([
+                name, group_name, str(stats.count),
+                '{:.3f}'.format(stats.total_bytes / 1e6),
+                '{:.3f}'.format(stats.avg_time_us),
+                '{:.3f}'.format(stats.max_time_us),
+                '{:.3f}'.format(stats.bandwidth / 1e6),
+            ])
+        widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+        lines = ['  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in [header] + rows]
+        separator = '-' * len(lines[0])
+        return '\n'.join([separator, lines[0], separator] + lines[1:] + [separator])
+
+    def annotate(self, function_events):
+        r"""Adds the group, message size and skew of the collectives recorded
+        while the autograd profiler was enabled to the arguments of their
+        ``c10d::<name>`` events in ``function_events``, which are then
+        written by ``export_chrome_trace`` of the profiler.
+
+        Arguments:
+            function_events (EventList): the events of the profiler, e.g.,
+                ``prof.function_events``.
+        """
+        events = sorted((evt for evt in function_events if evt.name.startswith('c10d::')),
+                        key=lambda evt: evt.cpu_interval.start)
+        records = [r for r in self.records if r.profiled]
+        # Both are in the order of the calls, but only the latest records are kept
+        n = min(len(events), len(records))
+        for evt, record in zip(events[len(events) - n:], records[len(records) - n:]):
+            evt.trace_args = record.trace_args()
+
+    def export_chrome_trace(self, path):
+        r"""Exports the recorded calls as a Chrome tracing tools file, with a
+        thread per group.
+
+        Arguments:
+            path (str): Path where the trace will be written.
+        """
+        rank = distributed_c10d.get_rank() if distributed_c10d.is_initialized() else 0
+        events = [{
+            'name': record.name,
+            'ph': 'X',
+            'ts': record.start_us,
+            'dur': record.duration_us,
+            'tid': record.group,
+            'pid': 'c10d rank {}'.format(rank),
+            'args': record.trace_args(),
+        } for record in self.records]
+        with open(path, 'w') as f:
+            json.dump(events, f)
@@ -1,4 +1,8 @@
+import functools
+import inspect
 import pickle
+import socket
+import struct
 import torch
 import warnings
 from torch._six import string_classes
@@ -156,6 +160,39 @@ _default_pg_init_method = None
 # Process group count for default naming
 _group_count = 0
 
+# Persistent buffers of the coalesced object collectives, per group
+_object_buffers = {}
+
+# Tracer recording the collectives of this process, see
+# :class:`torch.distributed.collective_tracer.CollectiveTracer`
+_collective_tracer = None
+
+
+def _traced(message_arg=None, point_to_point=False, async_op=False):
+    """
+    Decorates a collective to be recorded by the current collective tracer,
+    with the tensors passed as argument ``message_arg`` as its message.
+    Point-to-point operations are not called by all ranks of their group.
+    Calls are asynchronous if ``async_op`` is set or if their ``async_op``
+    argument is.
+
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _collective_tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            message = arguments.arguments[message_arg] if message_arg is not None else None
+            return tracer._trace(func, args, kwargs, arguments.arguments['group'], message,
+                                 async_op or arguments.arguments.get('async_op', False), point_to_point)
+        return wrapper
+    return decorator
+
 
 def _rank_not_in_group(group):
     """
@@ -201,6 +238,19 @@ def _get_global_rank(group, group_rank):
     raise RuntimeError("The group rank is not part of the group")
 
 
+def _get_group_name(group):
+    """
+    Helper that gets the name of a given group
+
+    """
+    if group is GroupMember.WORLD:
+        _check_default_pg()
+        return _pg_names[_default_pg]
+    if isinstance(group, _HierarchicalGroup):
+        return "hierarchical"
+    return _pg_names.get(group, "unknown")
+
+
 def _check_default_pg():
     """
     Helper that checks if the default ProcessGroup has been initialized, with
@@ -561,6 +611,7 @@ def destroy_process_group(group=group.WORLD):
         _pg_map.clear()
         _pg_names.clear()
         _pg_group_ranks.clear()
+        _object_buffers.clear()
 
         # when process group doesn't have an explicit name (only WORLD (default)
         # process group can have an explicit name), we use global _group_counter
@@ -575,6 +626,7 @@ def destroy_process_group(group=group.WORLD):
         del _pg_map[pg]
         del _pg_names[pg]
         del _pg_group_ranks[pg]
+        _object_buffers.pop(pg, None)
 
 
 def get_rank(group=group.WORLD):
@@ -621,6 +673,7 @@ def get_world_size(group=group.WORLD):
     return _get_group_size(group)
 
 
+@_traced("tensor", point_to_point=True, async_op=True)
 def isend(tensor,
           dst,
           group=group.WORLD,
@@ -651,6 +704,7 @@ def isend(tensor,
         return group.send([tensor], group_dst_rank, tag)
 
 
+@_traced("tensor", point_to_point=True, async_op=True)
 def irecv(tensor,
           src,
           group=group.WORLD,
@@ -681,6 +735,7 @@ def irecv(tensor,
         return group.recv([tensor], group_src_rank, tag)
 
 
+@_traced("tensor", point_to_point=True)
 def send(tensor,
          dst,
          group=group.WORLD,
@@ -707,6 +762,7 @@ def send(tensor,
         group.send([tensor], group_dst_rank, tag).wait()
 
 
+@_traced("tensor", point_to_point=True)
 def recv(tensor,
          src=None,
          group=group.WORLD,
@@ -753,6 +809,7 @@ def recv(tensor,
         return src
 
 
+@_traced("tensor_list")
 def broadcast_multigpu(tensor_list,
                        src,
                        group=group.WORLD,
@@ -808,6 +865,7 @@ def broadcast_multigpu(tensor_list,
         work.wait()
 
 
+@_traced("tensor")
 def broadcast(tensor,
               src,
               group=group.WORLD,
@@ -851,6 +909,7 @@ def broadcast(tensor,
         work.wait()
 
 
+@_traced("tensor_list")
 def all_reduce_multigpu(tensor_list,
                         op=ReduceOp.SUM,
                         group=group.WORLD,
@@ -902,6 +961,7 @@ def all_reduce_multigpu(tensor_list,
         work.wait()
 
 
+@_traced("tensor")
 def all_reduce(tensor,
                op=ReduceOp.SUM,
                group=group.WORLD,
@@ -925,8 +985,15 @@ def all_reduce(tensor,
         Async work handle, if async_op is set to True.
         None, if not async_op or if not part of the group
 
+    .. note:: ``group`` can also be a group created by
+        :func:`new_hierarchical_group`, in which case the reduction is done in
+        two levels, within each node and then across nodes. It completes
+        before returning even if ``async_op`` is set to True.
+
     """
     _check_single_tensor(tensor, "tensor")
+    if isinstance(group, _HierarchicalGroup):
+        return _hierarchical_all_reduce([tensor], op, group, async_op)
     if _rank_not_in_group(group):
         return
 
@@ -944,6 +1011,7 @@ def all_reduce(tensor,
         work.wait()
 
 
+@_traced("tensors")
 def all_reduce_coalesced(tensors,
                          op=ReduceOp.SUM,
                          group=group.WORLD,
@@ -976,8 +1044,14 @@ def all_reduce_coalesced(tensors,
         Async work handle, if async_op is set to True.
         None, if not async_op or if not part of the group.
 
+    .. note:: ``group`` can also be a group created by
+        :func:`new_hierarchical_group`, see :func:`all_reduce`. The tensors
+        should then have the same dtype.
+
     """
     _check_tensor_list(tensors, "tensor")
+    if isinstance(group, _HierarchicalGroup):
+        return _hierarchical_all_reduce(tensors, op, group, async_op)
     if _rank_not_in_group(group):
         return
 
@@ -995,6 +1069,7 @@ def all_reduce_coalesced(tensors,
         work.wait()
 
 
+@_traced("tensor_list")
 def reduce_multigpu(tensor_list,
                     dst,
                     op=ReduceOp.SUM,
@@ -1052,6 +1127,7 @@ def reduce_multigpu(tensor_list,
         work.wait()
 
 
+@_traced("tensor")
 def reduce(tensor,
            dst,
            op=ReduceOp.SUM,
@@ -1099,6 +1175,7 @@ def reduce(tensor,
         work.wait()
 
 
+@_traced("input_tensor_list")
 def all_gather_multigpu(output_tensor_lists,
                         input_tensor_list,
                         group=group.WORLD,
@@ -1171,6 +1248,7 @@ def _tensor_to_object(tensor, tensor_size):
     return out
 
 
+@_traced("obj")
 def all_gather_object(object_list, obj, group=group.WORLD):
     """
     Gathers picklable objects from the whole group into a list. Similar to
@@ -1238,6 +1316,7 @@ def all_gather_object(object_list, obj, group=group.WORLD):
         object_list[i] = _tensor_to_object(tensor, tensor_size)
 
 
+@_traced("obj")
 def gather_object(obj, object_gather_list=None, dst=0, group=group.WORLD):
     """
     Gathers picklable objects from the whole group in a single process.
@@ -1320,6 +1399,292 @@ def gather_object(obj, object_gather_list=None, dst=0, group=group.WORLD):
         object_gather_list[i] = _tensor_to_object(tensor, tensor_size)
 
 
+# Kinds of the objects encoded by the coalesced object collectives
+_OBJECT_PICKLE = 0
+_OBJECT_TENSOR = 1
+_OBJECT_TENSOR_DICT = 2
+
+# Dtypes of the tensors encoded without pickle, by index
+_object_tensor_dtypes = [
+    torch.bool, torch.uint8, torch.int8, torch.int16, torch.int32, torch.int64,
+    torch.float16, torch.float32, torch.float64, torch.complex64, torch.complex128,
+]
+
+# Initial capacity in bytes of the buffer of each rank
+_OBJECT_BUFFER_MIN_CAPACITY = 1024
+# The buffers shrink after this many consecutive calls whose largest message
+# takes less than 1 / _OBJECT_BUFFER_SHRINK_FACTOR of their capacity
+_OBJECT_BUFFER_SHRINK_CALLS = 8
+_OBJECT_BUFFER_SHRINK_FACTOR = 4
+
+
+def _is_raw_tensor(obj):
+    return (type(obj) is torch.Tensor and obj.layout == torch.strided and
+            obj.device.type == 'cpu' and not obj.requires_grad and
+            obj.dtype in _object_tensor_dtypes)
+
+
+def _encode_tensor(chunks, tensor):
+    size = tensor.size()
+    chunks.append(struct.pack('<BB%dq' % len(size), _object_tensor_dtypes.index(tensor.dtype), len(size), *size))
+    chunks.append(tensor.contiguous().numpy().tobytes())
+
+
+def _encode_objects(objects):
+    # Tensors and dicts of tensors are written as their sizes and bytes, and
+    # any other object is pickled
+    chunks = [struct.pack('<q', len(objects))]
+    for obj in objects:
+        if _is_raw_tensor(obj):
+            chunks.append(struct.pack('<B', _OBJECT_TENSOR))
+            _encode_tensor(chunks, obj)
+        elif type(obj) is dict and all(isinstance(k, str) and _is_raw_tensor(v) for k, v in obj.items()):
+            chunks.append(struct.pack('<Bq', _OBJECT_TENSOR_DICT, len(obj)))
+            for k, v in obj.items():
+                key = k.encode('utf-8')
+                chunks.append(struct.pack('<q', len(key)))
+                chunks.append(key)
+                _encode_tensor(chunks, v)
+        else:
+            data = pickle.dumps(obj)
+            chunks.append(struct.pack('<Bq', _OBJECT_PICKLE, len(data)))
+            chunks.append(data)
+    return b''.join(chunks)
+
+
+def _decode_tensor(array, offset):
+    import numpy as np
+
+    dtype_index, ndim = struct.unpack_from('<BB', array, offset)
+    size = struct.unpack_from('<%dq' % ndim, array, offset + 2)
+    offset += 2 + 8 * ndim
+    tensor = torch.empty(size, dtype=_object_tensor_dtypes[dtype_index])
+    nbytes = tensor.numel() * tensor.element_size()
+    if nbytes > 0:
+        tensor.numpy().reshape(-1).view(np.uint8)[:] = array[offset:offset + nbytes]
+    return tensor, offset + nbytes
+
+
+def _decode_objects(array):
+    (num_objects,) = struct.unpack_from('<q', array, 0)
+    offset = 8
+    objects = []
+    for _ in range(num_objects):
+        (kind,) = struct.unpack_from('<B', array, offset)
+        offset += 1
+        if kind == _OBJECT_TENSOR:
+            obj, offset = _decode_tensor(array, offset)
+        elif kind == _OBJECT_TENSOR_DICT:
+            (num_items,) = struct.unpack_from('<q', array, offset)
+            offset += 8
+            obj = {}
+            for _ in range(num_items):
+                (key_length,) = struct.unpack_from('<q', array, offset)
+                key = array[offset + 8:offset + 8 + key_length].tobytes().decode('utf-8')
+                obj[key], offset = _decode_tensor(array, offset + 8 + key_length)
+        else:
+            (length,) = struct.unpack_from('<q', array, offset)
+            obj = pickle.loads(array[offset + 8:offset + 8 + length].tobytes())
+            offset += 8 + length
+        objects.append(obj)
+    return objects
+
+
+class _ObjectBuffers(object):
+    """
+    Persistent buffers of the coalesced object collectives of a group. Each
+    rank sends the length of its message followed by the message, padded to
+    the capacity of the buffers, which is the same on all ranks. It grows when
+    a message does not fit, and shrinks back to the next power of two of the
+    largest recent message once messages stay well under it, so that a single
+    large message does not make all later collectives move large buffers.
+
+    """
+    def __init__(self, world_size, device):
+        self.world_size = world_size
+        self.device = device
+        self.resize(_OBJECT_BUFFER_MIN_CAPACITY)
+
+    def resize(self, capacity):
+        self.capacity = capacity
+        # Number of consecutive calls for which the buffers were too large, and
+        # largest message length over these calls
+        self.underused_calls = 0
+        self.underused_max_length = 0
+        self.send = torch.empty(capacity, dtype=torch.uint8)
+        self.send_array = self.send.numpy()
+        self.device_send = self.send if self.device.type == 'cpu' else self.send.to(self.device)
+        self.recv = torch.empty(capacity * self.world_size, dtype=torch.uint8, device=self.device)
+
+    def write(self, message):
+        import numpy as np
+
+        length = 8 + len(message)
+        self.send_array[:8] = np.frombuffer(struct.pack('<q', length), dtype=np.uint8)
+        fits = min(length, self.capacity) - 8
+        self.send_array[8:8 + fits] = np.frombuffer(message, dtype=np.uint8, count=fits)
+        if self.device_send is not self.send:
+            self.device_send.copy_(self.send)
+
+    def grow(self, length):
+        capacity = self.capacity
+        while capacity < length:
+            capacity *= 2
+        self.resize(capacity)
+
+    def update(self, max_length):
+        # Called after each collective with the length of the largest message,
+        # which is the same on all ranks, so that they all shrink together
+        if max_length * _OBJECT_BUFFER_SHRINK_FACTOR > self.capacity:
+            self.underused_calls = 0
+            self.underused_max_length = 0
+            return
+        self.underused_calls += 1
+        self.underused_max_length = max(self.underused_max_length, max_length)
+        if self.underused_calls >= _OBJECT_BUFFER_SHRINK_CALLS:
+            capacity = 1 << (self.underused_max_length - 1).bit_length()
+            self.resize(max(capacity, _OBJECT_BUFFER_MIN_CAPACITY))
+
+    def received(self):
+        # The lengths of the messages received from each rank, and the
+        # messages as numpy arrays if they all fit
+        array = self.recv.cpu().numpy()
+        lengths = [struct.unpack_from('<q', array, i * self.capacity)[0]
+                   for i in range(self.world_size)]
+        if max(lengths) > self.capacity:
+            return lengths, None
+        return lengths, [array[i * self.capacity + 8:i * self.capacity + length]
+                         for i, length in enumerate(lengths)]
+
+
+def _get_object_buffers(group):
+    if get_backend(group) == Backend.NCCL:
+        device = torch.device('cuda', torch.cuda.current_device())
+    else:
+        device = torch.device('cpu')
+    buffers = _object_buffers.get(group)
+    if buffers is None or buffers.device != device:
+        buffers = _ObjectBuffers(get_world_size(group), device)
+        _object_buffers[group] = buffers
+    return buffers
+
+
+@_traced("input_object_list")
+def all_gather_object_coalesced(output_object_lists, input_object_list, group=group.WORLD):
+    """
+    Gathers lists of picklable objects from the whole group. Similar to
+    :func:`all_gather_object`, but gathers many objects per call, with a
+    single :func:`all_gather` in most cases.
+
+    The objects are written to a buffer that persists across calls, and whose
+    size is the same for all ranks. It grows when the objects of a rank do not
+    fit, which then takes another :func:`all_gather`, and shrinks back after
+    several calls with much smaller objects. Tensors on the CPU that
+    do not require grad, and dicts from strings to such tensors, are written
+    without ``pickle``.
+
+    Arguments:
+        output_object_lists (list[Any]): Output list. It should be correctly
+            sized as the size of the group for this collective, and will
+            contain the list of objects of each rank.
+        input_object_list (list[Any]): List of picklable Python objects to be
+            gathered from the current process.
+        group (ProcessGroup, optional): The process group to work on
+
+    Returns:
+        None. If the calling rank is part of this group, the output of the
+        collective will be populated into the input ``output_object_lists``.
+
+    .. warning::
+        :func:`all_gather_object_coalesced` uses ``pickle`` module implicitly,
+        which is known to be insecure. It is possible to construct malicious
+        pickle data which will execute arbitrary code during unpickling. Only
+        call this function with data you trust.
+    """
+    if _rank_not_in_group(group):
+        return
+
+    buffers = _get_object_buffers(group)
+    message = _encode_objects(input_object_list)
+    buffers.write(message)
+    all_gather(list(buffers.recv.chunk(buffers.world_size)), buffers.device_send, group=group)
+    lengths, messages = buffers.received()
+    if messages is None:
+        buffers.grow(max(lengths))
+        buffers.write(message)
+        all_gather(list(buffers.recv.chunk(buffers.world_size)), buffers.device_send, group=group)
+        _, messages = buffers.received()
+    buffers.update(max(lengths))
+    for i, array in enumerate(messages):
+        output_object_lists[i] = _decode_objects(array)
+
+
+@_traced("input_object_list")
+def gather_object_coalesced(input_object_list, output_object_lists=None, dst=0, group=group.WORLD):
+    """
+    Gathers lists of picklable objects from the whole group in a single
+    process. Similar to :func:`gather_object`, but gathers many objects per
+    call, with a single :func:`gather` and a :func:`broadcast` of the size of
+    the largest list in most cases. See :func:`all_gather_object_coalesced`.
+
+    Arguments:
+        input_object_list (list[Any]): List of picklable Python objects to be
+            gathered from the current process.
+        output_object_lists (list[Any]): Output list. On the ``dst`` rank, it
+            should be correctly sized as the size of the group for this
+            collective and will contain the list of objects of each rank. Must
+            be ``None`` on non-dst ranks. Default is None.
+        dst (int, optional): Destination rank (default is 0)
+        group: (ProcessGroup, optional): The process group to work on.
+
+    Returns:
+        None. On the ``dst`` rank, ``output_object_lists`` will contain the
+        output of the collective.
+
+    .. note:: Note that this API is not supported when using the NCCL backend.
+
+    .. warning::
+        :func:`gather_object_coalesced` uses ``pickle`` module implicitly,
+        which is known to be insecure. It is possible to construct malicious
+        pickle data which will execute arbitrary code during unpickling. Only
+        call this function with data you trust.
+    """
+    if _rank_not_in_group(group):
+        return
+
+    my_rank = get_rank()
+    _validate_output_list_for_rank(my_rank, dst, output_object_lists)
+    buffers = _get_object_buffers(group)
+    message = _encode_objects(input_object_list)
+    buffers.write(message)
+
+    def gather_messages():
+        gather(buffers.device_send,
+               gather_list=list(buffers.recv.chunk(buffers.world_size)) if my_rank == dst else None,
+               dst=dst,
+               group=group)
+
+    gather_messages()
+    # Only the destination knows whether a message did not fit
+    max_length = torch.zeros(1, dtype=torch.long)
+    if my_rank == dst:
+        lengths, messages = buffers.received()
+        max_length[0] = max(lengths)
+    broadcast(max_length, dst, group=group)
+    if max_length.item() > buffers.capacity:
+        buffers.grow(max_length.item())
+        buffers.write(message)
+        gather_messages()
+        if my_rank == dst:
+            _, messages = buffers.received()
+    buffers.update(max_length.item())
+    if my_rank != dst:
+        return
+    for i, array in enumerate(messages):
+        output_object_lists[i] = _decode_objects(array)
+
+
+@_traced("tensor")
 def all_gather(tensor_list,
                tensor,
                group=group.WORLD,
@@ -1355,6 +1720,7 @@ def all_gather(tensor_list,
     else:
         work.wait()
 
+@_traced("input_tensor_list")
 def all_gather_coalesced(output_tensor_lists,
                          input_tensor_list,
                          group=group.WORLD,
@@ -1435,6 +1801,7 @@ def _validate_output_list_for_rank(my_rank, dst, gather_list):
         )
 
 
+@_traced("tensor")
 def gather(tensor,
            gather_list=None,
            dst=0,
@@ -1490,6 +1857,7 @@ def gather(tensor,
         work.wait()
 
 
+@_traced("tensor")
 def scatter(tensor,
             scatter_list=None,
             src=0,
@@ -1556,6 +1924,7 @@ def scatter(tensor,
         work.wait()
 
 
+@_traced("input_tensor_lists")
 def reduce_scatter_multigpu(output_tensor_list,
                             input_tensor_lists,
                             op=ReduceOp.SUM,
@@ -1627,6 +1996,7 @@ def reduce_scatter_multigpu(output_tensor_list,
         work.wait()
 
 
+@_traced("input_list")
 def reduce_scatter(output,
                    input_list,
                    op=ReduceOp.SUM,
@@ -1666,6 +2036,7 @@ def reduce_scatter(output,
         work.wait()
 
 
+@_traced("input")
 def all_to_all_single(output,
                       input,
                       output_split_sizes=None,
@@ -1761,6 +2132,7 @@ def all_to_all_single(output,
     else:
         work.wait()
 
+@_traced("input_tensor_list")
 def all_to_all(output_tensor_list,
                input_tensor_list,
                group=group.WORLD,
@@ -1853,6 +2225,7 @@ def all_to_all(output_tensor_list,
         work.wait()
 
 
+@_traced()
 def barrier(group=group.WORLD,
             async_op=False):
     """
@@ -1959,3 +2332,162 @@ def new_group(ranks=None, timeout=default_pg_timeout, backend=None):
     }
 
     return pg
+
+
+class _HierarchicalGroup(object):
+    """
+    Sub-groups used by :func:`all_reduce` and :func:`all_reduce_coalesced`
+    on a group created by :func:`new_hierarchical_group`.
+
+    """
+    def __init__(self, intra_node_group, inter_node_group, node_ranks, uniform):
+        self.intra_node_group = intra_node_group
+        # Groups the ranks with the same local rank on every node if all nodes
+        # have the same number of ranks, or the first rank of every node
+        # otherwise
+        self.inter_node_group = inter_node_group
+        # Global ranks of the node of this process
+        self.node_ranks = node_ranks
+        self.local_rank = node_ranks.index(_default_pg.rank())
+        self.uniform = uniform
+
+
+class _CompletedWork(object):
+    """
+    Work handle of the collectives on a hierarchical group, which complete
+    before returning.
+
+    """
+    def wait(self):
+        return True
+
+    def is_completed(self):
+        return True
+
+    def is_success(self):
+        return True
+
+
+def _hierarchical_all_reduce(tensors, op, group, async_op):
+    for tensor in tensors:
+        if tensor.is_sparse:
+            raise RuntimeError("all_reduce on a hierarchical group does not "
+                               "support sparse tensors")
+    numel = sum(t.numel() for t in tensors)
+    if numel == 0:
+        return _CompletedWork() if async_op else None
+    local_world_size = len(group.node_ranks)
+    if group.uniform:
+        # Pad to chunks of the same size for each rank of the node
+        chunk_numel = (numel + local_world_size - 1) // local_world_size
+        buffer = tensors[0].new_zeros(chunk_numel * local_world_size)
+    else:
+        buffer = tensors[0].new_zeros(numel)
+    offset = 0
+    for tensor in tensors:
+        buffer[offset:offset + tensor.numel()].view_as(tensor).copy_(tensor)
+        offset += tensor.numel()
+
+    if group.uniform:
+        # Reduce-scatter within the node, with one reduce per chunk since gloo
+        # does not support reduce_scatter. Then all ranks all-reduce their
+        # chunk across nodes, in parallel, and all-gather the chunks within
+        # the node.
+        chunks = list(buffer.chunk(local_world_size))
+        works = [reduce(chunk, dst, op=op, group=group.intra_node_group, async_op=True)
+                 for chunk, dst in zip(chunks, group.node_ranks)]
+        for work in works:
+            work.wait()
+        local_chunk = chunks[group.local_rank]
+        all_reduce(local_chunk, op=op, group=group.inter_node_group)
+        all_gather(chunks, local_chunk.clone(), group=group.intra_node_group)
+    else:
+        # Reduce to the first rank of the node, all-reduce across nodes among
+        # the first ranks, and broadcast within the node
+        leader = group.node_ranks[0]
+        reduce(buffer, leader, op=op, group=group.intra_node_group)
+        all_reduce(buffer, op=op, group=group.inter_node_group)
+        broadcast(buffer, leader, group=group.intra_node_group)
+
+    offset = 0
+    for tensor in tensors:
+        tensor.copy_(buffer[offset:offset + tensor.numel()].view_as(tensor))
+        offset += tensor.numel()
+
+    if async_op:
+        return _CompletedWork()
+
+
+def new_hierarchical_group(local_world_size=None, timeout=default_pg_timeout, backend=None):
+    """
+    Creates a group of all processes whose :func:`all_reduce` and
+    :func:`all_reduce_coalesced` are done in two levels: the tensors are
+    reduce-scattered within each node, each rank all-reduces its chunk with
+    the ranks of the same local rank on the other nodes, and the chunks are
+    all-gathered within each node. Only ``1 / local_world_size`` of the
+    tensors is sent across nodes by each rank, which scales better than a
+    single ring over all processes when the network between nodes is the
+    bottleneck.
+
+    If the nodes have different numbers of processes, the tensors are instead
+    reduced to the first rank of each node, all-reduced among those ranks,
+    and broadcast within each node.
+
+    This function creates the sub-groups with :func:`new_group`, and requires
+    that all processes enter it, in the same order as the other calls to
+    :func:`new_group`. The returned group can only be passed to
+    :func:`all_reduce` and :func:`all_reduce_coalesced`.
+
+    Arguments:
+        local_world_size (int, optional): Number of processes per node, whose
+            global ranks are consecutive. By default, processes are grouped
+            by the hostname of their machine.
+        timeout (timedelta, optional): Timeout for operations executed against
+            the sub-groups, see :func:`new_group`.
+        backend (str or Backend, optional): The backend of the sub-groups, see
+            :func:`new_group`.
+
+    Returns:
+        A handle of distributed group that can be given to :func:`all_reduce`
+        and :func:`all_reduce_coalesced`.
+    """
+    _check_default_pg()
+    global_rank = _default_pg.rank()
+    world_size = _default_pg.size()
+
+    if local_world_size is None:
+        hostnames = [None] * world_size
+        all_gather_object(hostnames, socket.gethostname())
+        unique_hostnames = []
+        for hostname in hostnames:
+            if hostname not in unique_hostnames:
+                unique_hostnames.append(hostname)
+        nodes = [[rank for rank, hostname in enumerate(hostnames) if hostname == node_hostname]
+                 for node_hostname in unique_hostnames]
+    else:
+        if local_world_size <= 0 or world_size % local_world_size != 0:
+            raise ValueError("local_world_size should be a positive divisor of "
+                             "the world size {}, but got {}".format(world_size, local_world_size))
+        nodes = [list(range(start, start + local_world_size))
+                 for start in range(0, world_size, local_world_size)]
+
+    intra_node_group = GroupMember.NON_GROUP_MEMBER
+    node_ranks = None
+    for ranks in nodes:
+        pg = new_group(ranks, timeout=timeout, backend=backend)
+        if global_rank in ranks:
+            intra_node_group = pg
+            node_ranks = ranks
+
+    uniform = all(len(ranks) == len(nodes[0]) for ranks in nodes)
+    if uniform:
+        cross_node_ranks = [[ranks[i] for ranks in nodes] for i in range(len(nodes[0]))]
+    else:
+        cross_node_ranks = [[ranks[0] for ranks in nodes]]
+    inter_node_group = GroupMember.NON_GROUP_MEMBER
+    for ranks in cross_node_ranks:
+        pg = new_group(ranks, timeout=timeout, backend=backend)
+        if global_rank in ranks:
+            inter_node_group = pg
+
+    return _HierarchicalGroup(intra_node_group, inter_node_group, node_ranks, uniform)
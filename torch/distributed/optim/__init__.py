@@ -4,5 +4,9 @@ of remote parameters (:class:`~torch.distributed.rpc.RRef`) and runs the
 optimizer locally on the workers where the parameters live.  The distributed
 optimizer can use any of the local optimizer :ref:`optimizer-algorithms` to
 apply the gradients on each worker.
+
+It also exposes ZeroRedundancyOptimizer, which wraps a local optimizer to shard
+its state across the ranks of a process group, for data parallel training.
 """
 from .optimizer import DistributedOptimizer
+from .zero_redundancy_optimizer import ZeroRedundancyOptimizer
@@ -0,0 +1,265 @@
+from collections import OrderedDict
+
+import torch
+import torch.distributed as dist
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
+from torch.optim import Optimizer
+
+
+def _to_cpu(value):
+    if isinstance(value, torch.Tensor):
+        return value.cpu()
+    elif isinstance(value, dict):
+        return {k: _to_cpu(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return type(value)(_to_cpu(v) for v in value)
+    return value
+
+
+def _broadcast_object(obj, src, group, device):
+    # Broadcasts the picklable `obj` of global rank `src`, and returns it
+    if dist.get_rank() == src:
+        tensor, size = dist.distributed_c10d._object_to_tensor(obj)
+        dist.broadcast(size.to(device), src, group=group)
+        dist.broadcast(tensor.to(device), src, group=group)
+        return obj
+    size = torch.zeros(1, dtype=torch.long, device=device)
+    dist.broadcast(size, src, group=group)
+    tensor = torch.empty(size.item(), dtype=torch.uint8, device=device)
+    dist.broadcast(tensor, src, group=group)
+    return dist.distributed_c10d._tensor_to_object(tensor.cpu(), size.item())
+
+
+class ZeroRedundancyOptimizer(Optimizer):
+    r"""Wraps an optimizer to shard its state across the ranks of a process
+    group, as in `ZeRO <https://arxiv.org/abs/1910.02054>`_.
+
+    The parameters of each param group are partitioned across ranks, largest
+    first, to the rank holding the fewest elements so far. Each rank only
+    creates the wrapped optimizer over its own shard, so the optimizer state
+    (e.g., the running averages of :class:`~torch.optim.Adam`) takes about
+    ``1 / world_size`` of the memory it would take on every rank otherwise.
+
+    :meth:`step` updates the shard of the rank with the gradients it holds,
+    which should be the same on all ranks, e.g., after the backward pass of
+    :class:`~torch.nn.parallel.DistributedDataParallel`, and then broadcasts
+    the updated parameters of every shard from the rank owning it.
+
+    The options of the param groups (e.g., the learning rate) can be changed
+    through :attr:`param_groups` as for any optimizer, including by learning
+    rate schedulers. :attr:`state` is empty, since the state lives in the
+    wrapped optimizer of each rank, :attr:`optim`.
+
+    Arguments:
+        params (iterable): an iterable of :class:`torch.Tensor` s or
+            :class:`dict` s, the same on all ranks.
+        optimizer_class (type): the class of the wrapped optimizer, e.g.,
+            :class:`torch.optim.Adam`.
+        group (ProcessGroup, optional): the process group to shard the state
+            across (default: the default process group).
+        **defaults: keyword arguments of ``optimizer_class``.
+
+    Example::
+        >>> ddp_model = DistributedDataParallel(model, device_ids=[rank])
+        >>> optimizer = ZeroRedundancyOptimizer(ddp_model.parameters(), optim.Adam, lr=0.01)
+        >>> loss_fn(ddp_model(input), target).backward()
+        >>> optimizer.step()
+        >>> # Gather the full state on rank 0 to checkpoint it
+        >>> optimizer.consolidate_state_dict(to=0)
+        >>> if rank == 0:
+        >>>     torch.save(optimizer.state_dict(), PATH)
+    """
+
+    def __init__(self, params, optimizer_class, group=None, **defaults):
+        self.group = group if group is not None else dist.group.WORLD
+        self.world_size = dist.get_world_size(self.group)
+        self.rank = dist.get_rank(self.group)
+        if self.group is dist.group.WORLD:
+            self._global_ranks = list(range(self.world_size))
+        else:
+            self._global_ranks = [dist.distributed_c10d._get_global_rank(self.group, rank)
+                                  for rank in range(self.world_size)]
+        self._optimizer_class = optimizer_class
+        self._optimizer_defaults = defaults
+        # `_partition[rank][i]` holds the indices of the params of
+        # `param_groups[i]` owned by `rank`
+        self._partition = [[] for _ in range(self.world_size)]
+        self._rank_numels = [0] * self.world_size
+        self._broadcast_buckets = None
+        self._all_state_dicts = None
+        self.optim = None
+        # Calls `add_param_group` for each group, which creates `optim`
+        super(ZeroRedundancyOptimizer, self).__init__(params, defaults)
+
+    def _partition_param_group(self, params):
+        for partition in self._partition:
+            partition.append([])
+        # Largest params first, to the rank holding the fewest elements
+        for i in sorted(range(len(params)), key=lambda i: -params[i].numel()):
+            rank = min(range(self.world_size), key=lambda rank: self._rank_numels[rank])
+            self._partition[rank][-1].append(i)
+            self._rank_numels[rank] += params[i].numel()
+        for partition in self._partition:
+            partition[-1].sort()
+
+    def add_param_group(self, param_group):
+        r"""Adds a param group to the :class:`Optimizer` s ``param_groups``,
+        and its params owned by this rank to the wrapped optimizer.
+
+        All ranks should add the same param groups.
+
+        Arguments:
+            param_group (dict): Specifies what Tensors should be optimized along with group
+            specific optimization options.
+        """
+        super(ZeroRedundancyOptimizer, self).add_param_group(param_group)
+        group = self.param_groups[-1]
+        self._partition_param_group(group['params'])
+        local_group = {k: v for k, v in group.items() if k != 'params'}
+        local_group['params'] = [group['params'][i] for i in self._partition[self.rank][-1]]
+        if self.optim is None:
+            self.optim = self._optimizer_class([local_group], **self._optimizer_defaults)
+        else:
+            self.optim.add_param_group(local_group)
+        # Expose the options the wrapped optimizer defaults to in the group
+        for k, v in self.optim.param_groups[-1].items():
+            if k != 'params':
+                group.setdefault(k, v)
+        self._broadcast_buckets = None
+
+    def _get_broadcast_buckets(self):
+        # The params of each rank, bucketed by device and dtype, as a list of
+        # (rank, params) to broadcast from `rank`
+        if self._broadcast_buckets is None:
+            self._broadcast_buckets = []
+            for rank, partition in enumerate(self._partition):
+                buckets = OrderedDict()
+                for group, indices in zip(self.param_groups, partition):
+                    for i in indices:
+                        p = group['params'][i]
+                        buckets.setdefault((p.device, p.dtype), []).append(p)
+                self._broadcast_buckets.extend((rank, params) for params in buckets.values())
+        return self._broadcast_buckets
+
+    @torch.no_grad()
+    def _broadcast_params(self):
+        works = []
+        received = []
+        for rank, params in self._get_broadcast_buckets():
+            if rank == self.rank:
+                flat = _flatten_dense_tensors(params)
+            else:
+                flat = params[0].new_empty(sum(p.numel() for p in params))
+                received.append((flat, params))
+            works.append(dist.broadcast(flat, self._global_ranks[rank], group=self.group, async_op=True))
+        for work in works:
+            work.wait()
+        for flat, params in received:
+            for p, synced in zip(params, _unflatten_dense_tensors(flat, params)):
+                p.copy_(synced)
+
+    def step(self, closure=None):
+        r"""Performs a single optimization step of the params of this rank,
+        and broadcasts the updated params of all ranks.
+
+        Arguments:
+            closure (callable, optional): A closure that reevaluates the model
+                and returns the loss.
+        """
+        # Propagate the options changed in `param_groups`, e.g., by a scheduler
+        for group, local_group in zip(self.param_groups, self.optim.param_groups):
+            for k, v in group.items():
+                if k != 'params':
+                    local_group[k] = v
+        if closure is None:
+            loss = self.optim.step()
+        else:
+            loss = self.optim.step(closure)
+        self._broadcast_params()
+        return loss
+
+    def consolidate_state_dict(self, to=0):
+        r"""Gathers the state of the wrapped optimizers of all ranks on rank
+        ``to``, moving it to the CPU, for :meth:`state_dict`.
+
+        This is a collective operation, which should be called by all ranks.
+
+        Arguments:
+            to (int): the rank within the process group to gather the state
+                on (default: ``0``).
+        """
+        if dist.get_backend(self.group) == dist.Backend.NCCL:
+            device = torch.device('cuda', torch.cuda.current_device())
+        else:
+            device = torch.device('cpu')
+        local_state_dict = _to_cpu(self.optim.state_dict())
+        all_state_dicts = []
+        for rank in range(self.world_size):
+            state_dict = _broadcast_object(local_state_dict if rank == self.rank else None,
+                                           self._global_ranks[rank], self.group, device)
+            if self.rank == to:
+                all_state_dicts.append(state_dict)
+        self._all_state_dicts = all_state_dicts if self.rank == to else None
+
+    def state_dict(self):
+        r"""Returns the state of the optimizer, over all ranks, as a
+        :class:`dict` in the format of the wrapped optimizer, so that it can
+        also be loaded by an instance of it over all params.
+
+        It is the state gathered by the last call to
+        :meth:`consolidate_state_dict` on this rank.
+        """
+        if self._all_state_dicts is None:
+            raise RuntimeError("the state of all ranks should be gathered on this rank "
+                               "with consolidate_state_dict() before calling state_dict()")
+        offsets = [0]
+        for group in self.param_groups:
+            offsets.append(offsets[-1] + len(group['params']))
+        state = {}
+        for partition, local_state_dict in zip(self._partition, self._all_state_dicts):
+            for offset, indices, local_group in zip(offsets, partition, local_state_dict['param_groups']):
+                for i, local_id in zip(indices, local_group['params']):
+                    if local_id in local_state_dict['state']:
+                        state[offset + i] = local_state_dict['state'][local_id]
+        param_groups = []
+        for offset, group in zip(offsets, self.param_groups):
+            packed = {k: v for k, v in group.items() if k != 'params'}
+            packed['params'] = list(range(offset, offset + len(group['params'])))
+            param_groups.append(packed)
+        return {
+            'state': state,
+            'param_groups': param_groups,
+        }
+
+    def load_state_dict(self, state_dict):
+        r"""Loads the optimizer state, keeping only the state of the params of
+        this rank in the wrapped optimizer.
+
+        Arguments:
+            state_dict (dict): optimizer state. Should be an object returned
+                from a call to :meth:`state_dict`, or to the
+                :meth:`~torch.optim.Optimizer.state_dict` of the wrapped
+                optimizer over the same params.
+        """
+        saved_groups = state_dict['param_groups']
+        if len(self.param_groups) != len(saved_groups):
+            raise ValueError("loaded state dict has a different number of "
+                             "parameter groups")
+        if any(len(g['params']) != len(s['params']) for g, s in zip(self.param_groups, saved_groups)):
+            raise ValueError("loaded state dict contains a parameter group "
+                             "that doesn't match the size of optimizer's group")
+        local_state = {}
+        local_groups = []
+        for group, indices, saved_group in zip(self.param_groups, self._partition[self.rank], saved_groups):
+            local_group = {k: v for k, v in saved_group.items() if k != 'params'}
+            local_group['params'] = []
+            for i in indices:
+                saved_id = saved_group['params'][i]
+                if saved_id in state_dict['state']:
+                    local_state[saved_id] = state_dict['state'][saved_id]
+                local_group['params'].append(saved_id)
+            local_groups.append(local_group)
+            for k, v in saved_group.items():
+                if k != 'params':
+                    group[k] = v
+        self.optim.load_state_dict({'state': local_state, 'param_groups': local_groups})
@@ -30,6 +30,18 @@ def _find_module_of_method(orig_method):
             return guess.__name__
     raise RuntimeError(f'cannot find module for {orig_method}')
 
+def _base_name(op):
+    # Returns the base of the names of values computed by op, and whether it
+    # shadows a name of torch, in which case the names always get a suffix.
+    if _is_magic(op):
+        op = op[2:-2]
+    op = snake_case(op.replace('.', '_'))
+    return op, hasattr(torch, op) or hasattr(torch.nn.functional, op) or hasattr(torch.nn, op)
+
+# op -> (base name, shadows torch), shared by all graphs since computing it is
+# a large part of the cost of creating nodes
+_base_names = {}
+
 def _format_args(args, kwargs):
     args_s = ', '.join(repr(a) for a in args)
     kwargs_s = ', '.join(f'{k} = {repr(v)}' for k, v in kwargs.items())
@@ -84,9 +96,10 @@ class Graph:
     def node_copy(self, node, arg_transform=lambda x: x):
         """ copy a node from one graph into another. arg_transform needs to transform arguments from the graph of node
             to the graph of self"""
+        # placeholders keep their name, which the generated code binds to the argument
+        name = node.name if node.op == 'placeholder' else self._name(node.name)
         return self.create_node(
-            node.op, node.target, map_arg(node.args, arg_transform), map_arg(node.kwargs, arg_transform),
-            self._name(node.name))
+            node.op, node.target, map_arg(node.args, arg_transform), map_arg(node.kwargs, arg_transform), name)
 
     def output(self, result):
         self.result = result
@@ -97,14 +110,14 @@ class Graph:
         if hasattr(op, '__name__'):
             op = op.__name__
 
-        if _is_magic(op):
-            op = op[2:-2]
-        op = op.replace('.', '_')
-        op = snake_case(op)
+        base = _base_names.get(op)
+        if base is None:
+            base = _base_names[op] = _base_name(op)
+        op, shadows_torch = base
 
         if op not in self._used_names:
             self._used_names[op] = 0
-            if not hasattr(torch, op) and not hasattr(torch.nn.functional, op) and not hasattr(torch.nn, op):
+            if not shadows_torch:
                 return op
         i = self._used_names[op] = self._used_names[op] + 1
         return f'{op}_{i}'
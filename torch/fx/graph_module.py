@@ -26,6 +26,10 @@ def patched_getline(*args, **kwargs):
 linecache.getlines = patched_getline
 
 
+def _deserialize_graph_module(root, graph):
+    return GraphModule(root, graph)
+
+
 class GraphModule(torch.nn.Module):
     def __new__(cls, *args, **kwargs):
         # each instance of a graph module needs its own forward method
@@ -42,6 +46,11 @@ class GraphModule(torch.nn.Module):
         self.graph = graph
         self._generate_forward()
 
+    # the class of each instance is generated, so GraphModules are pickled by
+    # their root and graph instead, and their code is regenerated
+    def __reduce__(self):
+        return (_deserialize_graph_module, (self.root, self.graph))
+
     def _generate_forward(self):
         body, result, free_variables = self.graph.python_code(root_module='self')
         body = '\n'.join('    ' + line for line in body.split('\n')) + '\n'
@@ -0,0 +1,34 @@
+# type: ignore
+r'''
+Graph transformations over `GraphModule`s. Each pass takes a `GraphModule` and returns a new one over the same
+root module (or a copy of it, for passes adding buffers or replacing modules), with a rewritten `Graph` and regenerated
+code:
+
+```
+from torch.fx import symbolic_trace
+from torch.fx.passes import eliminate_common_subexpressions, eliminate_dead_code, fold_constants
+
+gm = symbolic_trace(model.eval())
+gm = eliminate_dead_code(fold_constants(eliminate_common_subexpressions(gm)))
+```
+
+- `eliminate_dead_code` removes the nodes whose values are never used
+- `eliminate_common_subexpressions` merges the nodes computing the same value
+- `fold_constants` precomputes the parts of the graph that only depend on parameters (inference only)
+- `fuse` fuses conv/linear -> batch norm -> activation chains of module calls into single modules
+
+`ShapeProp` records the shape, dtype and device of every value for example inputs, from which `plan_memory`
+computes a static reuse plan of preallocated arenas for fixed-shape inference, applied by `apply_memory_plan`.
+
+`split_module` splits a `GraphModule` into a sequence of stages balancing the costs from `estimate_costs`, which
+`Pipeline` runs in their own processes over micro-batches.
+'''
+
+from .common_subexpression_elimination import eliminate_common_subexpressions
+from .constant_folding import fold_constants
+from .dead_code_elimination import eliminate_dead_code
+from .fusion import fuse
+from .memory_planner import MemoryPlan, apply_memory_plan, plan_memory
+from .pipeline import Pipeline
+from .shape_prop import ShapeProp
+from .split_module import estimate_costs, split_module
@@ -0,0 +1,70 @@
+# type: ignore
+import torch
+
+from ..graph import Graph, map_arg
+from ..graph_module import GraphModule
+from ..node import Node
+from .utils import input_nodes, is_impure, is_nondeterministic, may_alias_inputs
+
+
+def _hashable(a):
+    # Turns an argument into a hashable key. Types are part of the key so that
+    # e.g. `1`, `1.0` and `True` are not merged, and tensors compare by identity.
+    if isinstance(a, (tuple, list)):
+        return (type(a),) + tuple(_hashable(elem) for elem in a)
+    elif isinstance(a, dict):
+        return (dict,) + tuple((k, _hashable(v)) for k, v in a.items())
+    elif isinstance(a, slice):
+        return (slice, _hashable(a.start), _hashable(a.stop), _hashable(a.step))
+    elif isinstance(a, (Node, torch.Tensor)):
+        return (type(a), id(a))
+    return (type(a), a)
+
+
+def eliminate_common_subexpressions(gm: GraphModule) -> GraphModule:
+    """ Merge the nodes of gm computing the same value.
+
+    Two nodes are merged when they have the same `(op, target, args, kwargs)`
+    once their inputs have themselves been merged, e.g. repeated parameter fetches
+    and `getattr` chains. Impure and nondeterministic nodes are never merged,
+    and neither are the inputs of impure nodes, nor the values those may be
+    views of, since an in-place update of one would be seen through the other. Impure nodes are also barriers: nodes after
+    one are never merged with nodes before it, whose inputs may have been updated
+    since. Returns a new GraphModule over the same root.
+    """
+    graph = gm.graph
+    modules = dict(gm.root.named_modules())
+
+    # nodes whose values the value of each node may share memory with, so that
+    # an in-place update through a view also excludes the viewed node
+    aliases = {}
+    mutable = set()
+    for node in graph.nodes:
+        aliases[node] = {node}
+        if may_alias_inputs(node):
+            for n in input_nodes(node):
+                aliases[node] |= aliases[n]
+        if is_impure(node, modules):
+            for n in input_nodes(node):
+                mutable |= aliases[n]
+
+    new_graph = Graph()
+    env = {}
+    seen = {}
+    for node in graph.nodes:
+        if is_impure(node, modules):
+            env[node] = new_graph.node_copy(node, lambda n: env[n])
+            seen.clear()
+            continue
+        if node in mutable or is_nondeterministic(node, modules):
+            env[node] = new_graph.node_copy(node, lambda n: env[n])
+            continue
+        args = map_arg(node.args, lambda n: env[n])
+        kwargs = map_arg(node.kwargs, lambda n: env[n])
+        key = (node.op, _hashable(node.target), _hashable(args), _hashable(kwargs))
+        if key in seen:
+            env[node] = seen[key]
+        else:
+            env[node] = seen[key] = new_graph.node_copy(node, lambda n: env[n])
+    new_graph.output(map_arg(graph.result, lambda n: env[n]))
+    return GraphModule(gm.root, new_graph)
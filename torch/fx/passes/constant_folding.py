@@ -0,0 +1,80 @@
+# type: ignore
+import math
+
+import torch
+
+from ..graph import Graph, map_arg
+from ..graph_module import GraphModule
+from .utils import copy_root, input_nodes, is_impure, is_nondeterministic, run_node
+
+# Values that can be inlined as literals in the generated code
+_LITERAL_TYPES = (bool, int, str, torch.dtype, type(None))
+
+
+def _is_literal(v):
+    if isinstance(v, float):
+        return math.isfinite(v)
+    return isinstance(v, _LITERAL_TYPES)
+
+
+def fold_constants(gm: GraphModule, prefix='_folded_constant') -> GraphModule:
+    """ Precompute the parts of gm that only depend on parameters.
+
+    Pure, deterministic nodes whose inputs are all parameters or other such
+    nodes are evaluated once. The tensors they produce that are still needed by
+    the rest of the graph are registered as non-persistent buffers, named
+    `{prefix}_{i}`, and fetched instead of being recomputed by every `forward`,
+    while other constant values are inlined in the code.
+
+    Folding is only valid as long as the parameters are not updated, e.g. for
+    inference: the buffers hold copies of the computed values and gradients do
+    not flow through them. Returns a new GraphModule over a shallow copy of the
+    root holding the buffers, which shares the submodules and parameters of the
+    root and leaves it unchanged.
+    """
+    graph = gm.graph
+    root = gm.root
+    modules = dict(root.named_modules())
+
+    # values of the foldable nodes
+    constants = {}
+    with torch.no_grad():
+        for node in graph.nodes:
+            if node.op == 'get_param':
+                constants[node] = run_node(node, (), {}, root, modules)
+                continue
+            if is_impure(node, modules) or is_nondeterministic(node, modules) or \
+                    not all(n in constants for n in input_nodes(node)):
+                continue
+            value = run_node(node, map_arg(node.args, lambda n: constants[n]),
+                             map_arg(node.kwargs, lambda n: constants[n]), root, modules)
+            if isinstance(value, torch.Tensor) or _is_literal(value):
+                constants[node] = value
+
+    # the folded nodes whose values are used by the rest of the graph
+    needed = set()
+    for node in graph.nodes:
+        if node not in constants:
+            needed.update(n for n in input_nodes(node) if n in constants)
+    map_arg(graph.result, lambda n: needed.add(n) if n in constants else None)
+
+    new_root = copy_root(root)
+
+    new_graph = Graph()
+    env = {}
+    i = 0
+    for node in graph.nodes:
+        if node not in constants or (node.op == 'get_param' and node in needed):
+            env[node] = new_graph.node_copy(node, lambda n: env[n])
+        elif node in needed:
+            value = constants[node]
+            if isinstance(value, torch.Tensor):
+                while hasattr(new_root, f'{prefix}_{i}'):
+                    i += 1
+                name = f'{prefix}_{i}'
+                new_root.register_buffer(name, value, persistent=False)
+                env[node] = new_graph.get_param(name)
+            else:
+                env[node] = value
+    new_graph.output(map_arg(graph.result, lambda n: env[n]))
+    return GraphModule(new_root, new_graph)
@@ -0,0 +1,39 @@
+# type: ignore
+from ..graph import Graph, map_arg
+from ..graph_module import GraphModule
+from .utils import is_impure
+
+
+def eliminate_dead_code(gm: GraphModule) -> GraphModule:
+    """ Remove the nodes of gm whose values are never used.
+
+    Nodes are visited in reverse order, starting from their `uses` counts: a node
+    without uses is dead unless it is impure (see `is_impure`), and removing it
+    releases one use of each of its inputs, so that whole unused branches are
+    removed in a single sweep. Returns a new GraphModule over the same root.
+    """
+    graph = gm.graph
+    modules = dict(gm.root.named_modules())
+
+    uses = {node: node.uses for node in graph.nodes}
+
+    def release_use(n):
+        uses[n] -= 1
+        return n
+
+    dead = set()
+    for node in reversed(graph.nodes):
+        if uses[node] == 0 and not is_impure(node, modules):
+            dead.add(node)
+            # an input used twice by the node loses both uses
+            map_arg(node.args, release_use)
+            map_arg(node.kwargs, release_use)
+
+    new_graph = Graph()
+    env = {}
+    for node in graph.nodes:
+        if node not in dead:
+            env[node] = new_graph.node_copy(node, lambda n: env[n])
+    new_graph.output(map_arg(graph.result, lambda n: env[n]))
+    return GraphModule(gm.root, new_graph)
+
@@ -0,0 +1,161 @@
+# type: ignore
+import copy
+
+import torch
+import torch.nn.intrinsic as nni
+from torch.nn.utils.fusion import fuse_conv_bn_eval, fuse_linear_bn_eval
+
+from ..graph import Graph, map_arg
+from ..graph_module import GraphModule
+from ..node import Node
+from .utils import parent_name
+
+_BN_FOR_CONV = {
+    torch.nn.Conv1d: torch.nn.BatchNorm1d,
+    torch.nn.Conv2d: torch.nn.BatchNorm2d,
+    torch.nn.Conv3d: torch.nn.BatchNorm3d,
+}
+
+_CONV_RELU = {
+    torch.nn.Conv1d: nni.ConvReLU1d,
+    torch.nn.Conv2d: nni.ConvReLU2d,
+    torch.nn.Conv3d: nni.ConvReLU3d,
+}
+
+# Activations without a fused module, merged with a preceding Linear into a
+# Sequential, which only saves a module call
+_SEQUENTIAL_ACTIVATIONS = (torch.nn.GELU,)
+
+_RELU_FUNCTIONS = (torch.relu, torch.nn.functional.relu)
+
+
+def _single_input(node):
+    # the node whose value is the only argument of node, if any
+    if node.op == 'call_function' and node.target in _RELU_FUNCTIONS:
+        # F.relu passes `inplace` as a keyword
+        extra = set(node.kwargs) - {'inplace'}
+    elif node.op in ('call_module', 'call_method'):
+        extra = node.kwargs
+    else:
+        return None
+    if len(node.args) != 1 or extra or not isinstance(node.args[0], Node):
+        return None
+    return node.args[0]
+
+
+def _is_relu(node, modules):
+    if node.op == 'call_module':
+        return type(modules[node.target]) is torch.nn.ReLU
+    elif node.op == 'call_function':
+        return node.target in _RELU_FUNCTIONS
+    elif node.op == 'call_method':
+        return node.target == 'relu'
+    return False
+
+
+def _fold_bn(mod, bn, node):
+    # fuse_*_bn_eval need the running stats, and the affine parameters which
+    # default to the identity. node is the call of mod.
+    if bn.running_mean is None:
+        return None
+    if not bn.affine:
+        bn = copy.deepcopy(bn)
+        bn.weight = torch.nn.Parameter(torch.ones_like(bn.running_mean))
+        bn.bias = torch.nn.Parameter(torch.zeros_like(bn.running_mean))
+    if type(mod) in _BN_FOR_CONV:
+        if type(bn) is not _BN_FOR_CONV[type(mod)]:
+            return None
+        return fuse_conv_bn_eval(mod, bn)
+    if type(mod) is torch.nn.Linear:
+        # BatchNorm1d only normalizes the features of the linear layer on
+        # outputs of shape (N, features), e.g. not on (N, L, features) where it
+        # normalizes dim 1, so the shape must be known
+        shape = getattr(node, 'shape', None)
+        if type(bn) is not torch.nn.BatchNorm1d or shape is None or len(shape) != 2 or \
+                bn.num_features != mod.out_features:
+            return None
+        return fuse_linear_bn_eval(mod, bn)
+    return None
+
+
+def fuse(gm: GraphModule) -> GraphModule:
+    """ Fuse chains of module calls in gm into single modules.
+
+    The following chains are matched, where each intermediate value must only be
+    used by the next call of the chain, and the fused modules are only called once and
+    their parameters not otherwise used:
+
+    - Conv{1,2,3}d -> BatchNorm{1,2,3}d and Linear -> BatchNorm1d, in eval mode: the
+      batch norm is folded into the weights of the convolution or linear layer. Linear
+      layers are only folded if the nodes have been annotated by `ShapeProp` with
+      2-dimensional outputs, the only ones on which BatchNorm1d normalizes their features
+    - Conv{1,2,3}d -> ReLU, after any folded batch norm: replaced by `ConvReLU{1,2,3}d`
+      with an in-place ReLU
+    - Linear -> ReLU and Linear -> GELU, after any folded batch norm: replaced by
+      `LinearReLU` with an in-place ReLU, or a `Sequential` of both modules
+
+    ReLUs may also be applied with `torch.relu`, `F.relu` or `Tensor.relu`. The root
+    is copied, so that the original module is left untouched. Returns a new GraphModule
+    over the copied root.
+    """
+    root = copy.deepcopy(gm.root)
+    modules = dict(root.named_modules())
+    graph = gm.graph
+
+    calls = {}
+    # modules whose parameters are also fetched directly, which must keep their place
+    fetched = set()
+    for node in graph.nodes:
+        if node.op == 'call_module':
+            calls[node.target] = calls.get(node.target, 0) + 1
+        elif node.op == 'get_param':
+            fetched.add(parent_name(node.target)[0])
+
+    def replace_module(target, mod):
+        parent, name = parent_name(target)
+        setattr(modules[parent], name, mod)
+        modules[target] = mod
+
+    # node -> the call_module node of the chain it was merged into
+    merged = {}
+    # chains already ending with an activation
+    activated = set()
+    for node in graph.nodes:
+        prev = _single_input(node)
+        if prev is None or prev.uses != 1:
+            continue
+        head = merged.get(prev, prev)
+        if head.op != 'call_module' or calls[head.target] != 1 or head.target in fetched or \
+                head in activated:
+            continue
+        mod = modules[head.target]
+        if type(mod) not in _BN_FOR_CONV and type(mod) is not torch.nn.Linear:
+            continue
+
+        fused = None
+        if _is_relu(node, modules):
+            relu = torch.nn.ReLU(inplace=True)
+            fused = _CONV_RELU[type(mod)](mod, relu) if type(mod) in _CONV_RELU else nni.LinearReLU(mod, relu)
+            activated.add(head)
+        elif node.op == 'call_module':
+            other = modules[node.target]
+            if isinstance(other, torch.nn.modules.batchnorm._BatchNorm):
+                if head is prev and not (mod.training or other.training):
+                    fused = _fold_bn(mod, other, head)
+            elif type(mod) is torch.nn.Linear and type(other) in _SEQUENTIAL_ACTIVATIONS:
+                fused = torch.nn.Sequential(mod, other)
+                activated.add(head)
+        if fused is None:
+            continue
+        replace_module(head.target, fused)
+        merged[node] = head
+
+    new_graph = Graph()
+    env = {}
+    for node in graph.nodes:
+        if node in merged:
+            env[node] = env[merged[node]]
+        else:
+            env[node] = new_graph.node_copy(node, lambda n: env[n])
+    new_graph.output(map_arg(graph.result, lambda n: env[n]))
+    return GraphModule(root, new_graph)
@@ -0,0 +1,189 @@
+# type: ignore
+import heapq
+import operator
+
+import torch
+
+from ..graph import Graph, map_arg
+from ..graph_module import GraphModule
+from .utils import copy_root, input_nodes
+
+# Functions called with an `out` tensor when their value is planned, by
+# function, operator or method name
+_OUT_FUNCTIONS = [
+    torch.add, torch.sub, torch.mul, torch.div, torch.pow, torch.neg, torch.abs, torch.exp, torch.log,
+    torch.sqrt, torch.rsqrt, torch.sigmoid, torch.tanh, torch.mm, torch.bmm, torch.matmul, torch.addmm,
+    torch.cat,
+]
+_OUT_VARIANTS = {f: f for f in _OUT_FUNCTIONS}
+_OUT_VARIANTS.update({
+    operator.add: torch.add,
+    operator.sub: torch.sub,
+    operator.mul: torch.mul,
+    operator.truediv: torch.div,
+    operator.pow: torch.pow,
+    operator.neg: torch.neg,
+})
+_OUT_METHODS = {f.__name__: f for f in _OUT_FUNCTIONS if f is not torch.cat}
+
+# Alignment of every value in an arena, in bytes
+_ALIGNMENT = 64
+
+
+def _element_size(dtype):
+    return torch.tensor([], dtype=dtype).element_size()
+
+
+def _out_variant(node):
+    # The function to call with `out` to compute node, if its value can be
+    # planned. The first argument must be a tensor, since e.g. `2 + x` cannot be
+    # computed by `torch.add(2, x, out=...)`.
+    if node.op == 'call_function':
+        fn = _OUT_VARIANTS.get(node.target)
+    elif node.op == 'call_method':
+        fn = _OUT_METHODS.get(node.target)
+    else:
+        return None
+    if fn is None or node.shape is None or 'out' in node.kwargs or not node.args:
+        return None
+    first = node.args[0][0] if fn is torch.cat and node.args[0] else node.args[0]
+    if getattr(first, 'shape', None) is None:
+        return None
+    if fn is torch.div and not node.dtype.is_floating_point:
+        return None
+    return fn
+
+
+class MemoryPlan:
+    """ Static assignment of the values of a graph to preallocated arenas, one per
+        dtype and device. Values whose lifetimes do not overlap share memory. """
+    def __init__(self):
+        self.arenas = {}  # (dtype, device) -> number of elements
+        self.assignments = {}  # node -> ((dtype, device), offset, shape)
+
+    @property
+    def arena_bytes(self):
+        """ total size of the arenas """
+        return sum(numel * _element_size(dtype) for (dtype, _), numel in self.arenas.items())
+
+    @property
+    def planned_bytes(self):
+        """ total size of the planned values, i.e. what they would allocate without reuse """
+        return sum(shape.numel() * _element_size(key[0]) for key, _, shape in self.assignments.values())
+
+
+def plan_memory(gm: GraphModule) -> MemoryPlan:
+    """ Plan the memory of the values of gm computed by functions with an `out` variant.
+
+    The nodes must have been annotated by `ShapeProp`, and the plan is only valid for
+    inputs of the same shapes. The lifetime of a value ends at the last use of the value
+    or of any value that may alias it, which is any value computed from it by a
+    function without an `out` variant (e.g. a view). Values that may be returned by the
+    graph are not planned, since the arenas are overwritten at every call. The values
+    are then assigned greedily, in node order, to the best fitting free slot of their
+    arena, where a slot is freed after the end of the lifetime of its value.
+    """
+    graph = gm.graph
+    nodes = graph.nodes
+    if nodes and not hasattr(nodes[0], 'shape'):
+        raise RuntimeError('plan_memory needs the shapes of the values, run ShapeProp first')
+    index = {node: i for i, node in enumerate(nodes)}
+    returned = len(nodes)
+
+    last_use = {}
+    for i, node in enumerate(nodes):
+        for n in input_nodes(node):
+            last_use[n] = i
+
+    def mark_returned(n):
+        last_use[n] = returned
+        return n
+    map_arg(graph.result, mark_returned)
+
+    # planned node -> end of lifetime, extended by the nodes which may alias it
+    candidates = {node for node in nodes if _out_variant(node) is not None}
+    sources = {}
+    lifetime = {}
+    for node in nodes:
+        if node in candidates:
+            sources[node] = {node}
+        else:
+            sources[node] = set()
+            for n in input_nodes(node):
+                sources[node] |= sources[n]
+        end = last_use.get(node, index[node])
+        for c in sources[node]:
+            lifetime[c] = max(lifetime.get(c, end), end)
+
+    plan = MemoryPlan()
+    slot_sizes = []  # slot -> number of elements
+    slot_keys = []
+    slot_of = {}  # node -> slot
+    free = {}  # key -> free slots
+    active = []  # heap of (end of lifetime, slot)
+    for node in nodes:
+        if node not in candidates or lifetime[node] >= returned:
+            continue
+        i = index[node]
+        while active and active[0][0] < i:
+            _, slot = heapq.heappop(active)
+            free[slot_keys[slot]].append(slot)
+
+        key = (node.dtype, node.device)
+        numel = node.shape.numel()
+        slots = free.setdefault(key, [])
+        fitting = [s for s in slots if slot_sizes[s] >= numel]
+        if fitting:
+            slot = min(fitting, key=lambda s: slot_sizes[s])
+        elif slots:
+            slot = max(slots, key=lambda s: slot_sizes[s])
+            slot_sizes[slot] = numel
+        else:
+            slot = len(slot_sizes)
+            slot_sizes.append(numel)
+            slot_keys.append(key)
+        if slot in slots:
+            slots.remove(slot)
+        slot_of[node] = slot
+        heapq.heappush(active, (lifetime[node], slot))
+
+    # lay out the slots of each arena
+    slot_offsets = []
+    for slot, key in enumerate(slot_keys):
+        align = max(_ALIGNMENT // _element_size(key[0]), 1)
+        offset = (plan.arenas.get(key, 0) + align - 1) // align * align
+        plan.arenas[key] = offset + slot_sizes[slot]
+        slot_offsets.append(offset)
+    for node, slot in slot_of.items():
+        plan.assignments[node] = (slot_keys[slot], slot_offsets[slot], node.shape)
+    return plan
+
+
+def apply_memory_plan(gm: GraphModule, plan: MemoryPlan, prefix='_memory_plan') -> GraphModule:
+    """ Return a GraphModule computing the planned values of gm into views of the arenas of
+        plan, which are allocated once and registered as non-persistent buffers, named
+        `{prefix}_{i}`, of a shallow copy of the root that leaves it unchanged. Calls to
+        functions with an `out` argument do not support autograd, so the module must run
+        under `torch.no_grad()`. """
+    root = copy_root(gm.root)
+    arenas = {key: torch.empty(numel, dtype=key[0], device=key[1]) for key, numel in plan.arenas.items()}
+
+    new_graph = Graph()
+    env = {}
+    i = 0
+    for node in gm.graph.nodes:
+        if node not in plan.assignments:
+            env[node] = new_graph.node_copy(node, lambda n: env[n])
+            continue
+        key, offset, shape = plan.assignments[node]
+        while hasattr(root, f'{prefix}_{i}'):
+            i += 1
+        name = f'{prefix}_{i}'
+        root.register_buffer(name, arenas[key][offset:offset + shape.numel()].view(shape), persistent=False)
+        kwargs = map_arg(node.kwargs, lambda n: env[n])
+        kwargs['out'] = new_graph.get_param(name)
+        env[node] = new_graph.create_node(
+            'call_function', _out_variant(node), map_arg(node.args, lambda n: env[n]), kwargs,
+            new_graph._name(node.name))
+    new_graph.output(map_arg(gm.graph.result, lambda n: env[n]))
+    return GraphModule(root, new_graph)
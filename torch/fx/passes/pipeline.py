@@ -0,0 +1,147 @@
+# type: ignore
+import queue
+import time
+from typing import List
+
+import torch
+import torch.multiprocessing as multiprocessing
+from torch._six import container_abcs
+from torch._utils import ExceptionWrapper
+
+from ..graph_module import GraphModule
+
+# Interval in seconds at which the stage processes are checked while waiting
+# for outputs
+_STATUS_CHECK_INTERVAL = 5.0
+
+def _stage_loop(stage_idx, stage, is_last, in_queue, out_queue, num_threads):
+    # Runs stage on the micro-batches read from in_queue until None is read.
+    # The outputs of the other stages are tuples of the arguments of the next
+    # one. Exceptions are forwarded to the end of the pipeline in place of outputs.
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    with torch.no_grad():
+        while True:
+            inputs = in_queue.get()
+            if inputs is None:
+                out_queue.put(None)
+                break
+            if not isinstance(inputs, ExceptionWrapper):
+                try:
+                    outputs = stage(*inputs)
+                    inputs = (outputs,) if is_last else outputs
+                except Exception:
+                    inputs = ExceptionWrapper(where=f'in pipeline stage {stage_idx}')
+            out_queue.put(inputs)
+            del inputs
+
+
+def _scatter(args, chunks):
+    # Splits the tensors of args along their first dimension into micro-batches,
+    # repeating the other arguments in all of them.
+    split = [torch.chunk(a, chunks) if isinstance(a, torch.Tensor) else None for a in args]
+    num_micro_batches = min((len(s) for s in split if s is not None), default=1)
+    return [tuple(a if s is None else s[i] for a, s in zip(args, split)) for i in range(num_micro_batches)]
+
+
+def _gather(outputs):
+    # Concatenates the outputs of the micro-batches
+    out = outputs[0]
+    if isinstance(out, torch.Tensor):
+        return torch.cat(outputs)
+    elif isinstance(out, container_abcs.Sequence) and not isinstance(out, str):
+        return type(out)(_gather(o) for o in zip(*outputs))
+    elif isinstance(out, container_abcs.Mapping):
+        return {k: _gather([o[k] for o in outputs]) for k in out}
+    raise TypeError(f'cannot gather pipeline outputs of type {type(out)}')
+
+
+class Pipeline:
+    """ Run the stages returned by `split_module` in their own processes, each feeding the next
+        through a queue, so that the micro-batches a batch is split into flow through the stages
+        concurrently. Tensor arguments are split into `chunks` micro-batches along their first
+        dimension, and the outputs are concatenated back.
+
+        The stages run without autograd. `num_threads` sets the number of threads used by
+        each stage process. A call raises a `RuntimeError` if a stage process exits, or if
+        its outputs take more than `timeout` seconds when it is set, after which the pipeline
+        is shut down. GraphModules are picklable, so the stages can also be sent to other
+        hosts, e.g. with `torch.distributed.rpc`.
+
+        ```
+        with Pipeline(split_module(gm, 2, estimate_costs(gm, x)), chunks=4) as pipeline:
+            out = pipeline(x)
+        ```
+    """
+    def __init__(self, stages: List[GraphModule], chunks=1, num_threads=None, start_method='spawn', timeout=None):
+        self.chunks = chunks
+        self.timeout = timeout
+        context = multiprocessing.get_context(start_method)
+        self.queues = [context.Queue() for _ in range(len(stages) + 1)]
+        self.processes = []
+        for i, stage in enumerate(stages):
+            p = context.Process(target=_stage_loop,
+                                args=(i, stage, i == len(stages) - 1, self.queues[i], self.queues[i + 1],
+                                      num_threads),
+                                daemon=True)
+            p.start()
+            self.processes.append(p)
+
+    def __call__(self, *args):
+        micro_batches = _scatter(args, self.chunks)
+        for inputs in micro_batches:
+            self.queues[0].put(inputs)
+        outputs = [self._get_output() for _ in micro_batches]
+        for out in outputs:
+            if isinstance(out, ExceptionWrapper):
+                out.reraise()
+        return _gather([out[0] for out in outputs])
+
+    def _get_output(self):
+        # Waits for the next output of the last stage, checking that the stages
+        # are still running since a dead stage would never send it
+        if not self.processes:
+            raise RuntimeError('the pipeline is closed')
+        start = time.monotonic()
+        while True:
+            interval = _STATUS_CHECK_INTERVAL
+            if self.timeout is not None:
+                interval = min(interval, max(self.timeout - (time.monotonic() - start), 0))
+            try:
+                return self.queues[-1].get(timeout=interval)
+            except queue.Empty:
+                pass
+            failed = [i for i, p in enumerate(self.processes) if not p.is_alive()]
+            if failed:
+                exitcodes = ', '.join(str(self.processes[i].exitcode) for i in failed)
+                self._terminate()
+                raise RuntimeError(f'pipeline stages {failed} exited unexpectedly (exit codes {exitcodes})')
+            if self.timeout is not None and time.monotonic() - start >= self.timeout:
+                self._terminate()
+                raise RuntimeError(f'pipeline timed out after {self.timeout} seconds')
+
+    def _terminate(self):
+        for p in self.processes:
+            p.terminate()
+        for p in self.processes:
+            p.join()
+        self.processes = []
+
+    def close(self):
+        if not self.processes:
+            return
+        self.queues[0].put(None)
+        try:
+            self._get_output()
+        except RuntimeError:
+            # the stages were terminated
+            return
+        for p in self.processes:
+            p.join()
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
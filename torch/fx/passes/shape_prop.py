@@ -0,0 +1,37 @@
+# type: ignore
+import torch
+
+from ..graph import map_arg
+from ..graph_module import GraphModule
+from .utils import run_node
+
+
+class ShapeProp:
+    """ Run a GraphModule on example inputs, recording the `shape`, `dtype` and
+        `device` of the value of each node, or `None` for values that are not tensors. """
+    def __init__(self, gm: GraphModule):
+        self.gm = gm
+        self.graph = gm.graph
+        self.root = gm.root
+        self.modules = dict(self.root.named_modules())
+
+    def propagate(self, *args):
+        args_iter = iter(args)
+        env = {}
+
+        def load_arg(a):
+            return map_arg(a, lambda n: env[n.name])
+
+        for node in self.graph.nodes:
+            if node.op == 'placeholder':
+                result = next(args_iter)
+            else:
+                result = run_node(node, load_arg(node.args), load_arg(node.kwargs), self.root, self.modules)
+
+            if isinstance(result, torch.Tensor):
+                node.shape, node.dtype, node.device = result.shape, result.dtype, result.device
+            else:
+                node.shape = node.dtype = node.device = None
+            env[node.name] = result
+
+        return load_arg(self.graph.result)
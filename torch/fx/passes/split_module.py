@@ -0,0 +1,182 @@
+# type: ignore
+import time
+from typing import Dict, List
+
+import torch
+
+from ..graph import Graph, map_arg
+from ..graph_module import GraphModule
+from ..node import Node
+from .utils import input_nodes, run_node
+
+
+def _nbytes(tensors):
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def estimate_costs(gm: GraphModule, *args, num_runs=3, param_byte_cost=1e-9) -> Dict[Node, float]:
+    """ Estimate the cost of each node of gm in seconds, as its fastest runtime over num_runs runs
+        on the example inputs args, plus param_byte_cost seconds per byte of the parameters it reads
+        (those of a called module or fetched by one of its inputs). """
+    graph = gm.graph
+    root = gm.root
+    modules = dict(root.named_modules())
+
+    runtimes = {node: float('inf') for node in graph.nodes}
+    with torch.no_grad():
+        for _ in range(num_runs):
+            args_iter = iter(args)
+            env = {}
+
+            def load_arg(a):
+                return map_arg(a, lambda n: env[n])
+
+            for node in graph.nodes:
+                start = time.perf_counter()
+                if node.op == 'placeholder':
+                    result = next(args_iter)
+                else:
+                    result = run_node(node, load_arg(node.args), load_arg(node.kwargs), root, modules)
+                runtimes[node] = min(runtimes[node], time.perf_counter() - start)
+                env[node] = result
+
+    costs = {}
+    for node in graph.nodes:
+        nbytes = 0
+        if node.op == 'call_module':
+            nbytes += _nbytes(modules[node.target].parameters())
+        for n in input_nodes(node):
+            if n.op == 'get_param':
+                nbytes += _nbytes([run_node(n, (), {}, root, modules)])
+        costs[node] = runtimes[node] + nbytes * param_byte_cost
+    return costs
+
+
+def _partition(costs, num_parts):
+    # Splits the sequence costs into num_parts non-empty contiguous parts,
+    # minimizing the largest sum of a part: a binary search finds the smallest
+    # bound for which greedily filling the parts takes at most num_parts parts.
+    # Returns the index of the part of each element.
+    def fill(bound):
+        parts = []
+        part, total = 0, 0.
+        for i, cost in enumerate(costs):
+            # also cut once each remaining element has to start its own part
+            if i > 0 and (total + cost > bound or len(costs) - i <= num_parts - part - 1):
+                part, total = part + 1, 0.
+            parts.append(part)
+            total += cost
+        return parts
+
+    lo, hi = max(costs), sum(costs)
+    for _ in range(64):
+        if hi - lo <= 1e-6 * hi:
+            break
+        mid = (lo + hi) / 2
+        if fill(mid)[-1] < num_parts:
+            hi = mid
+        else:
+            lo = mid
+    return fill(hi)
+
+
+def _extract_root(root, targets):
+    # Returns a module holding only the submodules, parameters and buffers of
+    # root at targets, at the same place in the hierarchy.
+    new_root = torch.nn.Module()
+    for target in targets:
+        *path, name = target.split('.')
+        src, dst = root, new_root
+        for atom in path:
+            src = getattr(src, atom)
+            if atom not in dst._modules:
+                dst.add_module(atom, torch.nn.Module())
+            dst = getattr(dst, atom)
+        attr = getattr(src, name)
+        if name in src._buffers:
+            dst.register_buffer(name, attr, persistent=name not in src._non_persistent_buffers_set)
+        else:
+            setattr(dst, name, attr)
+    return new_root
+
+
+def split_module(gm: GraphModule, num_stages: int, costs: Dict[Node, float] = None) -> List[GraphModule]:
+    """ Split gm into num_stages sequential GraphModules of balanced costs.
+
+    The nodes are partitioned in order into contiguous stages minimizing the cost of the
+    most expensive stage, with costs given by `estimate_costs`, or one per node by default.
+    Each stage takes the values cut by its first node as arguments, i.e. those computed
+    by the previous stages (or the inputs of gm) and still needed by this stage or a later
+    one, and returns the values cut by the next stage as a tuple, while the last stage
+    returns the result of gm. The first stage takes the same arguments as gm, so that
+
+    ```
+    out = stages[0](*args)
+    for stage in stages[1:]:
+        out = stage(*out)
+    ```
+
+    computes `gm(*args)`. Parameters are fetched by each stage using them, and each stage
+    has its own root holding only the modules and parameters it uses.
+    """
+    graph = gm.graph
+    compute_nodes = [node for node in graph.nodes if node.op not in ('placeholder', 'get_param')]
+    if not 1 <= num_stages <= len(compute_nodes):
+        raise ValueError(f'cannot split {len(compute_nodes)} nodes into {num_stages} stages')
+    parts = _partition([costs[node] if costs is not None else 1. for node in compute_nodes], num_stages)
+    stage_of = dict(zip(compute_nodes, parts))
+    for node in graph.nodes:
+        if node.op == 'placeholder':
+            stage_of[node] = -1
+
+    # last stage using each value, the result being used after the last stage
+    last_use = {}
+    for node in compute_nodes:
+        for n in input_nodes(node):
+            last_use[n] = max(last_use.get(n, -1), stage_of[node])
+
+    def mark_result(n):
+        last_use[n] = num_stages
+        return n
+    map_arg(graph.result, mark_result)
+
+    def cut(k):
+        # values passed to stage k
+        return [node for node in graph.nodes if node.op != 'get_param' and
+                stage_of[node] < k <= last_use.get(node, -1)]
+
+    stages = []
+    for k in range(num_stages):
+        stage_graph = Graph()
+        env = {}
+
+        # the nodes keep their names, which are unique across the stages
+        def copy(node):
+            return stage_graph.create_node(
+                node.op, node.target, map_arg(node.args, load), map_arg(node.kwargs, load), node.name)
+
+        def load(n):
+            if n not in env:
+                # parameters are fetched where they are used
+                assert n.op == 'get_param'
+                env[n] = copy(n)
+            return env[n]
+
+        if k == 0:
+            for node in graph.nodes:
+                if node.op == 'placeholder':
+                    env[node] = copy(node)
+        else:
+            for node in cut(k):
+                env[node] = stage_graph.placeholder(node.name)
+        for node in compute_nodes:
+            if stage_of[node] == k:
+                env[node] = copy(node)
+        if k < num_stages - 1:
+            stage_graph.output(tuple(load(n) for n in cut(k + 1)))
+        else:
+            stage_graph.output(map_arg(graph.result, load))
+
+        targets = [node.target for node in stage_graph.nodes if node.op in ('call_module', 'get_param')]
+        stages.append(GraphModule(_extract_root(gm.root, targets), stage_graph))
+    return stages
@@ -0,0 +1,113 @@
+# type: ignore
+import copy
+
+import torch
+
+from ..graph import _is_magic, map_arg
+
+# Functions and methods whose results differ between calls with the same
+# arguments, which must never be merged or precomputed.
+_NONDETERMINISTIC_OPS = {
+    'bernoulli', 'dropout', 'dropout2d', 'dropout3d', 'alpha_dropout', 'feature_alpha_dropout',
+    'empty', 'empty_like', 'empty_strided', 'multinomial', 'normal', 'poisson', 'rand', 'rand_like',
+    'randint', 'randint_like', 'randn', 'randn_like', 'randperm', 'rrelu',
+}
+
+# Functions and methods always returning a new tensor, rather than one that may
+# share memory with their inputs (e.g. a view)
+_ALLOCATING_OPS = {
+    'add', 'sub', 'mul', 'div', 'truediv', 'floordiv', 'mod', 'pow', 'neg', 'abs', 'exp', 'log',
+    'sqrt', 'rsqrt', 'sigmoid', 'tanh', 'relu', 'gelu', 'softmax', 'log_softmax', 'mm', 'bmm',
+    'matmul', 'addmm', 'linear', 'conv1d', 'conv2d', 'conv3d', 'cat', 'stack', 'clone', 'sum', 'mean',
+}
+
+
+def fetch_attr(root, target):
+    """ return the attribute of root at the fully-qualified name target, e.g. 'layer1.0.conv1.weight' """
+    attr = root
+    for atom in target.split('.'):
+        attr = getattr(attr, atom)
+    return attr
+
+
+def copy_root(root):
+    """ a shallow copy of root, sharing its submodules, parameters and buffers, to which
+        buffers can be added without changing root """
+    new_root = copy.copy(root)
+    new_root._buffers = root._buffers.copy()
+    new_root._non_persistent_buffers_set = set(root._non_persistent_buffers_set)
+    return new_root
+
+
+# turn foo.bar -> ['foo', 'bar']
+def parent_name(target):
+    r = target.rsplit('.', 1)
+    if len(r) == 1:
+        return '', r[0]
+    else:
+        return r[0], r[1]
+
+
+def _op_name(node):
+    if node.op == 'call_method':
+        return node.target
+    if node.op == 'call_function':
+        return getattr(node.target, '__name__', '')
+    return ''
+
+
+def is_impure(node, modules):
+    """ whether node has effects beyond computing its value: in-place ops, ops
+        writing to an `out` argument and modules updating buffers (e.g. the running stats
+        of a BatchNorm in training mode). Such nodes are never removed, merged or folded. """
+    if node.op == 'placeholder':
+        return True
+    name = _op_name(node)
+    if name.endswith('_') and not _is_magic(name):
+        return True
+    if 'out' in node.kwargs:
+        return True
+    if node.op == 'call_module':
+        mod = modules[node.target]
+        return mod.training and any(True for _ in mod.buffers())
+    return False
+
+
+def is_nondeterministic(node, modules):
+    """ whether calling node twice with the same arguments may give different results """
+    if node.op == 'call_module':
+        mod = modules[node.target]
+        return isinstance(mod, (torch.nn.modules.dropout._DropoutNd, torch.nn.RReLU))
+    return _op_name(node).rstrip('_') in _NONDETERMINISTIC_OPS
+
+
+def may_alias_inputs(node):
+    """ whether the value of node may share memory with one of its inputs, e.g. a view or
+        an indexing result, which is assumed of every op not known to allocate its result """
+    if node.op in ('placeholder', 'get_param'):
+        return False
+    if node.op in ('call_function', 'call_method'):
+        return _op_name(node) not in _ALLOCATING_OPS
+    return True
+
+
+def run_node(node, args, kwargs, root, modules):
+    """ evaluate node with the values of its arguments """
+    if node.op == 'get_param':
+        return fetch_attr(root, node.target)
+    elif node.op == 'call_function':
+        return node.target(*args, **kwargs)
+    elif node.op == 'call_method':
+        self_obj, *args = args
+        return getattr(self_obj, node.target)(*args, **kwargs)
+    elif node.op == 'call_module':
+        return modules[node.target](*args, **kwargs)
+    raise NotImplementedError(f'node: {node.op} {node.target}')
+
+
+def input_nodes(node):
+    """ the nodes used by the args and kwargs of node, in order and without duplicates """
+    inputs = {}
+    map_arg(node.args, lambda n: inputs.setdefault(n, None))
+    map_arg(node.kwargs, lambda n: inputs.setdefault(n, None))
+    return list(inputs)
@@ -1,16 +1,25 @@
 # type: ignore
+import hashlib
 import inspect
+import itertools
+import os
+import pickle
+import tempfile
+import warnings
 from types import CodeType, FunctionType
 from typing import Any, Callable, Dict, Optional, Tuple, Union
 import torch
 
 from .node import Node
-from .graph import Graph
+from .graph import Graph, map_arg
 from .graph_module import GraphModule
 from .proxy import Proxy, _create_proxy
 
 HAS_VARSTUFF = inspect.CO_VARARGS | inspect.CO_VARKEYWORDS
 
+# types of the arguments recorded as they are
+_BASE_TYPES = (str, int, float, bool, torch.dtype, torch.Tensor)
+
 def _find_module(root, m):
     for n, p in root.named_modules():
         if m is p:
@@ -66,6 +75,12 @@ class DelegateBase:
         return m.__module__.startswith('torch.nn') and not isinstance(m, torch.nn.Sequential)
 
     def create_arg(self, a):
+        if isinstance(a, Proxy):
+            # base case: we unwrap the Proxy object
+            return a.node
+        elif isinstance(a, _BASE_TYPES) or a is None:
+            return a
+
         # aggregates
         if isinstance(a, (tuple, list)):
             return type(a)(self.create_arg(elem) for elem in a)
@@ -79,12 +94,6 @@ class DelegateBase:
         elif isinstance(a, slice):
             return slice(self.create_arg(a.start), self.create_arg(a.stop), self.create_arg(a.step))
 
-        if isinstance(a, Proxy):
-            # base case: we unwrap the Proxy object
-            return a.node
-        elif isinstance(a, (str, int, float, bool, torch.dtype, torch.Tensor)) or a is None:
-            return a
-
         raise NotImplementedError(f"argument of type: {type(a)}")
 
 
@@ -92,6 +101,7 @@ class DefaultDelegate(DelegateBase):
     def __init__(self, root: torch.nn.Module, graph: Graph):
         super().__init__(graph)
         self.root = root
+        self._param_names = None
 
     def create_arg(self, a):
         # The base delegate is used to construct Graphs when there is no associated
@@ -99,10 +109,13 @@ class DefaultDelegate(DelegateBase):
         # The default delegate adds the ability to refer to parameters when
         # tracing modules.
         if isinstance(a, torch.nn.Parameter):
-            for n, p in self.root.named_parameters():
-                if a is p:
-                    return self.graph.get_param(n)
-            raise NameError('parameter is not a member of this module')
+            # the names of the parameters are looked up once per trace
+            if self._param_names is None:
+                self._param_names = {id(p): n for n, p in self.root.named_parameters()}
+            name = self._param_names.get(id(a))
+            if name is None:
+                raise NameError('parameter is not a member of this module')
+            return self.graph.get_param(name)
         return super().create_arg(a)
 
 
@@ -110,15 +123,7 @@ class DefaultDelegate(DelegateBase):
 def _proxy_placeholder(name, delegate):
     return Proxy(delegate.graph.placeholder(name), delegate)
 
-# Symbolic tracing API
-#
-# Given an `nn.Module` instance `root`, this function will return a `GraphModule`
-# constructed by recording operations seen while tracing through `root`.
-#
-# Args:
-#   - root - the `nn.Module` instance to trace
-#   - delegate : An instance of a Delegate object
-def symbolic_trace(root : torch.nn.Module, delegate_class=DefaultDelegate):
+def _trace(root : torch.nn.Module, delegate_class) -> Graph:
     graph = Graph()
     delegate = delegate_class(root, graph)
 
@@ -140,16 +145,150 @@ def symbolic_trace(root : torch.nn.Module, delegate_class=DefaultDelegate):
 
     args = tuple(args)
     orig_call = torch.nn.Module.__call__
+    # the names of the modules are looked up once per trace, instead of
+    # searching the whole hierarchy at every call
+    module_names = {}
+    for n, m in root.named_modules():
+        module_names.setdefault(id(m), n)
 
     def module_call_wrapper(mod, *args, **kwargs):
         if not delegate.is_leaf_module(mod):
             return orig_call(mod, *args, **kwargs)
         else:
-            target = _find_module(root, mod)
+            target = module_names.get(id(mod))
+            if target is None:
+                target = _find_module(root, mod)
             return _create_proxy(delegate, 'call_module', target, args, kwargs)
     try:
         torch.nn.Module.__call__ = module_call_wrapper
         graph.output(delegate.create_arg(fn(*args)))
     finally:
         torch.nn.Module.__call__ = orig_call
-    return GraphModule(root, graph)
+    return graph
+
+def _copy_graph(graph : Graph) -> Graph:
+    new_graph = Graph()
+    env = {}
+    for node in graph.nodes:
+        env[node] = new_graph.create_node(
+            node.op, node.target, map_arg(node.args, lambda n: env[n]), map_arg(node.kwargs, lambda n: env[n]),
+            node.name)
+    new_graph._used_names = dict(graph._used_names)
+    new_graph.output(map_arg(graph.result, lambda n: env[n]))
+    return new_graph
+
+def _qualified_class_name(cls):
+    return f'{cls.__module__}.{cls.__qualname__}'
+
+def _is_constant(v):
+    if isinstance(v, (tuple, list)):
+        return all(_is_constant(e) for e in v)
+    return isinstance(v, (bool, int, float, str, torch.dtype)) or v is None
+
+def _code_digest(co, defaults=None):
+    # nested code objects (e.g. of comprehensions) are replaced by their own
+    # digest, since their repr contains their address. The signature is part of
+    # the digest since it decides the placeholders.
+    consts = tuple(_code_digest(c) if isinstance(c, CodeType) else repr(c) for c in co.co_consts)
+    signature = (co.co_varnames, co.co_argcount, co.co_kwonlyargcount, co.co_flags, repr(defaults))
+    return hashlib.sha1(repr((co.co_code, co.co_names, consts, signature)).encode()).hexdigest()
+
+def _trace_key(root : torch.nn.Module, delegate_class) -> str:
+    # Describes what the trace of root depends on, as far as we can tell without
+    # running it: the leaf-module policy, the hierarchy of modules with their
+    # types and plain attributes (including their mode), the shapes of their
+    # parameters and buffers, and the code of their `forward`.
+    items = [_qualified_class_name(delegate_class)]
+    forwards = {}
+    for name, mod in root.named_modules():
+        cls = type(mod)
+        attrs = sorted((k, v) for k, v in mod.__dict__.items() if _is_constant(v))
+        items.append((name, _qualified_class_name(cls), attrs))
+        if cls not in forwards:
+            forwards[cls] = cls.forward
+    for name, t in itertools.chain(root.named_parameters(), root.named_buffers()):
+        items.append((name, tuple(t.shape), str(t.dtype)))
+    for cls, forward in forwards.items():
+        co = getattr(forward, '__code__', None)
+        digest = _code_digest(co, (forward.__defaults__, forward.__kwdefaults__)) if co is not None else None
+        items.append((_qualified_class_name(cls), digest))
+    return hashlib.sha1(repr(items).encode()).hexdigest()
+
+class TraceCache:
+    """ Cache of the graphs traced by `symbolic_trace`, to trace each model once.
+
+    Graphs are keyed by the class of the traced module, a hash of its structure (its
+    submodules with their types and plain attributes, the shapes of its parameters and
+    buffers and the code of the `forward` methods) and the delegate class, which decides
+    the leaf modules. Traces that depend on anything else, e.g. on the values of tensors,
+    global variables or helper functions that changed since, must not be cached.
+
+    With a `cache_dir`, graphs are also saved to disk, where they are shared with other
+    processes such as data loader or distributed workers. Graphs are pickled, so the
+    directory must be trusted, and graphs whose targets cannot be pickled are only kept
+    in memory.
+    """
+    def __init__(self, cache_dir : Optional[str] = None):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._graphs = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.graph')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # missing or unreadable, e.g. saved by another version of the code
+            return None
+
+    def _save(self, key, graph):
+        # written to a temporary file first, so that other processes never
+        # read a partial graph
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(graph, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            os.remove(tmp_path)
+            warnings.warn(f'could not save the traced graph to {self.cache_dir}: {e}')
+
+    def trace(self, root : torch.nn.Module, delegate_class=DefaultDelegate) -> GraphModule:
+        key = _trace_key(root, delegate_class)
+        graph = self._graphs.get(key)
+        if graph is None and self.cache_dir is not None:
+            graph = self._load(key)
+        if graph is None:
+            self.misses += 1
+            graph = _trace(root, delegate_class)
+            if self.cache_dir is not None:
+                self._save(key, graph)
+        else:
+            self.hits += 1
+        self._graphs[key] = graph
+        # the cached graph is never handed out, so that editing a traced graph does
+        # not change the following traces
+        return GraphModule(root, _copy_graph(graph))
+
+    def clear(self):
+        self._graphs.clear()
+
+# Symbolic tracing API
+#
+# Given an `nn.Module` instance `root`, this function will return a `GraphModule`
+# constructed by recording operations seen while tracing through `root`.
+#
+# Args:
+#   - root - the `nn.Module` instance to trace
+#   - delegate : An instance of a Delegate object
+#   - cache : A TraceCache to look the graph up in, and add it to
+def symbolic_trace(root : torch.nn.Module, delegate_class=DefaultDelegate, cache : Optional[TraceCache] = None):
+    if cache is not None:
+        return cache.trace(root, delegate_class)
+    return GraphModule(root, _trace(root, delegate_class))
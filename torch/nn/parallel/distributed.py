@@ -88,6 +88,19 @@ def _dump_DDP_relevant_env_vars():
     print(formatted_output)
 
 
+def _step_parameters(optimizer, params):
+    # Runs a step of `optimizer` only updating `params`
+    param_ids = set(id(p) for p in params)
+    all_params = [group['params'] for group in optimizer.param_groups]
+    try:
+        for group in optimizer.param_groups:
+            group['params'] = [p for p in group['params'] if id(p) in param_ids]
+        optimizer.step()
+    finally:
+        for group, group_params in zip(optimizer.param_groups, all_params):
+            group['params'] = group_params
+
+
 class DistributedDataParallel(Module):
     r"""Implements distributed data parallelism that is based on
     ``torch.distributed`` package at the module level.
@@ -475,6 +488,8 @@ class DistributedDataParallel(Module):
         parameters = [
             list(parameter for _, parameter in replica)
             for replica in modules_and_parameters]
+        # Parameters indexed by the variable indices of grad buckets
+        self._reducer_parameters = parameters[0]
 
         # Checks if a module will produce a sparse gradient.
         def produces_sparse_gradient(module):
@@ -699,6 +714,76 @@ class DistributedDataParallel(Module):
         self._check_comm_hook(hook)
         dist._register_comm_hook(self.reducer, state, hook)
 
+    def _register_overlapped_optimizer(self, optimizer, state=None, hook=None):
+        r"""
+        Registers ``optimizer`` to update the parameters of each grad bucket as
+        soon as the communication of the bucket completes, instead of after the
+        whole backward pass. This overlaps the optimizer step with the
+        communication of the remaining buckets and the rest of the backward
+        pass (with NCCL, whose communication is asynchronous).
+
+        The parameters of a bucket are updated by running ``optimizer.step()``
+        with the param groups of ``optimizer`` temporarily restricted to them,
+        after their ``.grad`` is set to the reduced gradients. Hence,
+        ``optimizer.step()`` must not be called after the backward pass anymore,
+        while ``optimizer.zero_grad()``, learning rate schedulers and
+        ``optimizer.state_dict()`` work as usual. Under :meth:`no_sync`, no
+        bucket is reduced so the parameters are not updated either.
+
+        Arguments:
+            optimizer (torch.optim.Optimizer): optimizer of the parameters of
+                the module. Its update of a parameter must only depend on the
+                gradient and state of that parameter, which is the case of
+                all optimizers of :mod:`torch.optim` but
+                :class:`~torch.optim.LBFGS`.
+            state (object): state passed to ``hook``.
+            hook (callable): communication hook reducing the gradients of a
+                bucket, as passed to :meth:`_register_comm_hook`, whose result
+                the optimizer step is chained to. Defaults to
+                :func:`~torch.distributed.algorithms.ddp_comm_hooks.allreduce_hook`
+                on the process group of this module.
+
+        .. warning ::
+            Just like communication hooks, this can only be registered once, and
+            does not support single process multiple device mode.
+
+        Example::
+
+            >>> optimizer = torch.optim.SGD(ddp_model.parameters(), lr=0.1)
+            >>> ddp_model._register_overlapped_optimizer(optimizer)
+            >>> for input, target in data:
+            >>>     optimizer.zero_grad()
+            >>>     loss_fn(ddp_model(input), target).backward()  # also steps
+        """
+        if hook is None:
+            from torch.distributed.algorithms.ddp_comm_hooks import allreduce_hook
+            state, hook = self.process_group, allreduce_hook
+        self._check_comm_hook(hook)
+        parameters = self._reducer_parameters
+
+        def overlapped_optimizer_hook(state, bucket):
+            bucket_params = [parameters[i] for i in bucket.get_variable_indices()]
+
+            def step(fut):
+                tensors = fut.wait()
+                offsets, lengths = bucket.get_offsets(), bucket.get_lengths()
+                with torch.no_grad():
+                    if not offsets:
+                        # Sparse gradients have their own bucket
+                        bucket_params[0].grad = tensors[0]
+                    for param, offset, length in zip(bucket_params, offsets, lengths):
+                        grad = tensors[0][offset:offset + length].view(param.size())
+                        if param.grad is None:
+                            param.grad = grad.clone()
+                        else:
+                            param.grad.copy_(grad)
+                    _step_parameters(optimizer, bucket_params)
+                return tensors
+
+            return hook(state, bucket).then(step)
+
+        self._register_comm_hook(state, overlapped_optimizer_hook)
+
     def _distributed_broadcast_coalesced(self, tensors, buffer_size):
         dist._broadcast_coalesced(self.process_group, tensors, buffer_size)
 
@@ -23,3 +23,23 @@ def fuse_conv_bn_weights(conv_w, conv_b, bn_rm, bn_rv, bn_eps, bn_w, bn_b):
     conv_b = (conv_b - bn_rm) * bn_var_rsqrt * bn_w + bn_b
 
     return torch.nn.Parameter(conv_w), torch.nn.Parameter(conv_b)
+
+def fuse_linear_bn_eval(linear, bn):
+    assert(not (linear.training or bn.training)), "Fusion only for eval!"
+    fused_linear = copy.deepcopy(linear)
+
+    fused_linear.weight, fused_linear.bias = \
+        fuse_linear_bn_weights(fused_linear.weight, fused_linear.bias,
+                               bn.running_mean, bn.running_var, bn.eps, bn.weight, bn.bias)
+
+    return fused_linear
+
+def fuse_linear_bn_weights(linear_w, linear_b, bn_rm, bn_rv, bn_eps, bn_w, bn_b):
+    if linear_b is None:
+        linear_b = bn_rm.new_zeros(bn_rm.shape)
+    bn_scale = bn_w * torch.rsqrt(bn_rv + bn_eps)
+
+    linear_w = linear_w * bn_scale.unsqueeze(-1)
+    linear_b = (linear_b - bn_rm) * bn_scale + bn_b
+
+    return torch.nn.Parameter(linear_w), torch.nn.Parameter(linear_b)
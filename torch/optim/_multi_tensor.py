@@ -0,0 +1,146 @@
+r"""Helpers for the multi-tensor implementation of optimizer steps.
+
+Parameters of a group are bucketed by device and dtype (and any other value
+the update depends on, like the step count of Adam), and each stage of the
+update is applied to the whole bucket at once through flattened tensors, which
+dispatches a handful of operations per bucket instead of per parameter.
+
+Optimizer state tensors are kept as views into one flat tensor per bucket, so
+that they are updated in place without copies while still appearing as regular
+per-parameter tensors in ``optimizer.state`` and ``optimizer.state_dict()``.
+The flat tensor is rebuilt whenever the state tensors are not the views it was
+last split into, e.g., after ``optimizer.load_state_dict()``.
+
+After ``optimizer.flatten_parameters()``, the parameters and gradients of each
+bucket are themselves views into flat buffers, which the steps then update
+directly instead of flattening copies of them.
+"""
+
+from collections import OrderedDict, namedtuple
+
+import torch
+from torch._utils import _flatten_dense_tensors
+
+
+def group_tensors(tensors, key=None):
+    r"""Buckets ``tensors`` by device, dtype and ``key(tensor)`` if given,
+    keeping their order within each bucket."""
+    buckets = OrderedDict()
+    for t in tensors:
+        bucket_key = (t.device, t.dtype) if key is None else (t.device, t.dtype) + key(t)
+        buckets.setdefault(bucket_key, []).append(t)
+    return buckets
+
+
+def flatten(tensors):
+    r"""Returns a new 1-D tensor holding the elements of ``tensors``."""
+    return _flatten_dense_tensors(tensors)
+
+
+def _split_views(flat, like):
+    chunks = torch.split(flat, [t.numel() for t in like])
+    return [chunk.view(t.size()) for chunk, t in zip(chunks, like)]
+
+
+def unflatten_into(flat, tensors):
+    r"""Copies the elements of ``flat`` back into ``tensors``."""
+    for t, chunk in zip(tensors, torch.split(flat, [t.numel() for t in tensors])):
+        t.copy_(chunk.view(t.size()))
+
+
+def _flat_states(optimizer):
+    # Not set in `__init__`, since optimizers are also unpickled and
+    # `Optimizer.__getstate__` only saves defaults, state and param_groups.
+    # Maps (key, name, ids of params) to (flat, params, views).
+    return optimizer.__dict__.setdefault('_flat_states', {})
+
+
+_Packed = namedtuple('_Packed', ['params', 'flat_param', 'flat_grad', 'positions',
+                                 'offsets', 'data_ptrs', 'grad_views'])
+
+
+def _packed_buffers(optimizer):
+    # Same as `_flat_states`, maps bucket keys to `_Packed` buffers
+    return optimizer.__dict__.setdefault('_packed_buffers', {})
+
+
+def pack(optimizer, key, params):
+    r"""Moves the data and gradients of ``params`` into two new flat buffers,
+    making ``p.data`` and ``p.grad`` views into them. Missing gradients are
+    replaced by zeros."""
+    flat_param = flatten([p.data for p in params])
+    flat_grad = flatten([p.grad if p.grad is not None else torch.zeros_like(p) for p in params])
+    for p, v in zip(params, _split_views(flat_param, params)):
+        p.data = v
+    grad_views = _split_views(flat_grad, params)
+    for p, g in zip(params, grad_views):
+        p.grad = g
+    offsets = [0]
+    for p in params:
+        offsets.append(offsets[-1] + p.numel())
+    _packed_buffers(optimizer)[key] = _Packed(
+        list(params), flat_param, flat_grad, {id(p): i for i, p in enumerate(params)},
+        offsets, [p.data_ptr() for p in params], grad_views)
+
+
+def get_packed(optimizer, key, params):
+    r"""Returns the flat parameter and gradient buffers of ``params`` if they
+    are consecutive parameters packed together by :func:`pack`, in the same
+    order, and are still views into the buffers, or ``None`` otherwise. Subsets
+    of the packed parameters get slices of the buffers."""
+    packed = _packed_buffers(optimizer).get(key)
+    if packed is None or len(params) == 0:
+        return None
+    first = packed.positions.get(id(params[0]))
+    if first is None or first + len(params) > len(packed.params):
+        return None
+    for i, p in enumerate(params, first):
+        if p is not packed.params[i] or p.data_ptr() != packed.data_ptrs[i] or \
+                p.grad is not packed.grad_views[i]:
+            return None
+    begin, end = packed.offsets[first], packed.offsets[first + len(params)]
+    if begin == 0 and end == packed.offsets[-1]:
+        return packed.flat_param, packed.flat_grad
+    return packed.flat_param[begin:end], packed.flat_grad[begin:end]
+
+
+def zero_packed_grads(optimizer):
+    r"""Zeroes the flat gradient buffers with a single operation each, and
+    returns the set of ids of the parameters whose gradients they hold."""
+    zeroed = set()
+    for packed in _packed_buffers(optimizer).values():
+        packed.flat_grad.zero_()
+        zeroed.update(id(p) for p, g in zip(packed.params, packed.grad_views) if p.grad is g)
+    return zeroed
+
+
+def get_flat_state(optimizer, key, params, name):
+    r"""Returns the flat tensor viewed by ``optimizer.state[p][name]`` for all
+    ``params``, first creating it if those are not views into it yet.
+
+    ``key`` identifies the bucket of ``params`` across steps, and should not
+    depend on values that change at every step.
+    """
+    tensors = [optimizer.state[p][name] for p in params]
+    cached = _flat_states(optimizer).get((key, name, tuple(id(p) for p in params)))
+    if cached is not None and all(t is v for t, v in zip(tensors, cached[2])):
+        return cached[0]
+    flat = flatten(tensors)
+    set_flat_state(optimizer, key, params, name, flat)
+    return flat
+
+
+def set_flat_state(optimizer, key, params, name, flat):
+    r"""Sets ``optimizer.state[p][name]`` for all ``params`` to views into
+    ``flat``."""
+    views = _split_views(flat, params)
+    for p, v in zip(params, views):
+        optimizer.state[p][name] = v
+    cache = _flat_states(optimizer)
+    # Drop the flat tensors no longer entirely viewed by the state, e.g., when
+    # parameters are updated in different buckets than at the previous steps
+    for cache_key, (_, cached_params, cached_views) in list(cache.items()):
+        if cache_key[1] == name and \
+                not all(optimizer.state[p].get(name) is v for p, v in zip(cached_params, cached_views)):
+            del cache[cache_key]
+    cache[(key, name, tuple(id(p) for p in params))] = (flat, list(params), views)
@@ -1,6 +1,7 @@
 import math
 import torch
 from .optimizer import Optimizer
+from . import _multi_tensor
 
 
 class AdamW(Optimizer):
@@ -21,6 +22,11 @@ class AdamW(Optimizer):
         amsgrad (boolean, optional): whether to use the AMSGrad variant of this
             algorithm from the paper `On the Convergence of Adam and Beyond`_
             (default: False)
+        multi_tensor (boolean, optional): whether to update all parameters of
+            the same device and dtype at once, through flattened copies of them,
+            instead of one at a time. This dispatches fewer operations per step
+            at the cost of extra copies, and gives the same results
+            (default: False)
 
     .. _Adam\: A Method for Stochastic Optimization:
         https://arxiv.org/abs/1412.6980
@@ -31,7 +37,7 @@ class AdamW(Optimizer):
     """
 
     def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8,
-                 weight_decay=1e-2, amsgrad=False):
+                 weight_decay=1e-2, amsgrad=False, multi_tensor=False):
         if not 0.0 <= lr:
             raise ValueError("Invalid learning rate: {}".format(lr))
         if not 0.0 <= eps:
@@ -43,13 +49,15 @@ class AdamW(Optimizer):
         if not 0.0 <= weight_decay:
             raise ValueError("Invalid weight_decay value: {}".format(weight_decay))
         defaults = dict(lr=lr, betas=betas, eps=eps,
-                        weight_decay=weight_decay, amsgrad=amsgrad)
+                        weight_decay=weight_decay, amsgrad=amsgrad,
+                        multi_tensor=multi_tensor)
         super(AdamW, self).__init__(params, defaults)
 
     def __setstate__(self, state):
         super(AdamW, self).__setstate__(state)
         for group in self.param_groups:
             group.setdefault('amsgrad', False)
+            group.setdefault('multi_tensor', False)
 
     @torch.no_grad()
     def step(self, closure=None):
@@ -64,7 +72,11 @@ class AdamW(Optimizer):
             with torch.enable_grad():
                 loss = closure()
 
-        for group in self.param_groups:
+        for group_idx, group in enumerate(self.param_groups):
+            if group['multi_tensor']:
+                self._multi_tensor_step(group_idx, group)
+                continue
+
             for p in group['params']:
                 if p.grad is None:
                     continue
@@ -116,3 +128,66 @@ class AdamW(Optimizer):
                 p.addcdiv_(exp_avg, denom, value=-step_size)
 
         return loss
+
+    def _multi_tensor_step(self, group_idx, group):
+        amsgrad = group['amsgrad']
+        beta1, beta2 = group['betas']
+
+        params = []
+        for p in group['params']:
+            if p.grad is None:
+                continue
+            if p.grad.is_sparse:
+                raise RuntimeError('AdamW does not support sparse gradients')
+
+            state = self.state[p]
+
+            # State initialization
+            if len(state) == 0:
+                state['step'] = 0
+                state['exp_avg'] = torch.zeros_like(p, memory_format=torch.preserve_format)
+                state['exp_avg_sq'] = torch.zeros_like(p, memory_format=torch.preserve_format)
+                if amsgrad:
+                    state['max_exp_avg_sq'] = torch.zeros_like(p, memory_format=torch.preserve_format)
+            params.append(p)
+
+        # Bias corrections depend on the step, which parameters only share if
+        # they always got gradients together
+        buckets = _multi_tensor.group_tensors(params, key=lambda p: (self.state[p]['step'],))
+        for (device, dtype, step), bucket in buckets.items():
+            key = (group_idx, device, dtype)
+            exp_avg = _multi_tensor.get_flat_state(self, key, bucket, 'exp_avg')
+            exp_avg_sq = _multi_tensor.get_flat_state(self, key, bucket, 'exp_avg_sq')
+            if amsgrad:
+                max_exp_avg_sq = _multi_tensor.get_flat_state(self, key, bucket, 'max_exp_avg_sq')
+
+            step += 1
+            for p in bucket:
+                self.state[p]['step'] = step
+            bias_correction1 = 1 - beta1 ** step
+            bias_correction2 = 1 - beta2 ** step
+
+            packed = _multi_tensor.get_packed(self, key, bucket)
+            if packed is not None:
+                param, grad = packed
+            else:
+                param = _multi_tensor.flatten(bucket)
+                grad = _multi_tensor.flatten([p.grad for p in bucket])
+
+            # Perform stepweight decay
+            param.mul_(1 - group['lr'] * group['weight_decay'])
+
+            # Decay the first and second moment running average coefficient
+            exp_avg.mul_(beta1).add_(grad, alpha=1 - beta1)
+            exp_avg_sq.mul_(beta2).addcmul_(grad, grad, value=1 - beta2)
+            if amsgrad:
+                torch.max(max_exp_avg_sq, exp_avg_sq, out=max_exp_avg_sq)
+                denom = (max_exp_avg_sq.sqrt() / math.sqrt(bias_correction2)).add_(group['eps'])
+            else:
+                denom = (exp_avg_sq.sqrt() / math.sqrt(bias_correction2)).add_(group['eps'])
+
+            step_size = group['lr'] / bias_correction1
+
+            param.addcdiv_(exp_avg, denom, value=-step_size)
+            if packed is None:
+                _multi_tensor.unflatten_into(param, bucket)
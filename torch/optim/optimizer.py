@@ -5,6 +5,7 @@ import torch
 from copy import deepcopy
 from itertools import chain
 import warnings
+from . import _multi_tensor
 
 
 class _RequiredParameter(object):
@@ -166,15 +167,48 @@ class Optimizer(object):
 
     def zero_grad(self):
         r"""Clears the gradients of all optimized :class:`torch.Tensor` s."""
+        # Gradients packed by `flatten_parameters` are zeroed all at once
+        zeroed = _multi_tensor.zero_packed_grads(self)
         for group in self.param_groups:
             for p in group['params']:
-                if p.grad is not None:
+                if p.grad is not None and id(p) not in zeroed:
                     if p.grad.grad_fn is not None:
                         p.grad.detach_()
                     else:
                         p.grad.requires_grad_(False)
                     p.grad.zero_()
 
+    def flatten_parameters(self):
+        r"""Packs the parameters of each parameter group into one contiguous
+        buffer per device and dtype, and their gradients into another one.
+
+        The ``.data`` and ``.grad`` of every parameter become views into these
+        buffers, so that updates of optimizers supporting a ``multi_tensor``
+        step (which this enables for all groups) operate directly on whole
+        buffers, optimizer state is kept in flat buffers of the same layout,
+        and :meth:`zero_grad` zeroes each gradient buffer at once.
+
+        .. note::
+            Gradients are accumulated into the buffers, so parameters that do
+            not get a gradient in a backward pass are updated with a zero
+            gradient rather than skipped. Replacing the ``.data`` or ``.grad``
+            of a parameter (e.g., by moving a module to another device) takes it
+            out of its buffer, and its bucket falls back to flattening copies.
+
+        .. note::
+            Optimizers keeping a ``'step'`` count per parameter (e.g., Adam)
+            update the parameters with the same count together, so the
+            parameters are packed ordered by their step count (and in their
+            order within a group otherwise), for those updating together to be
+            contiguous in the buffers.
+        """
+        for group_idx, group in enumerate(self.param_groups):
+            for (device, dtype), params in _multi_tensor.group_tensors(group['params']).items():
+                params = sorted(params, key=lambda p: self.state[p].get('step', 0))
+                _multi_tensor.pack(self, (group_idx, device, dtype), params)
+            if 'multi_tensor' in group:
+                group['multi_tensor'] = True
+
     def step(self, closure):
         r"""Performs a single optimization step (parameter update).
 
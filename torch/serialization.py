@@ -1,3 +1,6 @@
+import collections
+import concurrent.futures
+import ctypes
 import difflib
 import os
 import io
@@ -7,13 +10,15 @@ import sys
 import torch
 import tarfile
 import tempfile
+import threading
 import warnings
+import zlib
 from contextlib import closing, contextmanager
 from ._utils import _import_dotted_name
 from ._six import string_classes as _string_classes
 from torch._utils_internal import get_source_lines_and_file
 from torch.types import Storage
-from typing import Any, BinaryIO, cast, Dict, Optional, Type, Tuple, Union
+from typing import Any, BinaryIO, Callable, cast, Deque, Dict, Optional, Type, Tuple, Union
 import copyreg
 import pickle
 import pathlib
@@ -331,7 +336,9 @@ def _check_dill_version(pickle_module) -> None:
             ))
 
 def save(obj, f: Union[str, os.PathLike, BinaryIO],
-         pickle_module=pickle, pickle_protocol=DEFAULT_PROTOCOL, _use_new_zipfile_serialization=True) -> None:
+         pickle_module=pickle, pickle_protocol=DEFAULT_PROTOCOL, _use_new_zipfile_serialization=True,
+         async_: bool = False, num_threads: int = 0, compression: Optional[str] = None,
+         compression_min_bytes: int = DEFAULT_COMPRESSION_MIN_BYTES) -> Optional[concurrent.futures.Future]:
     """Saves an object to a disk file.
 
     See also: `saving-loading-tensors`
@@ -342,6 +349,22 @@ def save(obj, f: Union[str, os.PathLike, BinaryIO],
            os.PathLike object containing a file name
         pickle_module: module used for pickling metadata and objects
         pickle_protocol: can be specified to override the default protocol
+        async_: if ``True``, every storage is snapshotted into host memory before
+            returning and the file is written on a background thread. A
+            :class:`concurrent.futures.Future` is returned that completes once
+            :attr:`f` has been fully written (default: ``False``)
+        num_threads: number of threads used to stage storages (copy them off
+            their device or snapshot them) ahead of the writer. Staged storages
+            that are not written yet are bounded by ``_SAVE_MAX_INFLIGHT_BYTES``
+            unless :attr:`async_` is set. ``0`` stages storages on the calling
+            thread (default: ``0``)
+        compression: name of a codec registered with :func:`register_codec`
+            (e.g. ``'zlib'`` or ``'lzma'``) used to compress storages of at least
+            :attr:`compression_min_bytes` bytes. Storages that do not shrink, and
+            smaller ones, are stored raw and can still be memory-mapped. A CRC32
+            of every storage is recorded and verified by :func:`torch.load`.
+            Only supported with the zipfile-based format (default: ``None``)
+        compression_min_bytes: size threshold for :attr:`compression`
 
     .. note::
         A common PyTorch convention is to save tensors using .pt file extension.
@@ -363,15 +386,48 @@ def save(obj, f: Union[str, os.PathLike, BinaryIO],
         >>> # Save to io.BytesIO buffer
         >>> buffer = io.BytesIO()
         >>> torch.save(x, buffer)
+        >>> # Overlap writing a checkpoint with training
+        >>> fut = torch.save(model.state_dict(), 'checkpoint.pt', async_=True)
+        >>> train_step()
+        >>> fut.result()
     """
     _check_dill_version(pickle_module)
 
+    if compression is not None:
+        if not _use_new_zipfile_serialization:
+            raise ValueError("torch.save: compression is only supported with the zipfile-based format")
+        _get_codec(compression)
+
+    if async_:
+        if not _use_new_zipfile_serialization:
+            raise ValueError("torch.save: async_=True is only supported with the zipfile-based format")
+        data_value, storages = _pickle_for_save(obj, pickle_module, pickle_protocol)
+        records = _stage_storages(storages, num_threads, True, compression, compression_min_bytes)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def write_async():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                with _open_file_like(f, 'wb') as opened_file:
+                    with _open_zipfile_writer(opened_file) as opened_zipfile:
+                        _write_records(opened_zipfile, data_value, records)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+        threading.Thread(target=write_async, name='torch.save').start()
+        return future
+
     with _open_file_like(f, 'wb') as opened_file:
         if _use_new_zipfile_serialization:
             with _open_zipfile_writer(opened_file) as opened_zipfile:
-                _save(obj, opened_zipfile, pickle_module, pickle_protocol)
-                return
+                _save(obj, opened_zipfile, pickle_module, pickle_protocol, num_threads,
+                      compression, compression_min_bytes)
+                return None
         _legacy_save(obj, opened_file, pickle_module, pickle_protocol)
+    return None
 
 
 def _legacy_save(obj, f, pickle_module, pickle_protocol) -> None:
@@ -447,7 +503,9 @@ def _legacy_save(obj, f, pickle_module, pickle_protocol) -> None:
         serialized_storages[key]._write_file(f, _should_read_directly(f), True)
 
 
-def _save(obj, zip_file, pickle_module, pickle_protocol):
+def _pickle_for_save(obj, pickle_module, pickle_protocol):
+    # Pickles `obj`, returning the pickle data and the storages it references
+    # keyed by the name they are saved under.
     serialized_storages = {}
 
     def persistent_id(obj):
@@ -474,26 +532,178 @@ def _save(obj, zip_file, pickle_module, pickle_protocol):
     pickler = pickle_module.Pickler(data_buf, protocol=pickle_protocol)
     pickler.persistent_id = persistent_id
     pickler.dump(obj)
-    data_value = data_buf.getvalue()
-    zip_file.write_record('data.pkl', data_value, len(data_value))
+    return data_buf.getvalue(), serialized_storages
 
-    # Write each tensor to a file named tensor/the_tensor_key in the zip archive
-    for key in sorted(serialized_storages.keys()):
-        name = 'data/{}'.format(key)
-        storage = serialized_storages[key]
-        if storage.device.type == 'cpu':
-            # If it's on the CPU we can directly copy it into the zip file
-            num_bytes = storage.size() * storage.element_size()
-            zip_file.write_record(name, storage.data_ptr(), num_bytes)
-        else:
-            # Copy to a buffer, then serialize that
-            buf = io.BytesIO()
-            storage._write_file(buf, _should_read_directly(buf))
-            buf_value = buf.getvalue()
-            zip_file.write_record(name, buf_value, len(buf_value))
+
+# Upper bound on the bytes of storages staged by the `torch.save` thread pool
+# that have not been written to the archive yet.
+_SAVE_MAX_INFLIGHT_BYTES = 1 << 30
+
+DEFAULT_COMPRESSION_MIN_BYTES = 1 << 16
+
+# Name of the record holding the codec and checksum of every storage record of
+# a checkpoint saved with compression
+RECORD_INFO_NAME = 'records.pkl'
+
+_codec_registry: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {}
+
+
+def register_codec(name: str, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]) -> None:
+    """Registers a codec that can be passed as ``compression`` to :func:`torch.save`.
+
+    Args:
+        name: name the codec is selected by and recorded under in checkpoints
+        compress: function mapping the raw bytes of a storage to compressed bytes
+        decompress: inverse of :attr:`compress`
+
+    ``zlib`` is always registered, ``lzma`` is registered if Python was built
+    with it. A checkpoint can only be loaded if the codecs it was written with
+    are registered.
+    """
+    _codec_registry[name] = (compress, decompress)
+
+
+def _get_codec(name):
+    if name not in _codec_registry:
+        raise RuntimeError("Unknown serialization codec '{}', registered codecs are: {}"
+                           .format(name, sorted(_codec_registry.keys())))
+    return _codec_registry[name]
+
+
+register_codec('zlib', zlib.compress, zlib.decompress)
+try:
+    import lzma
+    register_codec('lzma', lzma.compress, lzma.decompress)
+except ImportError:
+    pass
+
+
+# Size of the element count header written before the data of a storage by
+# `_write_file(f, is_real_file, save_size=True)`
+_STORAGE_SIZE_HEADER_BYTES = 8
+
+
+def _storage_buffer(storage):
+    # A buffer over the memory of a CPU storage, e.g. to compute its checksum
+    # without copying it
+    num_bytes = storage.size() * storage.element_size()
+    if num_bytes == 0:
+        return b''
+    return (ctypes.c_char * num_bytes).from_address(storage.data_ptr())
+
+
+def _stage_storage(storage, snapshot, compression=None, compression_min_bytes=0):
+    # Returns a (payload, record info) pair for `storage`, where payload is
+    # something `_write_record` can write. CPU storages are written straight
+    # from their memory unless a snapshot or compression is requested, other
+    # storages are copied to a host buffer first. The record info is None unless
+    # compression is requested, in which case it holds the codec used (None for
+    # records stored raw) and the CRC32 of the uncompressed payload.
+    num_bytes = storage.size() * storage.element_size()
+    raw = None
+    if compression is not None and num_bytes >= compression_min_bytes:
+        compress, _ = _get_codec(compression)
+        # Keep the size header so that the payload can be read back with _set_from_file
+        buf = io.BytesIO()
+        storage._write_file(buf, False, True)
+        raw = buf.getvalue()
+        compressed = compress(raw)
+        if len(compressed) < num_bytes:
+            return compressed, (compression, zlib.crc32(raw))
+        # Stored raw, without the size header
+        raw = memoryview(raw)[_STORAGE_SIZE_HEADER_BYTES:]
+
+    if storage.device.type == 'cpu':
+        payload = storage.clone() if snapshot else storage
+    elif raw is not None:
+        # Already copied to the host
+        payload = raw.tobytes()
+    else:
+        # Copy to a buffer, then serialize that
+        buf = io.BytesIO()
+        storage._write_file(buf, _should_read_directly(buf), False)
+        payload = buf.getvalue()
+    if compression is None:
+        return payload, None
+    if isinstance(payload, bytes):
+        return payload, (None, zlib.crc32(payload))
+    return payload, (None, zlib.crc32(_storage_buffer(payload)))
+
+
+def _stage_storages(storages, num_threads, snapshot=False, compression=None,
+                    compression_min_bytes=0):
+    # Eagerly stages every storage, returning a list of (key, staged storage).
+    keys = sorted(storages.keys())
+    if num_threads <= 0:
+        return [(key, _stage_storage(storages[key], snapshot, compression, compression_min_bytes))
+                for key in keys]
+    with concurrent.futures.ThreadPoolExecutor(num_threads) as pool:
+        staged = [pool.submit(_stage_storage, storages[key], snapshot, compression, compression_min_bytes)
+                  for key in keys]
+        return [(key, fut.result()) for key, fut in zip(keys, staged)]
+
+
+def _write_record(zip_file, key, staged, record_infos):
+    name = 'data/{}'.format(key)
+    payload, info = staged
+    if isinstance(payload, bytes):
+        zip_file.write_record(name, payload, len(payload))
+    else:
+        # If it's on the CPU we can directly copy it into the zip file
+        num_bytes = payload.size() * payload.element_size()
+        zip_file.write_record(name, payload.data_ptr(), num_bytes)
+    if info is not None:
+        record_infos[name] = info
+
+
+def _write_record_infos(zip_file, record_infos):
+    if record_infos:
+        info_value = pickle.dumps(record_infos, protocol=DEFAULT_PROTOCOL)
+        zip_file.write_record(RECORD_INFO_NAME, info_value, len(info_value))
 
 
-def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
+def _write_records(zip_file, data_value, records):
+    zip_file.write_record('data.pkl', data_value, len(data_value))
+    # Write each tensor to a file named tensor/the_tensor_key in the zip archive
+    record_infos: Dict[str, Tuple[Optional[str], int]] = {}
+    for key, staged in records:
+        _write_record(zip_file, key, staged, record_infos)
+    _write_record_infos(zip_file, record_infos)
+
+
+def _save(obj, zip_file, pickle_module, pickle_protocol, num_threads=0, compression=None,
+          compression_min_bytes=DEFAULT_COMPRESSION_MIN_BYTES):
+    data_value, serialized_storages = _pickle_for_save(obj, pickle_module, pickle_protocol)
+    keys = sorted(serialized_storages.keys())
+    if num_threads <= 0:
+        _write_records(zip_file, data_value,
+                       ((key, _stage_storage(serialized_storages[key], False, compression, compression_min_bytes))
+                        for key in keys))
+        return
+
+    # Records have to be appended to the archive one after another, so the pool
+    # only stages storages ahead of the writer, which consumes them in order.
+    zip_file.write_record('data.pkl', data_value, len(data_value))
+    record_infos: Dict[str, Tuple[Optional[str], int]] = {}
+    with concurrent.futures.ThreadPoolExecutor(num_threads) as pool:
+        pending: Deque[Tuple[str, int, concurrent.futures.Future]] = collections.deque()
+        inflight_bytes = 0
+        for key in keys:
+            storage = serialized_storages[key]
+            num_bytes = storage.size() * storage.element_size()
+            while pending and inflight_bytes + num_bytes > _SAVE_MAX_INFLIGHT_BYTES:
+                pending_key, pending_bytes, staged = pending.popleft()
+                _write_record(zip_file, pending_key, staged.result(), record_infos)
+                inflight_bytes -= pending_bytes
+            pending.append((key, num_bytes, pool.submit(
+                _stage_storage, storage, False, compression, compression_min_bytes)))
+            inflight_bytes += num_bytes
+        for pending_key, _, staged in pending:
+            _write_record(zip_file, pending_key, staged.result(), record_infos)
+    _write_record_infos(zip_file, record_infos)
+
+
+def load(f, map_location=None, pickle_module=pickle, mmap=False, **pickle_load_args):
     """Loads an object saved with :func:`torch.save` from a file.
 
     :func:`torch.load` uses Python's unpickling facilities but treats storages,
@@ -532,6 +742,10 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
             locations
         pickle_module: module used for unpickling metadata and objects (has to
             match the :attr:`pickle_module` used to serialize file)
+        mmap: if ``True``, storages of a zipfile-based checkpoint are memory-mapped
+            from the file instead of being read into memory. Pages are only loaded
+            on first access and are shared between all processes mapping the same
+            file. Requires :attr:`f` to be a file name (default: ``False``)
         pickle_load_args: (Python 3 only) optional keyword arguments passed over to
             :func:`pickle_module.load` and :func:`pickle_module.Unpickler`, e.g.,
             :attr:`errors=...`.
@@ -572,9 +786,14 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
         >>> torch.load(buffer)
         # Load a module with 'ascii' encoding for unpickling
         >>> torch.load('module.pt', encoding='ascii')
+        # Lazily map the storages of a large checkpoint instead of reading them
+        >>> torch.load('checkpoint.pt', mmap=True)
     """
     _check_dill_version(pickle_module)
 
+    if mmap and not _is_path(f):
+        raise ValueError("torch.load: mmap=True requires f to be a file name, but got {}".format(type(f)))
+
     if 'encoding' not in pickle_load_args.keys():
         pickle_load_args['encoding'] = 'utf-8'
 
@@ -591,7 +810,11 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
                                   " silence this warning)", UserWarning)
                     opened_file.seek(orig_position)
                     return torch.jit.load(opened_file)
-                return _load(opened_zipfile, map_location, pickle_module, **pickle_load_args)
+                mmap_loader = _mmap_record_loader(f) if mmap else None
+                return _load(opened_zipfile, map_location, pickle_module, mmap_loader, **pickle_load_args)
+        if mmap:
+            raise RuntimeError("torch.load: mmap=True is only supported for checkpoints saved with the "
+                               "zipfile-based format (the default since PyTorch 1.6)")
         return _legacy_load(opened_file, map_location, pickle_module, **pickle_load_args)
 
 
@@ -822,16 +1045,98 @@ def _get_restore_location(map_location):
     return restore_location
 
 
-def _load(zip_file, map_location, pickle_module, **pickle_load_args):
+class _mmap_record_loader(object):
+    """Maps storage records of a zipfile checkpoint straight out of the file.
+
+    Records written by ``PyTorchFileWriter`` are stored uncompressed and aligned
+    to 64 bytes, so every record can be viewed as a slice of a private
+    (copy-on-write) mapping of the whole file. One mapping is created lazily per
+    storage type and shared by all records of that type.
+    """
+    def __init__(self, filename):
+        self.filename = str(filename)
+        self.file_size = os.path.getsize(self.filename)
+        self.offsets = _get_record_offsets(self.filename)
+        self.mappings: Dict[Any, Any] = {}
+
+    def get_storage(self, name, data_type, size):
+        offset = self.offsets.get(name)
+        element_size = data_type(0).element_size()
+        if offset is None or offset % element_size != 0:
+            return None
+        if data_type not in self.mappings:
+            self.mappings[data_type] = data_type.from_file(
+                self.filename, False, self.file_size // element_size)
+        start = offset // element_size
+        return self.mappings[data_type][start:start + size]
+
+
+def _get_record_offsets(filename):
+    # Returns a dict mapping every record name (without the leading archive
+    # directory) to the file offset its payload starts at. The offset has to be
+    # computed from the local file header since its extra field may differ from
+    # the one in the central directory.
+    import zipfile
+    offsets = {}
+    with open(filename, 'rb') as f, zipfile.ZipFile(f) as zf:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                continue
+            f.seek(info.header_offset)
+            header = f.read(30)
+            if len(header) != 30 or header[:4] != b'PK\x03\x04':
+                raise RuntimeError("torch.load: corrupt local file header for record '{}' in {}"
+                                   .format(info.filename, filename))
+            name_len, extra_len = struct.unpack('<HH', header[26:30])
+            _, _, name = info.filename.partition('/')
+            offsets[name] = info.header_offset + 30 + name_len + extra_len
+    return offsets
+
+
+def _has_record(zip_file, name):
+    # Record names are prefixed by the archive directory
+    return any(record.split('/', 1)[-1] == name for record in zip_file.get_all_records())
+
+
+def _load_record_infos(zip_file):
+    if not _has_record(zip_file, RECORD_INFO_NAME):
+        return {}
+    return pickle.loads(zip_file.get_record(RECORD_INFO_NAME))
+
+
+def _load_storage_record(zip_file, name, data_type, size, record_infos, mmap_loader=None):
+    # Reads the storage saved under the record `name`, decompressing and
+    # verifying its checksum if it was saved with compression. Memory-mapped
+    # records are not verified since that would read them eagerly.
+    codec, crc = record_infos.get(name, (None, None))
+    if codec is not None:
+        _, decompress = _get_codec(codec)
+        raw = decompress(zip_file.get_record(name))
+        if zlib.crc32(raw) != crc:
+            raise RuntimeError("torch.load: checksum mismatch for record '{}', the file is corrupt".format(name))
+        storage = data_type(size)
+        storage._set_from_file(io.BytesIO(raw), None, False)
+        return storage
+
+    if mmap_loader is not None:
+        storage = mmap_loader.get_storage(name, data_type, size)
+        if storage is not None:
+            return storage
+    storage = zip_file.get_storage_from_record(name, size, data_type(0).dtype).storage()
+    if crc is not None and zlib.crc32(_storage_buffer(storage)) != crc:
+        raise RuntimeError("torch.load: checksum mismatch for record '{}', the file is corrupt".format(name))
+    return storage
+
+
+def _load(zip_file, map_location, pickle_module, mmap_loader=None, **pickle_load_args):
     restore_location = _get_restore_location(map_location)
 
     loaded_storages = {}
+    record_infos = _load_record_infos(zip_file)
 
     def load_tensor(data_type, size, key, location):
         name = 'data/{}'.format(key)
-        dtype = data_type(0).dtype
-
-        storage = zip_file.get_storage_from_record(name, size, dtype).storage()
+        storage = _load_storage_record(zip_file, name, data_type, size, record_infos, mmap_loader)
         loaded_storages[key] = restore_location(storage, location)
 
     def persistent_load(saved_id):
@@ -864,3 +1169,177 @@ def _is_torchscript_zip(zip_file):
         if len(parts) > 1 and parts[1] == 'constants.pkl':
             return True
     return False
+
+
+SHARDED_INDEX_NAME = 'index.pt'
+SHARDED_FORMAT_VERSION = 1
+
+
+def _shard_file_name(shard_idx):
+    return 'shard-{:05d}.pt'.format(shard_idx)
+
+
+def save_sharded(state_dict: Dict[str, Any], directory: Union[str, os.PathLike],
+                 max_shard_size: int = 1 << 30, pickle_module=pickle,
+                 pickle_protocol=DEFAULT_PROTOCOL, compression: Optional[str] = None) -> None:
+    """Saves a state_dict as a sharded checkpoint in :attr:`directory`.
+
+    The entries of :attr:`state_dict` are split into shards of roughly
+    :attr:`max_shard_size` bytes, each written with :func:`torch.save`, and an
+    index file is written next to them. The index maps every tensor key to the
+    shard file and storage record holding it, together with its storage offset,
+    dtype, shape and stride, so :func:`load_sharded` can read a subset of the
+    keys without deserializing the rest of the checkpoint. Tensors sharing a
+    storage are always placed in the same shard. Entries that are not dense
+    tensors are stored in the index itself.
+
+    Args:
+        state_dict: a dict mapping string keys to tensors or other objects
+        directory: directory to write the shards and the index to, created if
+            needed
+        max_shard_size: soft upper bound on the number of storage bytes per shard
+        pickle_module: module used for pickling metadata and objects
+        pickle_protocol: can be specified to override the default protocol
+        compression: codec used to compress the shards, see :func:`torch.save`
+
+    Example:
+        >>> torch.serialization.save_sharded(model.state_dict(), 'checkpoint')
+        >>> encoder = torch.serialization.load_sharded('checkpoint', prefixes=['encoder.'])
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    # Group tensors by storage so that tied tensors land in the same shard
+    storage_groups: Dict[int, Dict[str, Any]] = collections.OrderedDict()
+    objects = collections.OrderedDict()
+    for key, value in state_dict.items():
+        if isinstance(value, torch.Tensor) and value.layout == torch.strided and not value.is_quantized:
+            storage = value.storage()
+            storage_groups.setdefault(storage._cdata, collections.OrderedDict())[key] = value
+        else:
+            objects[key] = value
+
+    shards = []
+    current: Dict[str, Any] = collections.OrderedDict()
+    current_size = 0
+    for group in storage_groups.values():
+        storage = next(iter(group.values())).storage()
+        num_bytes = storage.size() * storage.element_size()
+        if current and current_size + num_bytes > max_shard_size:
+            shards.append(current)
+            current, current_size = collections.OrderedDict(), 0
+        current.update(group)
+        current_size += num_bytes
+    if current:
+        shards.append(current)
+
+    tensors = collections.OrderedDict()
+    for shard_idx, shard in enumerate(shards):
+        shard_file = _shard_file_name(shard_idx)
+        save(shard, os.path.join(directory, shard_file), pickle_module, pickle_protocol,
+             compression=compression)
+        for key, tensor in shard.items():
+            storage = tensor.storage()
+            tensors[key] = dict(
+                shard=shard_file,
+                # Same key `_save`'s persistent_id assigns to the storage
+                record='data/{}'.format(storage._cdata),
+                storage_type=normalize_storage_type(type(storage)),
+                storage_size=storage.size(),
+                location=location_tag(storage),
+                offset=tensor.storage_offset(),
+                dtype=tensor.dtype,
+                shape=tuple(tensor.size()),
+                stride=tensor.stride(),
+                requires_grad=tensor.requires_grad,
+            )
+
+    index = dict(
+        format_version=SHARDED_FORMAT_VERSION,
+        keys=list(state_dict.keys()),
+        shards=[_shard_file_name(i) for i in range(len(shards))],
+        tensors=tensors,
+        objects=objects,
+        metadata=getattr(state_dict, '_metadata', None),
+    )
+    with open(os.path.join(directory, SHARDED_INDEX_NAME), 'wb') as f:
+        pickle_module.dump(index, f, protocol=pickle_protocol)
+
+
+def load_sharded_index(directory: Union[str, os.PathLike], pickle_module=pickle) -> Dict[str, Any]:
+    """Loads the index of a checkpoint written by :func:`save_sharded`.
+
+    The ``'tensors'`` entry of the returned dict maps each tensor key to a dict
+    with its ``shard`` file, storage ``record``, ``offset``, ``dtype``,
+    ``shape`` and ``stride``.
+    """
+    with open(os.path.join(directory, SHARDED_INDEX_NAME), 'rb') as f:
+        index = pickle_module.load(f)
+    if index.get('format_version') != SHARDED_FORMAT_VERSION:
+        raise RuntimeError("Unsupported sharded checkpoint version: {}".format(index.get('format_version')))
+    return index
+
+
+def load_sharded(directory: Union[str, os.PathLike], keys=None, prefixes=None,
+                 map_location=None, mmap=False, pickle_module=pickle) -> Dict[str, Any]:
+    """Loads entries of a checkpoint written by :func:`save_sharded`.
+
+    Only the storage records backing the requested entries are read; shards
+    that hold none of them are never opened.
+
+    Args:
+        directory: directory the checkpoint was saved to
+        keys: iterable of state_dict keys to load
+        prefixes: iterable of key prefixes; every key starting with one of them
+            is loaded. If neither :attr:`keys` nor :attr:`prefixes` is given, the
+            whole checkpoint is loaded
+        map_location: same as in :func:`torch.load`
+        mmap: memory-map the storages instead of reading them, see :func:`torch.load`
+        pickle_module: module used for unpickling the index
+
+    Returns:
+        an ``OrderedDict`` holding the selected entries in the order they were saved
+    """
+    index = load_sharded_index(directory, pickle_module)
+    if keys is None and prefixes is None:
+        selected = list(index['keys'])
+    else:
+        wanted = set(keys) if keys is not None else set()
+        prefixes = tuple(prefixes) if prefixes is not None else ()
+        missing = wanted.difference(index['keys'])
+        if missing:
+            raise KeyError("Keys not found in sharded checkpoint: {}".format(sorted(missing)))
+        selected = [k for k in index['keys'] if k in wanted or (prefixes and k.startswith(prefixes))]
+
+    restore_location = _get_restore_location(map_location)
+    by_shard: Dict[str, Any] = collections.OrderedDict()
+    for key in selected:
+        if key in index['tensors']:
+            entry = index['tensors'][key]
+            by_shard.setdefault(entry['shard'], []).append(key)
+
+    loaded = {}
+    for shard_file, shard_keys in by_shard.items():
+        path = os.path.join(directory, shard_file)
+        mmap_loader = _mmap_record_loader(path) if mmap else None
+        storages: Dict[str, Any] = {}
+        with _open_zipfile_reader(path) as zip_file:
+            record_infos = _load_record_infos(zip_file)
+            for key in shard_keys:
+                entry = index['tensors'][key]
+                record = entry['record']
+                if record not in storages:
+                    storage = _load_storage_record(zip_file, record, entry['storage_type'],
+                                                   entry['storage_size'], record_infos, mmap_loader)
+                    storages[record] = restore_location(storage, entry['location'])
+                storage = storages[record]
+                tensor = torch.tensor([], dtype=entry['dtype'], device=storage.device)
+                tensor.set_(storage, entry['offset'], entry['shape'], entry['stride'])
+                tensor.requires_grad = entry['requires_grad']
+                loaded[key] = tensor
+
+    result: Dict[str, Any] = collections.OrderedDict()
+    for key in selected:
+        result[key] = loaded[key] if key in loaded else index['objects'][key]
+    if index['metadata'] is not None:
+        result._metadata = index['metadata']  # type: ignore[attr-defined]
+    return result
@@ -8,6 +8,15 @@ static methods.
 import torch
 import re
 from torch._six import container_abcs, string_classes, int_classes
+from . import slab
+
+try:
+    import numpy as np
+    _ndarray_types = (np.ndarray, np.memmap)
+    _np_to_torch_dtypes = {np.dtype(v): k for k, v in slab._np_dtypes.items()}
+except ImportError:
+    _ndarray_types = ()
+    _np_to_torch_dtypes = {}
 
 np_str_obj_array_pattern = re.compile(r'[SaUO]')
 
@@ -39,19 +48,119 @@ default_collate_err_msg_format = (
     "dicts or lists; found {}")
 
 
+def _new_shared(elem, numel):
+    # Allocates the output of a batch of `elem`s in the worker's slab or in a
+    # shared memory tensor, so that it can be passed to the main process
+    # without an extra copy
+    out = slab._allocate(numel, elem.dtype) if elem.device.type == 'cpu' else None
+    if out is None:
+        storage = elem.storage()._new_shared(numel)
+        out = elem.new(storage)
+    return out
+
+
+# Collate plans describe the structure of a sample, as nested tuples whose
+# first item is the kind of node:
+#   (_TENSOR,)
+#   (_NDARRAY, dtype, shape)         NumPy array of a dtype supported by torch
+#   (_MAPPING, keys, plans)
+#   (_NAMEDTUPLE, type, plans)
+#   (_SEQUENCE, len, plans)
+#   (_OTHER, type)                   anything else, collated generically
+_TENSOR, _NDARRAY, _MAPPING, _NAMEDTUPLE, _SEQUENCE, _OTHER = range(6)
+
+
+def _infer_plan(elem):
+    if isinstance(elem, torch.Tensor):
+        return (_TENSOR,)
+    elif type(elem) in _ndarray_types and elem.dtype in _np_to_torch_dtypes:
+        return (_NDARRAY, elem.dtype, elem.shape)
+    elif isinstance(elem, container_abcs.Mapping):
+        keys = tuple(elem)
+        return (_MAPPING, keys, tuple(_infer_plan(elem[key]) for key in keys))
+    elif isinstance(elem, tuple) and hasattr(elem, '_fields'):  # namedtuple
+        return (_NAMEDTUPLE, type(elem), tuple(_infer_plan(d) for d in elem))
+    elif isinstance(elem, container_abcs.Sequence) and not isinstance(elem, string_classes):
+        return (_SEQUENCE, len(elem), tuple(_infer_plan(d) for d in elem))
+    return (_OTHER, type(elem))
+
+
+def _plan_matches(plan, elem):
+    kind = plan[0]
+    if kind == _TENSOR:
+        return isinstance(elem, torch.Tensor)
+    elif kind == _NDARRAY:
+        return type(elem) in _ndarray_types and elem.dtype == plan[1] and elem.shape == plan[2]
+    elif kind == _MAPPING:
+        return isinstance(elem, container_abcs.Mapping) and tuple(elem) == plan[1] and \
+            all(_plan_matches(p, elem[key]) for key, p in zip(plan[1], plan[2]))
+    elif kind == _NAMEDTUPLE:
+        return type(elem) is plan[1] and all(_plan_matches(p, d) for p, d in zip(plan[2], elem))
+    elif kind == _SEQUENCE:
+        return isinstance(elem, container_abcs.Sequence) and not isinstance(elem, string_classes) and \
+            not (isinstance(elem, tuple) and hasattr(elem, '_fields')) and \
+            len(elem) == plan[1] and all(_plan_matches(p, d) for p, d in zip(plan[2], elem))
+    return type(elem) is plan[1]
+
+
+def _collate_ndarrays(plan, batch):
+    dtype, shape = plan[1], plan[2]
+    if not all(type(b) in _ndarray_types and b.dtype == dtype and b.shape == shape for b in batch):
+        return _collate(batch)
+    # Stack the arrays straight into the output instead of converting each of
+    # them to a tensor first
+    if torch.utils.data.get_worker_info() is not None:
+        elem = torch.empty(0, dtype=_np_to_torch_dtypes[dtype])
+        numel = len(batch) * int(np.prod(shape))
+        out = _new_shared(elem, numel).view((len(batch),) + shape)
+        np.stack(batch, out=out.numpy())
+        return out
+    return torch.from_numpy(np.stack(batch))
+
+
+def _collate_with_plan(plan, batch):
+    kind = plan[0]
+    if kind == _NDARRAY:
+        return _collate_ndarrays(plan, batch)
+    elif kind == _MAPPING:
+        return {key: _collate_with_plan(p, [d[key] for d in batch]) for key, p in zip(plan[1], plan[2])}
+    elif kind == _NAMEDTUPLE:
+        return plan[1](*(_collate_with_plan(p, samples) for p, samples in zip(plan[2], zip(*batch))))
+    elif kind == _SEQUENCE:
+        if not all(len(elem) == plan[1] for elem in batch):
+            raise RuntimeError('each element in list of batch should be of equal size')
+        return [_collate_with_plan(p, samples) for p, samples in zip(plan[2], zip(*batch))]
+    return _collate(batch)
+
+
+# Plan of the last collated batch. Workers collate batches of samples that
+# usually share the same structure, so the plan is inferred from the first
+# sample of a batch only when that sample does not match it.
+_cached_plan = None
+
+
 def default_collate(batch):
     r"""Puts each data field into a tensor with outer dimension batch size"""
 
+    global _cached_plan
+    elem = batch[0]
+    plan = _cached_plan
+    if plan is None or not _plan_matches(plan, elem):
+        plan = _cached_plan = _infer_plan(elem)
+    return _collate_with_plan(plan, batch)
+
+
+def _collate(batch):
+    # Generic implementation of `default_collate`, dispatching on the type of
+    # the first sample at every level of the structure
     elem = batch[0]
     elem_type = type(elem)
     if isinstance(elem, torch.Tensor):
         out = None
         if torch.utils.data.get_worker_info() is not None:
-            # If we're in a background process, concatenate directly into a
-            # shared memory tensor to avoid an extra copy
-            numel = sum([x.numel() for x in batch])
-            storage = elem.storage()._new_shared(numel)
-            out = elem.new(storage)
+            # If we're in a background process, concatenate directly into the
+            # worker's slab or a shared memory tensor to avoid an extra copy
+            out = _new_shared(elem, sum([x.numel() for x in batch]))
         return torch.stack(batch, 0, out=out)
     elif elem_type.__module__ == 'numpy' and elem_type.__name__ != 'str_' \
             and elem_type.__name__ != 'string_':
@@ -60,7 +169,7 @@ def default_collate(batch):
             if np_str_obj_array_pattern.search(elem.dtype.str) is not None:
                 raise TypeError(default_collate_err_msg_format.format(elem.dtype))
 
-            return default_collate([torch.as_tensor(b) for b in batch])
+            return _collate([torch.as_tensor(b) for b in batch])
         elif elem.shape == ():  # scalars
             return torch.as_tensor(batch)
     elif isinstance(elem, float):
@@ -70,9 +179,9 @@ def default_collate(batch):
     elif isinstance(elem, string_classes):
         return batch
     elif isinstance(elem, container_abcs.Mapping):
-        return {key: default_collate([d[key] for d in batch]) for key in elem}
+        return {key: _collate([d[key] for d in batch]) for key in elem}
     elif isinstance(elem, tuple) and hasattr(elem, '_fields'):  # namedtuple
-        return elem_type(*(default_collate(samples) for samples in zip(*batch)))
+        return elem_type(*(_collate(samples) for samples in zip(*batch)))
     elif isinstance(elem, container_abcs.Sequence):
         # check to make sure that the elements in batch have consistent size
         it = iter(batch)
@@ -80,6 +189,6 @@ def default_collate(batch):
         if not all(len(elem) == elem_size for elem in it):
             raise RuntimeError('each element in list of batch should be of equal size')
         transposed = zip(*batch)
-        return [default_collate(samples) for samples in transposed]
+        return [_collate(samples) for samples in transposed]
 
     raise TypeError(default_collate_err_msg_format.format(elem_type))
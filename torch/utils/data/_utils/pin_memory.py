@@ -11,7 +11,7 @@ from . import MP_STATUS_CHECK_INTERVAL
 from torch._utils import ExceptionWrapper
 
 
-def _pin_memory_loop(in_queue, out_queue, device_id, done_event):
+def _pin_memory_loop(in_queue, out_queue, device_id, done_event, slab_pool=None):
     # This setting is thread local, and prevents the copy in pin_memory from
     # consuming all CPU cores.
     torch.set_num_threads(1)
@@ -28,6 +28,9 @@ def _pin_memory_loop(in_queue, out_queue, device_id, done_event):
         idx, data = r
         if not done_event.is_set() and not isinstance(data, ExceptionWrapper):
             try:
+                if slab_pool is not None:
+                    # Copy batches out of their slab straight into pinned memory
+                    data = slab_pool.unpack(data, pin_memory=True)
                 data = pin_memory(data)
             except Exception:
                 data = ExceptionWrapper(
@@ -0,0 +1,195 @@
+r""""Contains definitions of the methods used by the _BaseDataLoaderIter to move
+batches from workers to the main process through preallocated shared memory
+slabs instead of one shared memory segment per tensor.
+
+Each worker owns a fixed number of slabs allocated by the main process. Before
+fetching a batch, a worker takes a free slab, `default_collate` allocates its
+outputs from it, and any other tensor of the batch is copied into it if it
+fits. Only a small description of the batch, with the tensors replaced by
+their offsets in the slab, is sent over the result queue. The main process
+copies the tensors out of the slab (directly into pinned memory when
+`pin_memory=True`) and hands the slab back to its worker.
+
+These **needs** to be in global scope since Py2 doesn't support serializing
+static methods.
+"""
+
+import torch
+from collections import namedtuple
+from torch._six import container_abcs, string_classes, queue
+
+try:
+    import numpy as np
+    _np_dtypes = {
+        torch.bool: np.bool_,
+        torch.uint8: np.uint8,
+        torch.int8: np.int8,
+        torch.int16: np.int16,
+        torch.int32: np.int32,
+        torch.int64: np.int64,
+        torch.float16: np.float16,
+        torch.float32: np.float32,
+        torch.float64: np.float64,
+        torch.complex64: np.complex64,
+        torch.complex128: np.complex128,
+    }
+    HAS_NUMPY = True
+except ImportError:
+    _np_dtypes = {}
+    HAS_NUMPY = False
+
+# Alignment of every tensor allocated in a slab, large enough for any dtype
+SLAB_ALIGNMENT = 64
+
+r"""A tensor stored in a slab at byte `offset`"""
+_SlabTensor = namedtuple('_SlabTensor', ['offset', 'dtype', 'size', 'stride'])
+
+r"""A batch whose tensors are stored in slab `slab_idx` of worker `worker_id`"""
+_SlabBatch = namedtuple('_SlabBatch', ['worker_id', 'slab_idx', 'data'])
+
+
+def _slab_view(array, offset, dtype, size, stride):
+    # Returns a tensor viewing `array` (the numpy view of a slab) at byte `offset`
+    itemsize = torch.tensor([], dtype=dtype).element_size()
+    numel = 1
+    span = 1
+    for s, st in zip(size, stride):
+        numel *= s
+        span += (s - 1) * st
+    if numel == 0:
+        span = 0
+    flat = torch.from_numpy(array[offset:offset + span * itemsize].view(_np_dtypes[dtype]))
+    return flat.as_strided(size, stride)
+
+
+class _SlabAllocator(object):
+    r"""Bump allocator over the slab currently used by a worker."""
+
+    def __init__(self, slab_idx, slab):
+        self.slab_idx = slab_idx
+        self.array = slab.numpy()
+        self.begin = slab.data_ptr()
+        self.end = self.begin + slab.numel()
+        self.offset = 0
+
+    def allocate(self, numel, dtype):
+        if dtype not in _np_dtypes:
+            return None
+        itemsize = torch.tensor([], dtype=dtype).element_size()
+        start = (self.offset + SLAB_ALIGNMENT - 1) // SLAB_ALIGNMENT * SLAB_ALIGNMENT
+        if start + numel * itemsize > len(self.array):
+            return None
+        self.offset = start + numel * itemsize
+        return _slab_view(self.array, start, dtype, (numel,), (1,))
+
+    def owns(self, tensor):
+        return self.begin <= tensor.data_ptr() < self.end
+
+    def pack(self, data):
+        # Replaces the tensors of `data` living in (or copied into) the slab by
+        # their `_SlabTensor` description. Returns the packed data and whether
+        # anything was placed in the slab.
+        if isinstance(data, torch.Tensor):
+            if data.device.type != 'cpu' or data.layout != torch.strided or data.dtype not in _np_dtypes:
+                return data, False
+            if data.numel() == 0 or not self.owns(data):
+                out = self.allocate(data.numel(), data.dtype)
+                if out is None:
+                    return data, False
+                data = out.view(data.size()).copy_(data)
+            return _SlabTensor(data.data_ptr() - self.begin, data.dtype,
+                               tuple(data.size()), data.stride()), True
+        elif isinstance(data, string_classes):
+            return data, False
+        elif isinstance(data, container_abcs.Mapping):
+            packed = {k: self.pack(v) for k, v in data.items()}
+            return {k: v for k, (v, _) in packed.items()}, any(used for _, used in packed.values())
+        elif isinstance(data, tuple) and hasattr(data, '_fields'):  # namedtuple
+            packed = [self.pack(d) for d in data]
+            return type(data)(*(d for d, _ in packed)), any(used for _, used in packed)
+        elif isinstance(data, (list, tuple)):
+            packed = [self.pack(d) for d in data]
+            return type(data)(d for d, _ in packed), any(used for _, used in packed)
+        return data, False
+
+
+_current_allocator = None
+
+
+def _allocate(numel, dtype):
+    r"""Allocates a 1-D tensor from the slab of the current worker, returning
+    ``None`` if there is no such slab or it is full."""
+    if _current_allocator is None:
+        return None
+    return _current_allocator.allocate(numel, dtype)
+
+
+def _fetch_into_slab(fetcher, index, worker_id, slabs, free_slab_queue):
+    # Fetches `index` with `fetcher`, collating into a free slab if there is
+    # one. Slabs are only handed back by the main process, so we never block
+    # waiting for one and fall back to regular shared memory instead.
+    global _current_allocator
+    try:
+        slab_idx = free_slab_queue.get_nowait()
+    except queue.Empty:
+        return fetcher.fetch(index)
+    allocator = _SlabAllocator(slab_idx, slabs[slab_idx])
+    _current_allocator = allocator
+    try:
+        data = fetcher.fetch(index)
+    except BaseException:
+        free_slab_queue.put(slab_idx)
+        raise
+    finally:
+        _current_allocator = None
+    data, used = allocator.pack(data)
+    if not used:
+        free_slab_queue.put(slab_idx)
+        return data
+    return _SlabBatch(worker_id, slab_idx, data)
+
+
+class _SlabPool(object):
+    r"""Slabs of all workers, owned by the main process."""
+
+    def __init__(self, multiprocessing_context, num_workers, slabs_per_worker, slab_size):
+        self.slabs = []
+        self.arrays = []
+        self.free_slab_queues = []
+        for _ in range(num_workers):
+            slabs = [torch.empty(slab_size, dtype=torch.uint8).share_memory_() for _ in range(slabs_per_worker)]
+            free_slab_queue = multiprocessing_context.Queue()
+            for slab_idx in range(slabs_per_worker):
+                free_slab_queue.put(slab_idx)
+            self.slabs.append(slabs)
+            self.arrays.append([slab.numpy() for slab in slabs])
+            self.free_slab_queues.append(free_slab_queue)
+
+    def unpack(self, data, pin_memory=False):
+        if not isinstance(data, _SlabBatch):
+            return data
+        array = self.arrays[data.worker_id][data.slab_idx]
+        try:
+            return self._copy_out(array, data.data, pin_memory)
+        finally:
+            self.free_slab_queues[data.worker_id].put(data.slab_idx)
+
+    def _copy_out(self, array, data, pin_memory):
+        if isinstance(data, _SlabTensor):
+            src = _slab_view(array, data.offset, data.dtype, data.size, data.stride)
+            out = torch.empty(data.size, dtype=data.dtype, pin_memory=pin_memory)
+            return out.copy_(src)
+        elif isinstance(data, string_classes):
+            return data
+        elif isinstance(data, container_abcs.Mapping):
+            return {k: self._copy_out(array, v, pin_memory) for k, v in data.items()}
+        elif isinstance(data, tuple) and hasattr(data, '_fields'):  # namedtuple
+            return type(data)(*(self._copy_out(array, d, pin_memory) for d in data))
+        elif isinstance(data, (list, tuple)):
+            return type(data)(self._copy_out(array, d, pin_memory) for d in data)
+        return data
+
+    def close(self):
+        for q in self.free_slab_queues:
+            q.cancel_join_thread()
+            q.close()
@@ -7,6 +7,7 @@ in `./_utils/worker.py`.
 
 import threading
 import itertools
+import time
 import warnings
 from typing import Any, Callable, TypeVar, Generic, Sequence, List, Optional
 
@@ -112,6 +113,37 @@ class DataLoader(Generic[T_co]):
         prefetch_factor (int, optional, keyword-only arg): Number of sample loaded
             in advance by each worker. ``2`` means there will be a total of
             2 * num_workers samples prefetched across all workers. (default: ``2``)
+        max_prefetch_factor (int, optional, keyword-only arg): if not ``None``,
+            enables adaptive prefetching. The number of outstanding batches
+            starts at ``prefetch_factor * num_workers`` and is adjusted at run
+            time between one and :attr:`max_prefetch_factor` batches per active
+            worker: it grows while the main process keeps waiting for batches
+            and shrinks while batches are always ready. The current depth and
+            the waiting time are reported by the ``prefetch_stats()`` method of
+            the iterator. (default: ``None``)
+        min_workers (int, optional, keyword-only arg): if not ``None``, adaptive
+            prefetching also adjusts the number of workers that are sent tasks,
+            between :attr:`min_workers` and :attr:`num_workers`. Idle workers
+            are kept alive, so that they can be resumed cheaply. Requires
+            :attr:`max_prefetch_factor` and a map-style dataset. (default: ``None``)
+        slab_size (int, optional, keyword-only arg): if not ``None``, each worker
+            gets :attr:`prefetch_factor` (or :attr:`max_prefetch_factor`, if
+            set) preallocated shared memory slabs of this
+            many bytes. Batches are collated straight into a free slab and only
+            their layout is sent to the main process, which copies them out
+            (into pinned memory if :attr:`pin_memory` is set) and recycles the
+            slab. This avoids creating a shared memory segment and passing a
+            file descriptor per tensor per batch. Batches that do not fit fall
+            back to the regular path. Requires NumPy. (default: ``None``)
+        persistent_workers (bool, optional): If ``True``, the data loader will not shutdown
+            the worker processes after a dataset has been consumed once. This allows to
+            maintain the workers' `Dataset` instances alive. Once the sampler of the
+            current epoch is exhausted, the workers also start loading the first
+            batches of the next epoch while the remaining ones are consumed, unless
+            the sampler implements ``set_epoch`` (e.g.
+            :class:`~torch.utils.data.distributed.DistributedSampler`), in which
+            case its next epoch only starts at the next ``iter()`` call so that
+            ``set_epoch`` can take effect. (default: ``False``)
 
 
     .. warning:: If the ``spawn`` start method is used, :attr:`worker_init_fn`
@@ -145,6 +177,10 @@ class DataLoader(Generic[T_co]):
     timeout: float
     sampler: Sampler
     prefetch_factor: int
+    max_prefetch_factor: Optional[int]
+    min_workers: Optional[int]
+    slab_size: Optional[int]
+    _iterator : Optional['_BaseDataLoaderIter']
 
     __initialized = False
 
@@ -155,7 +191,9 @@ class DataLoader(Generic[T_co]):
                  pin_memory: bool = False, drop_last: bool = False,
                  timeout: float = 0, worker_init_fn: _worker_init_fn_t = None,
                  multiprocessing_context=None, generator=None,
-                 *, prefetch_factor: int = 2):
+                 *, prefetch_factor: int = 2, max_prefetch_factor: Optional[int] = None,
+                 min_workers: Optional[int] = None, slab_size: Optional[int] = None,
+                 persistent_workers: bool = False):
         torch._C._log_api_usage_once("python.data_loader")  # type: ignore
 
         if num_workers < 0:
@@ -170,13 +208,49 @@ class DataLoader(Generic[T_co]):
                              'let num_workers > 0 to enable multiprocessing.')
         assert prefetch_factor > 0
 
+        if max_prefetch_factor is not None:
+            if num_workers == 0:
+                raise ValueError('max_prefetch_factor option could only be specified in multiprocessing.'
+                                 'let num_workers > 0 to enable multiprocessing.')
+            if max_prefetch_factor < prefetch_factor:
+                raise ValueError('max_prefetch_factor option should be at least prefetch_factor, but got '
+                                 'max_prefetch_factor={} and prefetch_factor={}'.format(max_prefetch_factor,
+                                                                                        prefetch_factor))
+
+        if min_workers is not None:
+            if max_prefetch_factor is None:
+                raise ValueError('min_workers option requires max_prefetch_factor to enable adaptive prefetching')
+            if isinstance(dataset, IterableDataset):
+                raise ValueError('min_workers option is not supported with IterableDataset, since '
+                                 'every worker has to consume its own replica of the dataset')
+            if not 0 < min_workers <= num_workers:
+                raise ValueError('min_workers option should be in [1, num_workers], but got '
+                                 'min_workers={} and num_workers={}'.format(min_workers, num_workers))
+
+        if persistent_workers and num_workers == 0:
+            raise ValueError('persistent_workers option needs num_workers > 0')
+
+        if slab_size is not None:
+            if num_workers == 0:
+                raise ValueError('slab_size option could only be specified in multiprocessing.'
+                                 'let num_workers > 0 to enable multiprocessing.')
+            if slab_size <= 0:
+                raise ValueError('slab_size option should be positive, but got slab_size={}'.format(slab_size))
+            if not _utils.slab.HAS_NUMPY:
+                raise ValueError('slab_size option requires NumPy')
+
         self.dataset = dataset
         self.num_workers = num_workers
         self.prefetch_factor = prefetch_factor
+        self.max_prefetch_factor = max_prefetch_factor
+        self.min_workers = min_workers
+        self.slab_size = slab_size
         self.pin_memory = pin_memory
         self.timeout = timeout
         self.worker_init_fn = worker_init_fn
         self.multiprocessing_context = multiprocessing_context
+        self.persistent_workers = persistent_workers
+        self._iterator = None
 
         # Arg-check dataset related before checking samplers because we want to
         # tell users that iterable-style datasets are incompatible with custom
@@ -316,14 +390,29 @@ class DataLoader(Generic[T_co]):
 
         super(DataLoader, self).__setattr__(attr, val)
 
-    # We quote '_BaseDataLoaderIter' since it isn't defined yet and the definition can't be moved up
-    # since '_BaseDataLoaderIter' references 'DataLoader'.
-    def __iter__(self) -> '_BaseDataLoaderIter':
+    def _get_iterator(self) -> '_BaseDataLoaderIter':
         if self.num_workers == 0:
             return _SingleProcessDataLoaderIter(self)
         else:
             return _MultiProcessingDataLoaderIter(self)
 
+    # We quote '_BaseDataLoaderIter' since it isn't defined yet and the definition can't be moved up
+    # since '_BaseDataLoaderIter' references 'DataLoader'.
+    def __iter__(self) -> '_BaseDataLoaderIter':
+        # When using a single worker the returned iterator should be
+        # created everytime to avoid reseting its state
+        # However, in the case of a multiple workers iterator
+        # the iterator is only created once in the lifetime of the
+        # DataLoader object so that workers can be reused
+        if self.persistent_workers and self.num_workers > 0:
+            if self._iterator is None:
+                self._iterator = self._get_iterator()
+            else:
+                self._iterator._reset(self)
+            return self._iterator
+        else:
+            return self._get_iterator()
+
     @property
     def _auto_collation(self):
         return self.batch_sampler is not None
@@ -380,13 +469,22 @@ class _BaseDataLoaderIter(object):
         self._index_sampler = loader._index_sampler
         self._num_workers = loader.num_workers
         self._prefetch_factor = loader.prefetch_factor
+        self._max_prefetch_factor = loader.max_prefetch_factor
+        self._min_workers = loader.min_workers
+        self._slab_size = loader.slab_size
         self._pin_memory = loader.pin_memory and torch.cuda.is_available()
         self._timeout = loader.timeout
         self._collate_fn = loader.collate_fn
         self._sampler_iter = iter(self._index_sampler)
         self._base_seed = torch.empty((), dtype=torch.int64).random_(generator=loader.generator).item()
+        self._persistent_workers = loader.persistent_workers
         self._num_yielded = 0
 
+    def _reset(self, loader, first_iter=False):
+        self._sampler_iter = iter(self._index_sampler)
+        self._num_yielded = 0
+        self._IterableDataset_len_called = loader._IterableDataset_len_called
+
     def __iter__(self) -> '_BaseDataLoaderIter':
         return self
 
@@ -741,15 +839,27 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
         self._worker_result_queue = multiprocessing_context.Queue()  # type: ignore
         self._worker_pids_set = False
         self._shutdown = False
-        self._send_idx = 0  # idx of the next task to be sent to workers
-        self._rcvd_idx = 0  # idx of the next task to be returned in __next__
-        # information about data not yet yielded, i.e., tasks w/ indices in range [rcvd_idx, send_idx).
-        # map: task idx => - (worker_id,)        if data isn't fetched (outstanding)
-        #                  \ (worker_id, data)   if data is already fetched (out-of-order)
-        self._task_info = {}
-        self._tasks_outstanding = 0  # always equal to count(v for v in task_info.values() if len(v) == 1)
         self._workers_done_event = multiprocessing_context.Event()
 
+        # Adaptive prefetching: the number of outstanding tasks and of workers
+        # they are sent to, adjusted in `_update_prefetch`
+        self._adaptive_prefetch = self._max_prefetch_factor is not None
+        self._prefetch_depth = self._prefetch_factor * self._num_workers
+        self._active_workers = self._num_workers
+        self._wait_time = 0.  # total time spent waiting for batches
+        self._num_batches = 0  # total number of batches returned
+        self._num_adjustments = 0
+        self._window_start = time.perf_counter()
+        self._window_wait_time = 0.
+        self._window_batches = 0
+        self._last_wait_fraction = 0.
+
+        self._slab_pool = None
+        if self._slab_size is not None:
+            self._slab_pool = _utils.slab._SlabPool(
+                multiprocessing_context, self._num_workers,
+                self._max_prefetch_factor or self._prefetch_factor, self._slab_size)
+
         self._index_queues = []
         self._workers = []
         # A list of booleans representing whether each worker still has work to
@@ -766,7 +876,9 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 args=(self._dataset_kind, self._dataset, index_queue,
                       self._worker_result_queue, self._workers_done_event,
                       self._auto_collation, self._collate_fn, self._drop_last,
-                      self._base_seed + i, self._worker_init_fn, i, self._num_workers))
+                      self._base_seed + i, self._worker_init_fn, i, self._num_workers,
+                      self._slab_pool.slabs[i] if self._slab_pool is not None else None,
+                      self._slab_pool.free_slab_queues[i] if self._slab_pool is not None else None))
             w.daemon = True
             # NB: Process.start() actually take some time as it needs to
             #     start a process and pass the arguments over via a pipe.
@@ -788,7 +900,7 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 target=_utils.pin_memory._pin_memory_loop,
                 args=(self._worker_result_queue, self._data_queue,
                       torch.cuda.current_device(),
-                      self._pin_memory_thread_done_event))
+                      self._pin_memory_thread_done_event, self._slab_pool))
             pin_memory_thread.daemon = True
             pin_memory_thread.start()
             # Similar to workers (see comment above), we only register
@@ -802,8 +914,58 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
         _utils.signal_handling._set_SIGCHLD_handler()
         self._worker_pids_set = True
 
+        # With persistent workers, the first tasks of the next epoch are sent as
+        # soon as the sampler of the current one is exhausted. Samplers with a
+        # `set_epoch` method are excluded since users call it between epochs.
+        self._prefetch_next_epoch = self._persistent_workers and \
+            self._dataset_kind == _DatasetKind.Map and \
+            not any(hasattr(s, 'set_epoch') for s in (loader.sampler, loader.batch_sampler,
+                                                      getattr(loader.batch_sampler, 'sampler', None)))
+        self._reset(loader, first_iter=True)
+
+    def _reset(self, loader, first_iter=False):
+        # The time between epochs is not spent waiting for workers
+        self._window_start = time.perf_counter()
+        if not first_iter and self._next_epoch_start is not None and self._rcvd_idx == self._next_epoch_start:
+            # The previous epoch was consumed entirely and the tasks of this one
+            # are already in flight, so just carry on with them.
+            self._sampler_iter = self._next_sampler_iter
+            self._num_yielded = 0
+            self._IterableDataset_len_called = loader._IterableDataset_len_called
+            self._next_sampler_iter = None
+            self._next_epoch_start = None
+            for _ in range(self._prefetch_depth - self._tasks_outstanding):
+                self._try_put_index()
+            return
+
+        super(_MultiProcessingDataLoaderIter, self)._reset(loader, first_iter)
+        self._send_idx = 0  # idx of the next task to be sent to workers
+        self._rcvd_idx = 0  # idx of the next task to be returned in __next__
+        # information about data not yet yielded, i.e., tasks w/ indices in range [rcvd_idx, send_idx).
+        # map: task idx => - (worker_id,)        if data isn't fetched (outstanding)
+        #                  \ (worker_id, data)   if data is already fetched (out-of-order)
+        self._task_info = {}
+        self._tasks_outstanding = 0  # always equal to count(v for v in task_info.values() if len(v) == 1)
+        # Sampler iterator of the next epoch and idx of its first task, once
+        # prefetching it has started
+        self._next_sampler_iter = None
+        self._next_epoch_start = None
+        self._workers_status = [True for i in range(self._num_workers)]
+        # We resume the prefetching in case it was enabled
+        if not first_iter:
+            for idx in range(self._num_workers):
+                self._index_queues[idx].put(_utils.worker._ResumeIteration())
+            resume_iteration_cnt = self._num_workers
+            while resume_iteration_cnt > 0:
+                return_idx, return_data = self._get_data()
+                if isinstance(return_idx, _utils.worker._ResumeIteration):
+                    assert return_data is None
+                    resume_iteration_cnt -= 1
+                elif self._slab_pool is not None and not self._pin_memory:
+                    # Recycle the slabs of stale results
+                    self._slab_pool.unpack(return_data)
         # prime the prefetch loop
-        for _ in range(self._prefetch_factor * self._num_workers):
+        for _ in range(self._prefetch_depth):
             self._try_put_index()
 
     def _try_get_data(self, timeout=_utils.MP_STATUS_CHECK_INTERVAL):
@@ -994,7 +1156,8 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
             # This part needs to run in the loop because both the `self._get_data()`
             # call and `_IterableDatasetStopIteration` check below can mark
             # extra worker(s) as dead.
-            while self._rcvd_idx < self._send_idx:
+            epoch_end_idx = self._send_idx if self._next_epoch_start is None else self._next_epoch_start
+            while self._rcvd_idx < epoch_end_idx:
                 info = self._task_info[self._rcvd_idx]
                 worker_id = info[0]
                 if len(info) == 2 or self._workers_status[worker_id]:  # has data or is still active
@@ -1003,7 +1166,8 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 self._rcvd_idx += 1
             else:
                 # no valid `self._rcvd_idx` is found (i.e., didn't break)
-                self._shutdown_workers()
+                if not self._persistent_workers:
+                    self._shutdown_workers()
                 raise StopIteration
 
             # Now `self._rcvd_idx` is the batch index we want to fetch
@@ -1014,8 +1178,16 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 return self._process_data(data)
 
             assert not self._shutdown and self._tasks_outstanding > 0
-            idx, data = self._get_data()
+            if self._adaptive_prefetch:
+                wait_start = time.perf_counter()
+                idx, data = self._get_data()
+                self._window_wait_time += time.perf_counter() - wait_start
+            else:
+                idx, data = self._get_data()
             self._tasks_outstanding -= 1
+            if self._slab_pool is not None and not self._pin_memory:
+                # Copy out and recycle the slab right away, even for out-of-order data
+                data = self._slab_pool.unpack(data)
 
             if self._dataset_kind == _DatasetKind.Iterable:
                 # Check for _IterableDatasetStopIteration
@@ -1031,16 +1203,33 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 del self._task_info[idx]
                 return self._process_data(data)
 
+    def _next_index(self):
+        if self._next_epoch_start is not None:
+            return next(self._next_sampler_iter)
+        return super(_MultiProcessingDataLoaderIter, self)._next_index()
+
     def _try_put_index(self):
-        assert self._tasks_outstanding < self._prefetch_factor * self._num_workers
+        if self._tasks_outstanding >= self._prefetch_depth:
+            # Only happens after the prefetch depth was lowered, in which case
+            # we let the outstanding tasks drain
+            assert self._adaptive_prefetch
+            return
 
         try:
             index = self._next_index()
         except StopIteration:
-            return
+            if not self._prefetch_next_epoch or self._next_epoch_start is not None:
+                return
+            # Hand the workers the first tasks of the next epoch while this one drains
+            self._next_sampler_iter = iter(self._index_sampler)
+            self._next_epoch_start = self._send_idx
+            try:
+                index = self._next_index()
+            except StopIteration:
+                return
         for _ in range(self._num_workers):  # find the next active worker, if any
             worker_queue_idx = next(self._worker_queue_idx_cycle)
-            if self._workers_status[worker_queue_idx]:
+            if self._workers_status[worker_queue_idx] and worker_queue_idx < self._active_workers:
                 break
         else:
             # not found (i.e., didn't break)
@@ -1053,23 +1242,93 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
 
     def _process_data(self, data):
         self._rcvd_idx += 1
+        if self._adaptive_prefetch:
+            self._update_prefetch()
         self._try_put_index()
         if isinstance(data, ExceptionWrapper):
             data.reraise()
         return data
 
-    def _shutdown_worker(self, worker_id):
-        # Mark a worker as having finished its work and dead, e.g., due to
-        # exhausting an `IterableDataset`. This should be used only when this
-        # `_MultiProcessingDataLoaderIter` is going to continue running.
+    # Adaptive prefetching looks at the fraction of time the main process spent
+    # waiting for batches over windows of `_ADAPT_WINDOW` batches per active
+    # worker. Above `_STARVED_FRACTION`, the workers do not keep up, so we first
+    # deepen the prefetch queue and then send tasks to more workers. Below
+    # `_SATURATED_FRACTION`, batches are always ready, so we first use fewer
+    # workers and then shorten the queue, to save CPU and memory.
+    _ADAPT_WINDOW = 4
+    _STARVED_FRACTION = 0.1
+    _SATURATED_FRACTION = 0.01
+
+    def _update_prefetch(self):
+        self._num_batches += 1
+        self._window_batches += 1
+        if self._window_batches < self._ADAPT_WINDOW * self._active_workers:
+            return
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        wait_fraction = self._window_wait_time / elapsed if elapsed > 0 else 0.
+        self._wait_time += self._window_wait_time
+        self._last_wait_fraction = wait_fraction
+        self._window_start = now
+        self._window_wait_time = 0.
+        self._window_batches = 0
+
+        min_workers = self._min_workers or self._num_workers
+        depth, active = self._prefetch_depth, self._active_workers
+        if wait_fraction > self._STARVED_FRACTION:
+            if depth < self._max_prefetch_factor * active:
+                depth = min(depth + active, self._max_prefetch_factor * active)
+            elif active < self._num_workers:
+                active += 1
+                depth = self._max_prefetch_factor * active
+        elif wait_fraction < self._SATURATED_FRACTION:
+            if active > min_workers:
+                active -= 1
+                depth = min(depth, self._max_prefetch_factor * active)
+            elif depth > active:
+                depth = max(depth - active, active)
+        if (depth, active) == (self._prefetch_depth, self._active_workers):
+            return
+        self._prefetch_depth, self._active_workers = depth, active
+        self._num_adjustments += 1
+        # Top up the queue after a raise, `_process_data` puts one more task
+        for _ in range(self._prefetch_depth - self._tasks_outstanding - 1):
+            self._try_put_index()
+
+    def prefetch_stats(self):
+        r"""Returns a dict with the current prefetch depth (the number of
+        outstanding batches), the number of workers that tasks are sent to, the
+        total number of batches returned and the total time spent waiting for
+        them since the iterator was created, the fraction of time spent waiting
+        over the last adaptation window and the number of adjustments made.
+        The number of batches and the waiting times are only tracked when
+        :attr:`max_prefetch_factor` is set."""
+        return {
+            'prefetch_depth': self._prefetch_depth,
+            'active_workers': self._active_workers,
+            'num_batches': self._num_batches,
+            'wait_time': self._wait_time + self._window_wait_time,
+            'wait_fraction': self._last_wait_fraction,
+            'num_adjustments': self._num_adjustments,
+        }
+
+    def _shutdown_worker(self, worker_id, shutdown=False):
+        # Mark a worker as having finished its work, e.g., due to exhausting an
+        # `IterableDataset`. This should be used only when this
+        # `_MultiProcessingDataLoaderIter` is going to continue running, or with
+        # `shutdown=True` from `_shutdown_workers`.
+        #
+        # Persistent workers are only terminated at shutdown, since they are
+        # resumed by `_ResumeIteration` at the next epoch.
 
-        assert self._workers_status[worker_id]
+        assert self._workers_status[worker_id] or (self._persistent_workers and shutdown)
 
-        # Signal termination to that specific worker.
-        q = self._index_queues[worker_id]
-        # Indicate that no more data will be put on this queue by the current
-        # process.
-        q.put(None)
+        if shutdown or not self._persistent_workers:
+            # Signal termination to that specific worker.
+            q = self._index_queues[worker_id]
+            # Indicate that no more data will be put on this queue by the current
+            # process.
+            q.put(None)
 
         # Note that we don't actually join the worker here, nor do we remove the
         # worker's pid from C side struct because (1) joining may be slow, and
@@ -1113,8 +1372,8 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                     # Get number of workers from `len(self._workers)` instead of
                     # `self._num_workers` in case we error before starting all
                     # workers.
-                    if self._workers_status[worker_id]:
-                        self._shutdown_worker(worker_id)
+                    if self._persistent_workers or self._workers_status[worker_id]:
+                        self._shutdown_worker(worker_id, shutdown=True)
                 for w in self._workers:
                     w.join(timeout=_utils.MP_STATUS_CHECK_INTERVAL)
                     if w.is_alive():
@@ -1126,6 +1385,8 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 for q in self._index_queues:
                     q.cancel_join_thread()
                     q.close()
+                if self._slab_pool is not None:
+                    self._slab_pool.close()
             finally:
                 # Even though all this function does is putting into queues that
                 # we have called `cancel_join_thread` on, weird things can
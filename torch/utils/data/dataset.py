@@ -1,6 +1,7 @@
 import bisect
 import warnings
 
+import torch
 from torch._utils import _accumulate
 from torch import randperm
 # No 'default_generator' in torch/__init__.pyi
@@ -20,7 +21,10 @@ class Dataset(Generic[T_co]):
     data sample for a given key. Subclasses could also optionally overwrite
     :meth:`__len__`, which is expected to return the size of the dataset by many
     :class:`~torch.utils.data.Sampler` implementations and the default options
-    of :class:`~torch.utils.data.DataLoader`.
+    of :class:`~torch.utils.data.DataLoader`. Subclasses could also
+    optionally implement :meth:`__getitems__`, taking the list of indices of a
+    whole batch and returning the list of samples, to speed up batched loading,
+    e.g., with a single vectorized read from the underlying storage.
 
     .. note::
       :class:`~torch.utils.data.DataLoader` by default constructs a index
@@ -169,6 +173,11 @@ class TensorDataset(Dataset[Tuple[Tensor, ...]]):
     def __getitem__(self, index):
         return tuple(tensor[index] for tensor in self.tensors)
 
+    def __getitems__(self, indices: List[int]) -> List[Tuple[Tensor, ...]]:
+        # Gather the whole batch with one indexing op per tensor
+        index = torch.as_tensor(indices, dtype=torch.long)
+        return list(zip(*(tensor[index].unbind(0) for tensor in self.tensors)))
+
     def __len__(self):
         return self.tensors[0].size(0)
 
@@ -271,6 +280,12 @@ class Subset(Dataset[T_co]):
     def __getitem__(self, idx):
         return self.dataset[self.indices[idx]]
 
+    def __getitems__(self, indices: List[int]) -> List[T_co]:
+        # Forward batched fetches if the wrapped dataset supports them
+        if callable(getattr(self.dataset, '__getitems__', None)):
+            return self.dataset.__getitems__([self.indices[idx] for idx in indices])  # type: ignore
+        return [self.dataset[self.indices[idx]] for idx in indices]
+
     def __len__(self):
         return len(self.indices)
 
@@ -4,6 +4,49 @@ from . import Sampler
 import torch.distributed as dist
 
 
+class _FeistelPermutation(object):
+    r"""Pseudo-random permutation of ``range(n)`` whose elements are computed
+    on demand in constant memory.
+
+    A balanced Feistel network permutes the smallest range of ``2 ** bits``
+    integers containing ``range(n)`` (with an even number of bits), and values
+    falling outside of ``range(n)`` are encrypted again until they fall inside
+    it (cycle walking), which takes less than 4 rounds on average.
+    """
+
+    _NUM_ROUNDS = 4
+    _MASK = (1 << 64) - 1
+
+    def __init__(self, n, seed):
+        bits = max((n - 1).bit_length(), 2)
+        bits += bits % 2
+        self.n = n
+        self.half_bits = bits // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        g = torch.Generator()
+        g.manual_seed(seed)
+        self.keys = torch.randint(1 << 62, (self._NUM_ROUNDS,), generator=g).tolist()
+
+    def _round(self, x, key):
+        # splitmix64 finalizer
+        z = (x + key) * 0x9E3779B97F4A7C15 & self._MASK
+        z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & self._MASK
+        z = (z ^ (z >> 27)) * 0x94D049BB133111EB & self._MASK
+        return (z ^ (z >> 31)) & self.half_mask
+
+    def _encrypt(self, x):
+        left, right = x >> self.half_bits, x & self.half_mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, i):
+        x = self._encrypt(i)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+
 class DistributedSampler(Sampler):
     r"""Sampler that restricts data loading to a subset of the dataset.
 
@@ -33,6 +76,16 @@ class DistributedSampler(Sampler):
             tail of the data to make it evenly divisible across the number of
             replicas. If ``False``, the sampler will add extra indices to make
             the data evenly divisible across the replicas. Default: ``False``.
+        lazy (bool, optional): if ``True``, indices of the shard of this rank are
+            computed one at a time from a pseudo-random permutation instead of
+            materializing a shuffled list of the whole dataset, so that memory
+            use does not depend on the size of the dataset. The order differs
+            from the one used with ``lazy=False``. Without shuffling, indices
+            are always computed lazily. Default: ``False``.
+
+    The position of the sampler in the current epoch is part of its
+    :meth:`state_dict`, so that loading it with :meth:`load_state_dict` in a
+    restarted job resumes iterating from the same sample.
 
     .. warning::
         In distributed mode, calling the :meth:`set_epoch` method at
@@ -51,7 +104,8 @@ class DistributedSampler(Sampler):
         ...     train(loader)
     """
 
-    def __init__(self, dataset, num_replicas=None, rank=None, shuffle=True, seed=0, drop_last=False):
+    def __init__(self, dataset, num_replicas=None, rank=None, shuffle=True, seed=0, drop_last=False,
+                 lazy=False):
         if num_replicas is None:
             if not dist.is_available():
                 raise RuntimeError("Requires distributed package to be available")
@@ -79,8 +133,19 @@ class DistributedSampler(Sampler):
         self.total_size = self.num_samples * self.num_replicas
         self.shuffle = shuffle
         self.seed = seed
+        self.lazy = lazy
+        # Index of the first sample of the next iteration, set when resuming
+        # from a state dict, and number of samples yielded in this epoch
+        self._start_index = 0
+        self._num_yielded = 0
 
     def __iter__(self):
+        start_index = self._start_index
+        self._start_index = 0
+        self._num_yielded = start_index
+        if self.lazy or not self.shuffle:
+            return self._count_yielded(self._lazy_indices(start_index))
+
         if self.shuffle:
             # deterministically shuffle based on epoch and seed
             g = torch.Generator()
@@ -102,7 +167,21 @@ class DistributedSampler(Sampler):
         indices = indices[self.rank:self.total_size:self.num_replicas]
         assert len(indices) == self.num_samples
 
-        return iter(indices)
+        return self._count_yielded(iter(indices[start_index:]))
+
+    def _lazy_indices(self, start_index):
+        n = len(self.dataset)
+        permutation = _FeistelPermutation(n, self.seed + self.epoch) if self.shuffle else None
+        for i in range(start_index, self.num_samples):
+            # Position in the padded (or truncated) list of indices of all
+            # replicas, extra indices are taken from its beginning
+            position = (self.rank + i * self.num_replicas) % n
+            yield permutation[position] if permutation is not None else position
+
+    def _count_yielded(self, indices):
+        for index in indices:
+            self._num_yielded += 1
+            yield index
 
     def __len__(self):
         return self.num_samples
@@ -116,4 +195,39 @@ class DistributedSampler(Sampler):
         Arguments:
             epoch (int): Epoch number.
         """
+        if epoch != self.epoch:
+            self._start_index = 0
+            self._num_yielded = 0
         self.epoch = epoch
+
+    def state_dict(self):
+        r"""Returns the state of the sampler as a :class:`dict`.
+
+        It contains the epoch and the number of samples of this epoch yielded
+        by the sampler so far. Note that a :class:`~torch.utils.data.DataLoader`
+        draws indices ahead of the batches it returns, so the number of samples
+        actually consumed (e.g., the number of batches times the batch size)
+        should be stored as ``'start_index'`` to resume from the next batch.
+        """
+        return {
+            'epoch': self.epoch,
+            'seed': self.seed,
+            'num_replicas': self.num_replicas,
+            'start_index': self._num_yielded,
+        }
+
+    def load_state_dict(self, state_dict):
+        r"""Loads the sampler state, so that its next iteration resumes the
+        epoch of :attr:`state_dict` where it was left.
+
+        Arguments:
+            state_dict (dict): sampler state. Should be an object returned
+                from a call to :meth:`state_dict`.
+        """
+        if state_dict['num_replicas'] != self.num_replicas or state_dict['seed'] != self.seed:
+            raise ValueError("loaded state dict was saved with num_replicas={} and seed={}, but the sampler "
+                             "has num_replicas={} and seed={}".format(state_dict['num_replicas'], state_dict['seed'],
+                                                                      self.num_replicas, self.seed))
+        self.epoch = state_dict['epoch']
+        self._start_index = state_dict['start_index']
+        self._num_yielded = state_dict['start_index']
@@ -1,9 +1,12 @@
-from typing import TypeVar, Optional, Iterator
+from typing import TypeVar, Optional, Iterator, Dict, Any
 from . import Sampler, Dataset
 
 T_co = TypeVar('T_co', covariant=True)
 class DistributedSampler(Sampler[T_co]):
-    def __init__(self, dataset: Dataset, num_replicas: Optional[int]=..., rank: Optional[int]=..., shuffle: bool=...): ...
+    def __init__(self, dataset: Dataset, num_replicas: Optional[int]=..., rank: Optional[int]=..., shuffle: bool=...,
+                 seed: int=..., drop_last: bool=..., lazy: bool=...): ...
     def __iter__(self) -> Iterator[T_co]: ...
     def __len__(self) -> int: ...
     def set_epoch(self, epoch: int) -> None: ...
+    def state_dict(self) -> Dict[str, Any]: ...
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None: ...